@@ -1,9 +1,6 @@
 """FastAPI router for accessing bird maps and associated images."""
 
 import os
-import glob
-import json
-import traceback
 from typing import Optional
 import requests
 import logging
@@ -11,7 +8,9 @@ import logging
 logging.basicConfig(level=logging.WARNING)
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+
+from api.utils.json_catalog import JsonCatalog
 
 # Initialize FastAPI router
 router = APIRouter()
@@ -57,33 +56,16 @@ for file_path in FILES:
 
 DATA_FOLDER = "bird_maps"
 
+# Parsed once; files changed on disk are picked up within CATALOG_REFRESH_SECS
+catalog = JsonCatalog(DATA_FOLDER, refresh_secs=float(os.environ.get("CATALOG_REFRESH_SECS", 2.0)))
+
 # Get a list of bird maps
 @router.get("/")
 async def get_bird_maps(limit: Optional[int] = None):
     """
-    Fetch a list of all bird map metadata from local JSON files.
+    Fetch a list of all bird map metadata, served from the in-memory catalog.
     """
-    bird_maps = []
-    data_files = glob.glob(os.path.join(DATA_FOLDER, "*.json"))
-    logging.warning(f"[bird_maps] Found {len(data_files)} JSON files.")
-
-    for file_path in data_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as json_file:
-                chat_data = json.load(json_file)
-                bird_maps.append(chat_data)
-        except Exception as e:
-            logging.debug(f"Error loading chat history from {file_path}: {str(e)}")
-            traceback.print_exc()
-
-    bird_maps.sort(key=lambda x: x.get('dts', 0), reverse=True)
-
-    logging.warning(f"[bird_maps] Returning {len(bird_maps)} items")
-    if limit:
-        return bird_maps[:limit]
-
-    logging.debug(f"Found {len(bird_maps)} maps")
-    return bird_maps
+    return Response(content=catalog.list_body(limit), media_type="application/json")
 
 # Get a single bird map by ID
 @router.get("/{bird_map_id}")
@@ -91,14 +73,11 @@ async def get_bird_map(bird_map_id: str):
     """
     Fetch a single bird map by its unique identifier (file name).
     """
-    file_path = os.path.join(DATA_FOLDER, f"{bird_map_id}.json")
-    if not os.path.exists(file_path):
+    body = catalog.get_body(bird_map_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Bird map not found")
 
-    with open(file_path, 'r', encoding='utf-8') as json_file:
-        bird_map = json.load(json_file)
-
-    return bird_map
+    return Response(content=body, media_type="application/json")
 
 # Get an image asset associated with a bird map
 @router.get("/image/{image_name}")
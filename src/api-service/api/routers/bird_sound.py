@@ -1,9 +1,6 @@
 """FastAPI router for accessing bird sounds and associated images."""
 
 import os
-import glob
-import json
-import traceback
 from typing import Optional
 import requests
 import logging
@@ -12,7 +9,9 @@ logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+
+from api.utils.json_catalog import JsonCatalog
 
 # Initialize FastAPI router
 router = APIRouter()
@@ -60,31 +59,16 @@ for file_path in FILES:
 
 DATA_FOLDER = "bird_sounds"
 
+# Parsed once; files changed on disk are picked up within CATALOG_REFRESH_SECS
+catalog = JsonCatalog(DATA_FOLDER, refresh_secs=float(os.environ.get("CATALOG_REFRESH_SECS", 2.0)))
+
 # List all bird sound metadata
 @router.get("/")
 async def get_bird_sounds(limit: Optional[int] = None):
     """
-    Return a list of bird sound metadata entries.
+    Return a list of bird sound metadata entries, served from the in-memory catalog.
     """
-    bird_sounds = []
-    data_files = glob.glob(os.path.join(DATA_FOLDER, "*.json"))
-    for file_path in data_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as sound_file:
-                sound_data = json.load(sound_file)
-                bird_sounds.append(sound_data)
-        except Exception as e:
-            logger.debug(f"Error loading bird_sounds from {file_path}: {str(e)}")
-            traceback.print_exc()
-
-    # Sort metadata by datetime (most recent first)
-    bird_sounds.sort(key=lambda x: x.get('dts', 0), reverse=True)
-
-    # Return limited subset if limit specified
-    if limit:
-        return bird_sounds[:limit]
-
-    return bird_sounds
+    return Response(content=catalog.list_body(limit), media_type="application/json")
 
 # Get a specific bird sound entry by ID
 @router.get("/{bird_sound_id}")
@@ -92,14 +76,11 @@ async def get_bird_sound(bird_sound_id: str):
     """
     Retrieve a specific bird sound metadata entry by ID.
     """
-    file_path = os.path.join(DATA_FOLDER, f"{bird_sound_id}.json")
-    if not os.path.exists(file_path):
+    body = catalog.get_body(bird_sound_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Bird sound not found")
 
-    with open(file_path, 'r', encoding='utf-8') as sound_file:
-        bird_sound = json.load(sound_file)
-
-    return bird_sound
+    return Response(content=body, media_type="application/json")
 
 # Serve audio file for a bird sound
 @router.get("/audio/{audio_name}")
@@ -1,14 +1,17 @@
 """FastAPI Router for Multimodal LLM Chat with External Bird Audio Identification."""
 
+import asyncio
 import os
+import re
 import uuid
 import time
 import base64
-from tempfile import TemporaryDirectory
-from typing import Dict, Optional
-import requests
- 
-from fastapi import APIRouter, Header, HTTPException
+import json
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from chromadb import HttpClient
 
@@ -16,13 +19,20 @@ from chromadb import HttpClient
 from api.utils.llm_cnn_utils import (
     chat_sessions,
     create_chat_session,
-    generate_chat_response,
-    rebuild_chat_session
+    generate_chat_response_async,
+    rebuild_chat_session,
+    stream_chat_response_async
 )
 
 # Chat storage and management utility
 from api.utils.chat_utils import ChatHistoryManager
 
+# Content-addressed store for uploaded audio, referenced from messages by audio_path
+from api.utils.blob_store import RangeNotSatisfiable, blob_content_type, create_blob_store, parse_range
+
+# Pooled async client for the BirdNET identification service
+from api.utils.birdnet_client import BirdNetError, birdnet_client
+
 CHROMADB_HOST = os.environ.get("CHROMADB_HOST", "localhost")
 CHROMADB_PORT = int(os.environ.get("CHROMADB_PORT", 8000))
 client = HttpClient(host=CHROMADB_HOST, port=CHROMADB_PORT)
@@ -34,194 +44,368 @@ router = APIRouter()
 
 # Initialize chat history manager and sessions
 chat_manager = ChatHistoryManager(model="llm-cnn")
+audio_store = create_blob_store()
+
+# Placeholder contents the frontend sends with an audio-only message
+AUDIO_PLACEHOLDERS = ["an audio file has been uploaded", "audio uploaded"]
+
+class AudioUpload(NamedTuple):
+    """Raw audio received with a chat message."""
+    data: bytes
+    filename: str
+    content_type: str
+
+def data_url_media_type(audio_base64: str, default: str = "audio/mpeg") -> str:
+    """Media type declared by a ``data:<type>;base64,`` URL, or ``default``."""
+    match = re.match(r"data:([\w.+-]+/[\w.+-]+)", audio_base64)
+    return match.group(1) if match else default
+
+def decode_base64_audio(audio_base64: str) -> bytes:
+    """Decode a base64 string or data URL, as sent by the JSON chat API."""
+    base64_data = audio_base64.split(",", 1)[1] if "," in audio_base64 else audio_base64
+
+    try:
+        return base64.b64decode(base64_data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid audio base64: {str(e)}") from e
+
+async def read_chat_message(request: Request) -> Tuple[Dict, Optional[AudioUpload]]:
+    """Parse a chat request into the message fields and the uploaded audio, if any.
+
+    Accepted bodies, where an empty upload counts as no audio:
+    - multipart/form-data with a ``file`` part and optional ``content`` field
+      (a plain form with only ``content`` is a text message)
+    - raw audio (``audio/*`` or ``application/octet-stream``) with ``content`` and
+      ``name`` as query parameters, forwarded to BirdNET as received
+    - JSON ``{"content", "audio", "name"}`` with base64 audio (compatibility shim)
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        form = await request.form()
+        upload = form.get("file")
+        message = {"content": form.get("content", "")}
+        if upload is None or isinstance(upload, str):
+            return message, None
+        data = await upload.read()
+        if not data:
+            return message, None
+        message["name"] = upload.filename or "audio.mp3"
+        return message, AudioUpload(data, message["name"], upload.content_type or "application/octet-stream")
+
+    if content_type.startswith(("audio/", "application/octet-stream")):
+        message = {
+            "content": request.query_params.get("content", ""),
+            "name": request.query_params.get("name", "audio.mp3")
+        }
+        data = await request.body()
+        return message, AudioUpload(data, message["name"], content_type) if data else None
+
+    try:
+        message = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Expected a JSON, multipart or audio request body.") from e
+    if not isinstance(message, dict):
+        raise HTTPException(status_code=400, detail="Chat message must be a JSON object.")
+
+    if not message.get("audio"):
+        return message, None
+    audio_bytes = decode_base64_audio(message["audio"])
+    if not audio_bytes:
+        return message, None
+    return message, AudioUpload(audio_bytes, message.get("name", "upload.mp3"), data_url_media_type(message["audio"]))
+
+async def identify_audio(audio: AudioUpload) -> Dict:
+    """Identify the bird in an uploaded recording with birdnet_app."""
+    try:
+        return await birdnet_client.analyze(audio.data, audio.filename, audio.content_type)
+    except BirdNetError as e:
+        raise HTTPException(status_code=500, detail=f"BirdNET error: {str(e)}") from e
+
+class TurnPlan(NamedTuple):
+    """What to answer a user message with: an LLM ``prompt`` or a fixed ``reply``."""
+    user_message: Dict
+    prompt: Optional[str]
+    reply: Optional[str]
+
+async def store_audio(audio: AudioUpload) -> str:
+    """Save uploaded audio in the blob store and return the ``audio_path`` messages refer to it by."""
+    blob_id = await asyncio.to_thread(audio_store.put, audio.data, audio.content_type, audio.filename)
+    return f"audio/{blob_id}"
+
+async def plan_turn(chat_session, message: Dict, audio: Optional[AudioUpload]) -> TurnPlan:
+    """Identify any uploaded audio and decide how the assistant should answer.
+
+    The audio itself is stored out of line; the user message only keeps its ``audio_path``.
+    """
+    content = (message.get("content") or "").strip()
+    user_question = content if content.lower() not in AUDIO_PLACEHOLDERS else ""
+
+    visible_user_message = {
+        "message_id": str(uuid.uuid4()),
+        "role": "user",
+        "name": message.get("name", "audio.mp3"),
+        "content": user_question
+    }
+
+    if audio is None:
+        if not user_question:
+            raise HTTPException(status_code=400, detail="Please provide audio or content.")
+        return TurnPlan(visible_user_message, user_question, None)
+
+    visible_user_message["audio_path"] = await store_audio(audio)
+
+    birdnet_result = await identify_audio(audio)
+    scientific_name = birdnet_result.get("scientific_name", "").strip()
+    confidence = birdnet_result.get("average_confidence")
+
+    if not scientific_name or "not identified" in scientific_name.lower():
+        return TurnPlan(visible_user_message, None, "Bird species could not be identified.")
+
+    if user_question:
+        return TurnPlan(visible_user_message, f"{scientific_name}\n\nUser asked: {user_question}", None)
+
+    if confidence is not None:
+        species_statement = f"The species identified is **{scientific_name}** ({round(confidence * 100, 1)}% confidence)."
+    else:
+        species_statement = f"The species identified is **{scientific_name}**."
+
+    # Prime the session with the species so follow-up questions have context
+    _ = await generate_chat_response_async(chat_session, {"content": scientific_name}, collection=collection)
+    return TurnPlan(visible_user_message, None, species_statement)
+
+def make_assistant_message(content: str) -> Dict:
+    """A stored assistant message."""
+    return {
+        "message_id": str(uuid.uuid4()),
+        "role": "assistant",
+        "content": content
+    }
+
+async def chat_turn(chat_session, message: Dict, audio: Optional[AudioUpload]) -> Tuple[Dict, Dict]:
+    """Answer one user message and return the ``(user_message, assistant_message)`` pair to store."""
+    plan = await plan_turn(chat_session, message, audio)
+    reply = plan.reply
+    if reply is None:
+        reply = await generate_chat_response_async(chat_session, {"content": plan.prompt}, collection=collection)
+    return plan.user_message, make_assistant_message(reply)
+
+def session_for_chat(chat_id: str, chat: Dict):
+    """The live LLM session of a stored chat, rebuilt from its history after eviction or a restart."""
+    chat_session = chat_sessions.get(chat_id)
+    if not chat_session:
+        chat_session = rebuild_chat_session(chat["messages"])
+        chat_sessions[chat_id] = chat_session
+    return chat_session
+
+def sse_event(event: str, data) -> str:
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_turn(chat: Dict, chat_session, plan: TurnPlan, x_session_id: str) -> AsyncIterator[str]:
+    """Stream the assistant's answer as SSE, then store the turn and send the updated chat.
+
+    Events: ``delta`` with each new piece of text, ``replace`` when the answer is
+    superseded by the fallback reply, ``done`` with the saved chat, or ``error``.
+    If the turn is not stored, because the LLM failed or the client disconnected
+    mid-stream, the live session is dropped: it may already hold the unsaved
+    turn, and is rebuilt from the stored history on the next message.
+    """
+    parts = []
+    saved = False
+    try:
+        try:
+            if plan.reply is not None:
+                parts.append(plan.reply)
+                yield sse_event("delta", {"text": plan.reply})
+            else:
+                events = stream_chat_response_async(chat_session, {"content": plan.prompt}, collection=collection)
+                async with aclosing(events):
+                    async for event in events:
+                        if "replace" in event:
+                            parts = [event["replace"]]
+                            yield sse_event("replace", {"text": event["replace"]})
+                        else:
+                            parts.append(event["delta"])
+                            yield sse_event("delta", {"text": event["delta"]})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"LLM error: {str(e)}"})
+            return
+
+        chat["messages"].append(plan.user_message)
+        chat["messages"].append(make_assistant_message("".join(parts).strip()))
+        await asyncio.to_thread(chat_manager.save_chat, chat, x_session_id)
+        saved = True
+    finally:
+        if not saved:
+            chat_sessions.pop(chat["chat_id"], None)
+    yield sse_event("done", chat)
+
+def event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    """SSE response that proxies and browsers do not buffer."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/audio/{blob_id}")
+async def get_audio(
+    blob_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """Stream stored chat audio, honouring byte ranges so players can seek.
+
+    Blobs are content addressed and never change, so they are cached for good.
+    """
+    size = await asyncio.to_thread(audio_store.size, blob_id)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    etag = f'"{blob_id}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": etag
+    }
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        audio_store.read_range(blob_id, start, end),
+        status_code=status_code,
+        media_type=blob_content_type(blob_id),
+        headers=headers
+    )
 
 @router.get("/chats")
-async def get_chats(x_session_id: str = Header(None, alias="X-Session-ID"), limit: Optional[int] = None):
-    """Fetch recent chat history."""
-    return chat_manager.get_recent_chats(x_session_id, limit)
+async def get_chats(
+    x_session_id: str = Header(None, alias="X-Session-ID"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Fetch recent chat history, newest first.
+
+    ``fields=summary`` returns only chat_id, title, dts and message_count. With
+    ``limit``, the ``X-Next-Cursor`` header carries the ``cursor`` of the next
+    page. The ETag changes whenever a chat of the session is saved, so polling
+    with If-None-Match costs a 304 until then.
+    """
+    if fields not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail="fields must be 'full' or 'summary'")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+
+    summary = fields == "summary"
+    etag = await asyncio.to_thread(chat_manager.get_page_etag, x_session_id, limit, cursor, summary)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        chats, next_cursor = await asyncio.to_thread(
+            chat_manager.get_chat_page, x_session_id, limit, cursor, summary=summary
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return JSONResponse(content=chats, headers=headers)
 
 @router.get("/chats/{chat_id}")
 async def get_chat(chat_id: str, x_session_id: str = Header(None, alias="X-Session-ID")):
     """Fetch a specific chat by ID."""
-    chat = chat_manager.get_chat(chat_id, x_session_id)
+    chat = await asyncio.to_thread(chat_manager.get_chat, chat_id, x_session_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     return chat
 
 @router.post("/chats")
-async def start_chat_with_llm(message: Dict, x_session_id: str = Header(None, alias="X-Session-ID")):
+async def start_chat_with_llm(request: Request, x_session_id: str = Header(None, alias="X-Session-ID")):
     """Start a new chat session with LLM."""
+    message, audio = await read_chat_message(request)
+
     chat_id = str(uuid.uuid4())
     current_time = int(time.time())
     chat_session = create_chat_session()
     chat_sessions[chat_id] = chat_session
 
-    message["message_id"] = str(uuid.uuid4())
-    message["role"] = "user"
-
-    content = message.get("content", "").strip()
-    user_question = content if content.lower() not in ["an audio file has been uploaded", "audio uploaded"] else ""
-
-    filename = message.get("name", "audio.mp3")
-
-    visible_user_message = {
-        "message_id": message["message_id"],
-        "role": message["role"],
-        "audio": message.get("audio"),
-        "name": filename,
-        "content": user_question
-    }
-
-    assistant_response = ""
-
-    if message.get("audio"):
-        base64_string = message["audio"]
-        base64_data = base64_string.split(",", 1)[1] if "," in base64_string else base64_string
-
-        try:
-            audio_bytes = base64.b64decode(base64_data)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid audio base64: {str(e)}") from e
-
-        with TemporaryDirectory() as tmpdir:
-            audio_path = os.path.join(tmpdir, "upload.mp3")
-            with open(audio_path, "wb") as file_obj:
-                file_obj.write(audio_bytes)
-
-            with open(audio_path, "rb") as upload_file:
-                files = {"file": ("upload.mp3", upload_file, "audio/mpeg")}
-                try:
-                    birdnet_response = requests.post("http://birdnet_app:9090/analyze-bird", files=files, timeout=10)
-                    birdnet_response.raise_for_status()
-                    birdnet_result = birdnet_response.json()
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"BirdNET error: {str(e)}") from e
-
-            scientific_name = birdnet_result.get("scientific_name", "").strip()
-            confidence = birdnet_result.get("average_confidence")
-
-            if not scientific_name or "not identified" in scientific_name.lower():
-                assistant_response = "Bird species could not be identified."
-            else:
-                if confidence is not None and scientific_name.lower() not in ["doliornis sclateri", "hapalopsittaca melanotis"]:
-                    species_statement = f"The species identified is **{scientific_name}** ({round(confidence * 100, 1)}% confidence)."
-                else:
-                    species_statement = f"The species identified is **{scientific_name}**."
-
-                if user_question:
-                    full_prompt = f"{scientific_name}\n\nUser asked: {user_question}"
-                    assistant_response = generate_chat_response(chat_session, {"content": full_prompt}, collection=collection)
-                else:
-                    _ = generate_chat_response(chat_session, {"content": scientific_name}, collection=collection)
-                    assistant_response = species_statement
-
-    elif user_question:
-        full_prompt = user_question
-        assistant_response = generate_chat_response(chat_session, {"content": full_prompt}, collection=collection)
-    else:
-        raise HTTPException(status_code=400, detail="Please provide audio or content.")
-
-    assistant_message = {
-        "message_id": str(uuid.uuid4()),
-        "role": "assistant",
-        "content": assistant_response
-    }
+    user_message, assistant_message = await chat_turn(chat_session, message, audio)
+    user_question = user_message["content"]
 
     chat_response = {
         "chat_id": chat_id,
         "title": user_question[:50] + "..." if user_question else "Bird Audio Analysis",
         "dts": current_time,
-        "messages": [visible_user_message, assistant_message]
+        "messages": [user_message, assistant_message]
     }
 
-    chat_manager.save_chat(chat_response, x_session_id)
+    await asyncio.to_thread(chat_manager.save_chat, chat_response, x_session_id)
     return chat_response
 
-@router.post("/chats/{chat_id}")
-async def continue_chat_with_llm(chat_id: str, message: Dict, x_session_id: str = Header(None, alias="X-Session-ID")):
-    """Continue an existing chat session."""
-    chat = chat_manager.get_chat(chat_id, x_session_id)
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
+@router.post("/chats/stream")
+async def start_chat_with_llm_stream(request: Request, x_session_id: str = Header(None, alias="X-Session-ID")):
+    """Start a new chat session, streaming the answer as server-sent events."""
+    message, audio = await read_chat_message(request)
 
-    chat_session = chat_sessions.get(chat_id)
-    if not chat_session:
-        chat_session = rebuild_chat_session(chat["messages"])
-        chat_sessions[chat_id] = chat_session
+    chat_id = str(uuid.uuid4())
+    chat_session = create_chat_session()
+    chat_sessions[chat_id] = chat_session
 
-    current_time = int(time.time())
-    chat["dts"] = current_time
+    plan = await plan_turn(chat_session, message, audio)
+    user_question = plan.user_message["content"]
+    chat = {
+        "chat_id": chat_id,
+        "title": user_question[:50] + "..." if user_question else "Bird Audio Analysis",
+        "dts": int(time.time()),
+        "messages": []
+    }
+    return event_stream(stream_turn(chat, chat_session, plan, x_session_id))
 
-    message["message_id"] = str(uuid.uuid4())
-    message["role"] = "user"
+@router.post("/chats/{chat_id}/stream")
+async def continue_chat_with_llm_stream(chat_id: str, request: Request, x_session_id: str = Header(None, alias="X-Session-ID")):
+    """Continue an existing chat session, streaming the answer as server-sent events."""
+    chat = await asyncio.to_thread(chat_manager.get_chat, chat_id, x_session_id)
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
 
-    content = message.get("content", "").strip()
-    user_question = content if content.lower() not in ["an audio file has been uploaded", "audio uploaded"] else ""
-    filename = message.get("name", "audio.mp3")
+    message, audio = await read_chat_message(request)
+    chat_session = session_for_chat(chat_id, chat)
+    chat["dts"] = int(time.time())
 
-    visible_user_message = {
-        "message_id": message["message_id"],
-        "role": message["role"],
-        "audio": message.get("audio"),
-        "name": filename,
-        "content": user_question
-    }
+    plan = await plan_turn(chat_session, message, audio)
+    return event_stream(stream_turn(chat, chat_session, plan, x_session_id))
 
-    if message.get("audio"):
-        base64_string = message["audio"]
-        base64_data = base64_string.split(",", 1)[1] if "," in base64_string else base64_string
+@router.post("/chats/{chat_id}")
+async def continue_chat_with_llm(chat_id: str, request: Request, x_session_id: str = Header(None, alias="X-Session-ID")):
+    """Continue an existing chat session."""
+    chat = await asyncio.to_thread(chat_manager.get_chat, chat_id, x_session_id)
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
 
-        try:
-            audio_bytes = base64.b64decode(base64_data)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid audio base64: {str(e)}") from e
-
-        with TemporaryDirectory() as tmpdir:
-            audio_path = os.path.join(tmpdir, "upload.mp3")
-            with open(audio_path, "wb") as file_obj:
-                file_obj.write(audio_bytes)
-
-            with open(audio_path, "rb") as upload_file:
-                files = {"file": ("upload.mp3", upload_file, "audio/mpeg")}
-                try:
-                    birdnet_response = requests.post("http://birdnet_app:9090/analyze-bird", files=files, timeout=10)
-                    birdnet_response.raise_for_status()
-                    birdnet_result = birdnet_response.json()
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"BirdNET error: {str(e)}") from e
-
-            scientific_name = birdnet_result.get("scientific_name", "").strip()
-            confidence = birdnet_result.get("average_confidence")
-
-            if not scientific_name or "not identified" in scientific_name.lower():
-                assistant_response = "Bird species could not be identified."
-            else:
-                if confidence is not None and scientific_name.lower() not in ["doliornis sclateri", "hapalopsittaca melanotis"]:
-                    species_statement = f"The species identified is **{scientific_name}** ({round(confidence * 100, 1)}% confidence)."
-                else:
-                    species_statement = f"The species identified is **{scientific_name}**."
-
-                if user_question:
-                    full_prompt = f"{scientific_name}\n\nUser asked: {user_question}"
-                    assistant_response = generate_chat_response(chat_session, {"content": full_prompt}, collection=collection)
-                else:
-                    _ = generate_chat_response(chat_session, {"content": scientific_name}, collection=collection)
-                    assistant_response = species_statement
-
-    elif user_question:
-        full_prompt = user_question
-        assistant_response = generate_chat_response(chat_session, {"content": full_prompt}, collection=collection)
-    else:
-        raise HTTPException(status_code=400, detail="Please provide audio or content.")
+    message, audio = await read_chat_message(request)
 
-    assistant_message = {
-        "message_id": str(uuid.uuid4()),
-        "role": "assistant",
-        "content": assistant_response
-    }
+    chat_session = session_for_chat(chat_id, chat)
+    chat["dts"] = int(time.time())
 
-    chat["messages"].append(visible_user_message)
+    user_message, assistant_message = await chat_turn(chat_session, message, audio)
+    chat["messages"].append(user_message)
     chat["messages"].append(assistant_message)
 
-    chat_manager.save_chat(chat, x_session_id)
+    await asyncio.to_thread(chat_manager.save_chat, chat, x_session_id)
     return chat
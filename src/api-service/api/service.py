@@ -1,9 +1,34 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRouter
 from starlette.middleware.cors import CORSMiddleware
 from api.routers import llm_cnn_chat, bird_map, bird_sound
+from api.utils.birdnet_client import birdnet_client
+from api.utils.llm_cnn_utils import chat_sessions, llm_executor
+from api.utils.agent_tools import query_embedding_cache, warm_up_query_embeddings
+
+async def warm_up_embeddings():
+    """Pre-embed the species names in the background; a failure only means a colder cache."""
+    try:
+        computed = await asyncio.get_running_loop().run_in_executor(llm_executor, warm_up_query_embeddings)
+        logging.info(f"Embedding cache warmed up: {computed} species names embedded")
+    except Exception as e:
+        logging.warning(f"Embedding cache warm-up failed: {e}")
 
-app = FastAPI(title="API Server", description="API Server", version="v1")
+@asynccontextmanager
+async def lifespan(_app):
+    """Open the pooled BirdNET client and warm the embedding cache; release both on shutdown."""
+    await birdnet_client.start()
+    warm_up = asyncio.create_task(warm_up_embeddings())
+    yield
+    warm_up.cancel()
+    await birdnet_client.aclose()
+    query_embedding_cache.save()
+
+app = FastAPI(title="API Server", description="API Server", version="v1", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,6 +36,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Mount API under /api
@@ -25,6 +51,14 @@ app.include_router(api_router, prefix="/api")
 async def get_index():
     return {"message": "Welcome to the Bird Watching App"}
 
-import logging
+@app.get("/metrics")
+async def metrics():
+    """Chat session store, query-embedding cache and chat audio store statistics."""
+    return {
+        "chat_sessions": chat_sessions.stats(),
+        "embedding_cache": query_embedding_cache.stats(),
+        "audio_store": llm_cnn_chat.audio_store.stats()
+    }
+
 for route in app.routes:
     logging.warning(f"Registered route: {route.path} [{route.methods}]")
\ No newline at end of file
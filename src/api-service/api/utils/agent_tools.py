@@ -1,20 +1,55 @@
 """Utilities for bird information retrieval using embeddings and function calling."""
 
+import os
+
 from vertexai.generative_models import FunctionDeclaration, Tool, Part
 from vertexai.language_models import TextEmbeddingInput, TextEmbeddingModel
 
+from api.utils.embedding_cache import EmbeddingCache
+
 # Embedding setup
 EMBEDDING_MODEL = "text-embedding-004"
 EMBEDDING_DIMENSION = 256
+EMBEDDING_TASK_TYPE = "RETRIEVAL_DOCUMENT"
 embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL)
 
-def generate_query_embedding(query: str):
-    """Generate a text embedding vector from a query string."""
-    query_embedding_inputs = [TextEmbeddingInput(task_type='RETRIEVAL_DOCUMENT', text=query)]
+# Species in the knowledge base (scientific and common names), pre-embedded at startup
+SPECIES_NAMES = [
+    ("Andigena hypoglauca", "Gray-breasted Mountain-Toucan"),
+    ("Aulacorhynchus coeruleicinctis", "Blue-banded Toucanet"),
+    ("Doliornis sclateri", "Bay-vented Cotinga"),
+    ("Gallinago jamesoni", "Andean Snipe"),
+    ("Hapalopsittaca melanotis", "Black-winged Parrot"),
+    ("Pionus tumultuosus", "Speckle-faced Parrot"),
+    ("Pipile cumanensis", "Blue-throated Piping-Guan"),
+    ("Rupicola peruvianus", "Andean Cock-of-the-rock"),
+    ("Tinamus osgoodi", "Black Tinamou"),
+]
+
+def embed_query_uncached(query: str):
+    """Generate a text embedding vector from a query string with Vertex AI."""
+    query_embedding_inputs = [TextEmbeddingInput(task_type=EMBEDDING_TASK_TYPE, text=query)]
     kwargs = {"output_dimensionality": EMBEDDING_DIMENSION}
     embeddings = embedding_model.get_embeddings(query_embedding_inputs, **kwargs)
     return embeddings[0].values
 
+# Tool searches repeat the same few species names, so embeddings are cached (and persisted if configured)
+query_embedding_cache = EmbeddingCache(
+    embed_query_uncached,
+    model=f"{EMBEDDING_MODEL}:{EMBEDDING_TASK_TYPE}",
+    dimension=EMBEDDING_DIMENSION,
+    max_entries=int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", 4096)),
+    path=os.environ.get("EMBEDDING_CACHE_PATH") or None
+)
+
+def generate_query_embedding(query: str):
+    """Generate a text embedding vector from a query string, reusing cached embeddings."""
+    return query_embedding_cache.embed(query)
+
+def warm_up_query_embeddings() -> int:
+    """Pre-embed every species' scientific and common name; returns how many were computed."""
+    return query_embedding_cache.warm_up(name for names in SPECIES_NAMES for name in names)
+
 # Define the tool function that the LLM can call
 get_bird_info_func = FunctionDeclaration(
     name="get_bird_info",
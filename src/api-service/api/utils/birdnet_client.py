@@ -0,0 +1,117 @@
+"""Shared async client for the birdnet_app identification service."""
+
+import asyncio
+import os
+import random
+from typing import Dict, Optional
+
+import httpx
+
+# Responses worth retrying: birdnet_app answers 503 with Retry-After when its inference queue is full
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class BirdNetError(Exception):
+    """Raised when birdnet_app cannot be reached or keeps failing after all retries."""
+
+
+class BirdNetClient:
+    """Connection-pooled, concurrency-bounded client for ``POST /analyze-bird``.
+
+    One ``httpx.AsyncClient`` with keep-alive is opened by ``start`` in the app
+    lifespan and reused by every request, so analyses never block the event loop
+    and never pay for a new TCP connection. At most ``max_concurrency`` analyses
+    are in flight at once; the rest wait for a slot. Connection errors, timeouts
+    and 502/503/504 responses are retried with exponential backoff and full
+    jitter, honouring ``Retry-After`` when birdnet_app sends one.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 10.0,
+        max_concurrency: int = 8,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """Store the settings; the HTTP client itself is created by ``start``."""
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_env(cls) -> "BirdNetClient":
+        """Build a client from the BIRDNET_* environment variables."""
+        return cls(
+            base_url=os.environ.get("BIRDNET_URL", "http://birdnet_app:9090"),
+            connect_timeout=float(os.environ.get("BIRDNET_CONNECT_TIMEOUT", 2.0)),
+            read_timeout=float(os.environ.get("BIRDNET_READ_TIMEOUT", 10.0)),
+            max_concurrency=int(os.environ.get("BIRDNET_MAX_CONCURRENCY", 8)),
+            max_retries=int(os.environ.get("BIRDNET_MAX_RETRIES", 2)),
+            backoff=float(os.environ.get("BIRDNET_RETRY_BACKOFF", 0.2))
+        )
+
+    async def start(self) -> None:
+        """Open the pooled HTTP client (called from the app lifespan)."""
+        if self._client is not None:
+            return
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            ),
+            transport=self.transport
+        )
+
+    async def aclose(self) -> None:
+        """Close the pooled connections (called from the app lifespan)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry ``attempt`` (1-based): Retry-After, else full-jitter backoff."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.timeout.read)
+        return random.uniform(0, self.backoff * 2 ** (attempt - 1))
+
+    async def analyze(self, audio_bytes: bytes, filename: str = "upload.mp3", content_type: str = "audio/mpeg") -> Dict:
+        """Identify the bird in an audio upload and return birdnet_app's JSON result."""
+        if self._client is None:
+            await self.start()
+
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    response = await self._client.post(
+                        "/analyze-bird", files={"file": (filename, audio_bytes, content_type)}
+                    )
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        response.raise_for_status()
+                        return response.json()
+                    error = f"HTTP {response.status_code}"
+                except httpx.TransportError as e:  # connection failures and timeouts
+                    error = f"{type(e).__name__}: {e}"
+                except httpx.HTTPStatusError as e:
+                    raise BirdNetError(f"HTTP {e.response.status_code}: {e.response.text[:200]}") from e
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_delay(attempt + 1, response))
+
+        raise BirdNetError(f"{error} after {self.max_retries + 1} attempts")
+
+
+# Shared by all routers; opened and closed in the service lifespan
+birdnet_client = BirdNetClient.from_env()
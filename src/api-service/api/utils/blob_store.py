@@ -0,0 +1,235 @@
+"""Content-addressed storage for chat audio, kept out of the chat JSON."""
+
+import hashlib
+import mimetypes
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, Optional, Tuple
+
+# A blob id is the SHA-256 of the content plus the file extension of its type
+BLOB_ID_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,8})?$")
+
+CHUNK_SIZE = 64 * 1024
+
+# Audio types browsers upload, which the platform mimetypes table may lack
+AUDIO_EXTENSIONS = {
+    "audio/mpeg": ".mp3",
+    "audio/mp3": ".mp3",
+    "audio/wav": ".wav",
+    "audio/wave": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/webm": ".webm",
+    "audio/ogg": ".ogg",
+    "audio/mp4": ".m4a",
+    "audio/x-m4a": ".m4a",
+    "audio/aac": ".aac",
+    "audio/flac": ".flac",
+}
+EXTENSION_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".webm": "audio/webm",
+    ".ogg": "audio/ogg",
+    ".m4a": "audio/mp4",
+    ".aac": "audio/aac",
+    ".flac": "audio/flac",
+}
+
+
+def blob_id_for(data: bytes, content_type: str, filename: str = "") -> str:
+    """Content address of ``data``: its SHA-256 and an extension guessed from the type or file name."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    extension = AUDIO_EXTENSIONS.get(media_type) or mimetypes.guess_extension(media_type)
+    if not extension or extension == ".bin":
+        extension = os.path.splitext(filename)[1].lower() or ""
+    if not BLOB_ID_PATTERN.match("0" * 64 + extension):
+        extension = ""
+    return hashlib.sha256(data).hexdigest() + extension
+
+
+def blob_content_type(blob_id: str) -> str:
+    """Media type to serve a blob with, from its extension."""
+    extension = os.path.splitext(blob_id)[1]
+    return EXTENSION_TYPES.get(extension) or mimetypes.guess_type(blob_id)[0] or "application/octet-stream"
+
+
+class RangeNotSatisfiable(ValueError):
+    """A ``Range`` header that selects no byte of the blob."""
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive byte range of a single-range ``Range`` header; None serves the whole blob.
+
+    Multiple ranges are not supported and fall back to the whole blob, which
+    RFC 9110 allows. An unsatisfiable range raises ``RangeNotSatisfiable``.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (range_header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(range_header)
+    return start, end
+
+
+class BlobStore(ABC):
+    """Interface of a blob store: immutable content addressed by ``blob_id_for``.
+
+    Storing the same bytes twice keeps one copy. Blobs are never modified, so
+    they can be served with long-lived caching and fetched in byte ranges.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes, content_type: str, filename: str = "") -> str:
+        """Store ``data`` unless already present and return its blob id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self, blob_id: str) -> Optional[int]:
+        """Size of a blob in bytes, or None if it does not exist."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_range(self, blob_id: str, start: int, end: int) -> Iterator[bytes]:
+        """Chunks of bytes ``start`` to ``end`` inclusive."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under ``root``, fanned out by the first two hex digits of the hash."""
+
+    def __init__(self, root: str = "chat-history/blobs"):
+        """Create the root directory if needed."""
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.stored = 0
+        self.deduplicated = 0
+
+    def _path(self, blob_id: str) -> str:
+        """File of a blob; ids are validated so they can never leave ``root``."""
+        if not BLOB_ID_PATTERN.match(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id!r}")
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def put(self, data: bytes, content_type: str, filename: str = "") -> str:
+        """Write the blob through a temporary file and an atomic rename, unless it exists."""
+        blob_id = blob_id_for(data, content_type, filename)
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            self.deduplicated += 1
+            return blob_id
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.stored += 1
+        return blob_id
+
+    def size(self, blob_id: str) -> Optional[int]:
+        """Size from the file system."""
+        try:
+            return os.path.getsize(self._path(blob_id))
+        except (OSError, ValueError):
+            return None
+
+    def read_range(self, blob_id: str, start: int, end: int) -> Iterator[bytes]:
+        """Read the range in ``CHUNK_SIZE`` pieces."""
+        with open(self._path(blob_id), "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def stats(self) -> Dict:
+        """Blobs written and uploads that matched an existing blob."""
+        return {"backend": "local", "root": self.root, "stored": self.stored, "deduplicated": self.deduplicated}
+
+
+class GCSBlobStore(BlobStore):
+    """Blobs as objects under ``prefix`` in a Google Cloud Storage bucket.
+
+    Lets replicas share audio without a shared disk. Requires
+    google-cloud-storage and credentials (GOOGLE_APPLICATION_CREDENTIALS).
+    """
+
+    def __init__(self, bucket_name: str, prefix: str = "chat-audio"):
+        """Connect to the bucket."""
+        from google.cloud import storage
+
+        self.bucket = storage.Client().bucket(bucket_name)
+        self.prefix = prefix.strip("/")
+        self.stored = 0
+        self.deduplicated = 0
+
+    def _blob(self, blob_id: str):
+        """Bucket object of a blob."""
+        if not BLOB_ID_PATTERN.match(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id!r}")
+        return self.bucket.blob(f"{self.prefix}/{blob_id}")
+
+    def put(self, data: bytes, content_type: str, filename: str = "") -> str:
+        """Upload the blob unless an object with its id exists."""
+        blob_id = blob_id_for(data, content_type, filename)
+        blob = self._blob(blob_id)
+        if blob.exists():
+            self.deduplicated += 1
+            return blob_id
+        blob.upload_from_string(data, content_type=blob_content_type(blob_id))
+        self.stored += 1
+        return blob_id
+
+    def size(self, blob_id: str) -> Optional[int]:
+        """Size from the object metadata."""
+        try:
+            blob = self.bucket.get_blob(self._blob(blob_id).name)
+        except ValueError:
+            return None
+        return blob.size if blob is not None else None
+
+    def read_range(self, blob_id: str, start: int, end: int) -> Iterator[bytes]:
+        """Download the range in ``CHUNK_SIZE`` pieces."""
+        blob = self._blob(blob_id)
+        for offset in range(start, end + 1, CHUNK_SIZE):
+            yield blob.download_as_bytes(start=offset, end=min(offset + CHUNK_SIZE, end + 1) - 1)
+
+    def stats(self) -> Dict:
+        """Blobs uploaded and uploads that matched an existing blob."""
+        return {"backend": "gcs", "prefix": self.prefix, "stored": self.stored, "deduplicated": self.deduplicated}
+
+
+# Available backends, chosen with BLOB_STORE_BACKEND
+BLOB_STORES = {
+    "local": LocalBlobStore,
+    "gcs": GCSBlobStore,
+}
+
+
+def create_blob_store(backend: Optional[str] = None) -> BlobStore:
+    """Build the configured store from the BLOB_STORE_* environment variables."""
+    backend = backend or os.environ.get("BLOB_STORE_BACKEND", "local")
+    if backend not in BLOB_STORES:
+        raise ValueError(f"BLOB_STORE_BACKEND must be one of {sorted(BLOB_STORES)}, got {backend!r}")
+    if backend == "gcs":
+        return GCSBlobStore(
+            bucket_name=os.environ.get("BLOB_STORE_BUCKET") or os.environ["GCS_BUCKET_NAME"],
+            prefix=os.environ.get("BLOB_STORE_PREFIX", "chat-audio")
+        )
+    return LocalBlobStore(root=os.environ.get("BLOB_STORE_DIR", "chat-history/blobs"))
@@ -0,0 +1,186 @@
+"""Per-session index of chat summaries, kept as an append-only JSONL file next to the chats."""
+
+import base64
+import bisect
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+INDEX_FILENAME = "_index.jsonl"
+LOCK_FILENAME = "_index.lock"
+
+# Superseded lines tolerated before the index file is rewritten
+COMPACT_SLACK = 1000
+
+
+def chat_summary(chat: Dict) -> Dict:
+    """The fields listed for a chat without opening its body."""
+    return {
+        "chat_id": chat["chat_id"],
+        "title": chat.get("title", ""),
+        "dts": chat.get("dts", 0),
+        "message_count": len(chat.get("messages", [])),
+    }
+
+
+def sort_key(summary: Dict) -> Tuple[int, str]:
+    """Listing order of a chat: by ``dts``, ties broken by ``chat_id``."""
+    return summary["dts"], summary["chat_id"]
+
+
+def encode_cursor(summary: Dict) -> str:
+    """Opaque pagination cursor pointing just past ``summary``."""
+    return base64.urlsafe_b64encode(json.dumps(list(sort_key(summary))).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Sort key encoded by ``encode_cursor``; ValueError if the cursor is malformed."""
+    try:
+        dts, chat_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(dts, (int, float)) or not isinstance(chat_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return dts, chat_id
+
+
+class SessionIndex:
+    """Chat summaries of one session, newest first, read without opening chat bodies.
+
+    Each save appends one summary line; the last line for a chat wins. The file
+    is replayed incrementally: only bytes appended since the previous read are
+    parsed, so other workers' writes are picked up cheaply, and a replaced file
+    (after compaction) is reloaded in full. Appends and compaction hold an
+    exclusive ``flock`` so concurrent workers never lose a line.
+    """
+
+    def __init__(self, session_dir: str):
+        """Bind to a session directory; nothing is read until first use."""
+        self.path = os.path.join(session_dir, INDEX_FILENAME)
+        self.lock_path = os.path.join(session_dir, LOCK_FILENAME)
+        self.entries: Dict[str, Dict] = {}
+        self._file_id = None
+        self._offset = 0
+        self._lines = 0
+        self._sorted: Optional[List[Dict]] = None  # oldest first
+        self._keys: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Whether the index file has been created."""
+        return os.path.exists(self.path)
+
+    def top(self, limit: Optional[int] = None) -> List[Dict]:
+        """Summaries sorted by ``dts`` then ``chat_id``, newest first."""
+        return self.page(limit)
+
+    def page(self, limit: Optional[int] = None, after: Optional[Tuple[int, str]] = None) -> List[Dict]:
+        """Up to ``limit`` summaries, newest first, starting after the sort key ``after``.
+
+        Keys are stable, so chats saved between two pages move to the front
+        instead of shifting later pages.
+        """
+        with self._lock:
+            self._refresh()
+            if self._sorted is None:
+                self._sorted = sorted(self.entries.values(), key=sort_key)
+                self._keys = [sort_key(summary) for summary in self._sorted]
+            stop = bisect.bisect_left(self._keys, tuple(after)) if after is not None else len(self._sorted)
+            start = max(stop - limit, 0) if limit else 0
+            return self._sorted[start:stop][::-1]
+
+    def version(self) -> str:
+        """Changes whenever the index does; used as the listing's ETag."""
+        with self._lock:
+            self._refresh()
+            if self._file_id is None:
+                return "0"
+            return f"{self._file_id[1]:x}-{self._offset:x}"
+
+    def get(self, chat_id: str) -> Optional[Dict]:
+        """The latest summary of one chat, or None."""
+        with self._lock:
+            self._refresh()
+            return self.entries.get(chat_id)
+
+    def upsert(self, summary: Dict) -> None:
+        """Record the latest summary of a chat, compacting the file once it is mostly superseded lines."""
+        line = json.dumps(summary, ensure_ascii=False) + "\n"
+        with self._lock, self._file_lock():
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._refresh()
+            if self._lines > len(self.entries) + COMPACT_SLACK:
+                self._compact()
+
+    def rebuild(self, summaries: List[Dict]) -> None:
+        """Replace the index with ``summaries`` (used for migration and repair)."""
+        with self._lock, self._file_lock():
+            self.entries = {summary["chat_id"]: summary for summary in summaries}
+            self._compact()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every worker writing this session's index."""
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Apply lines appended since the last read, or reload if the file was replaced."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._file_id is not None:
+                self._reset(None)
+            return
+
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self._offset:
+            self._reset(file_id)
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # leave a line still being written for next time
+        for raw in complete.splitlines():
+            try:
+                summary = json.loads(raw)
+            except ValueError:
+                continue
+            self.entries[summary["chat_id"]] = summary
+            self._lines += 1
+        self._offset += len(complete)
+        self._sorted = None
+
+    def _reset(self, file_id) -> None:
+        """Forget the replayed state so the file is read from the start."""
+        self.entries = {}
+        self._file_id = file_id
+        self._offset = 0
+        self._lines = 0
+        self._sorted = None
+
+    def _compact(self) -> None:
+        """Atomically rewrite the file with one line per chat."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for summary in self.entries.values():
+                f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        st = os.stat(self.path)
+        self._file_id = (st.st_dev, st.st_ino)
+        self._offset = st.st_size
+        self._lines = len(self.entries)
+        self._sorted = None
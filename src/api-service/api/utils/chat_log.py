@@ -0,0 +1,128 @@
+"""Chat storage as a JSON snapshot plus an append-only JSONL log of later changes."""
+
+import fcntl
+import json
+import os
+from typing import Dict, List, Optional
+
+# Logs shorter than this are never compacted; longer ones once they outgrow the snapshot
+COMPACT_MIN_BYTES = 64 * 1024
+
+
+def write_json_atomic(path: str, data: Dict) -> None:
+    """Write JSON through a fsynced temporary file and an atomic rename."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ChatLog:
+    """One chat on disk: ``<chat_id>.json`` snapshot and ``<chat_id>.log.jsonl`` appends.
+
+    A new chat is written as a snapshot in the original JSON layout. Each later
+    turn appends one line per new message plus a ``meta`` line for the updated
+    title and timestamp, with a single fsynced write, so a turn costs the size
+    of the new messages rather than of the whole chat. Reading replays the log
+    over the snapshot, skipping message ids already present and a torn last line
+    left by a crash. Once the log outgrows the snapshot it is folded into a new
+    snapshot (atomic rename) and truncated, keeping total write volume linear.
+    Writers hold an exclusive ``flock`` on the log and readers a shared one, so
+    a reader never sees a compacted snapshot next to the log it replaced, or
+    the reverse.
+    """
+
+    def __init__(self, snapshot_path: str):
+        """Bind to a chat's snapshot path; the log sits next to it."""
+        self.snapshot_path = snapshot_path
+        self.log_path = snapshot_path[:-len(".json")] + ".log.jsonl"
+
+    def exists(self) -> bool:
+        """Whether the chat has been written."""
+        return os.path.exists(self.snapshot_path)
+
+    def write(self, chat: Dict) -> None:
+        """Replace the chat with a fresh snapshot and an empty log."""
+        with open(self.log_path, "a", encoding="utf-8") as log:
+            fcntl.flock(log, fcntl.LOCK_EX)
+            write_json_atomic(self.snapshot_path, chat)
+            log.truncate(0)
+
+    def append(self, messages: List[Dict], meta: Dict) -> Dict:
+        """Append the messages not stored yet and the updated chat fields; return the chat as stored.
+
+        Messages are matched by ``message_id`` against the chat re-read under
+        the lock, so two turns saved from the same copy of a chat both land.
+        The log is compacted if it has grown large.
+        """
+        with open(self.log_path, "a", encoding="utf-8") as log:
+            fcntl.flock(log, fcntl.LOCK_EX)
+            chat = self._read()
+            if chat is None:
+                chat = {**meta, "messages": list(messages)}
+                write_json_atomic(self.snapshot_path, chat)
+                log.truncate(0)
+                return chat
+
+            stored = {message.get("message_id") for message in chat["messages"]}
+            new_messages = [message for message in messages if message.get("message_id") not in stored]
+            chat.update(meta)
+            chat["messages"].extend(new_messages)
+
+            lines = [json.dumps({"op": "meta", **meta}, ensure_ascii=False)]
+            lines += [json.dumps({"op": "message", "message": message}, ensure_ascii=False) for message in new_messages]
+            if log.tell() and self._last_byte() != b"\n":
+                lines.insert(0, "")  # end a torn line so it cannot swallow this record
+            log.write("\n".join(lines) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+
+            if log.tell() > max(COMPACT_MIN_BYTES, os.path.getsize(self.snapshot_path)):
+                write_json_atomic(self.snapshot_path, chat)
+                log.truncate(0)  # a crash before this only leaves records the replay skips
+        return chat
+
+    def _last_byte(self) -> bytes:
+        """Final byte of the log."""
+        with open(self.log_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1)
+
+    def read(self) -> Optional[Dict]:
+        """The chat with its log replayed, or None if it does not exist."""
+        if not self.exists():
+            return None
+        with open(self.log_path, "a+", encoding="utf-8") as log:
+            fcntl.flock(log, fcntl.LOCK_SH)
+            return self._read()
+
+    def _read(self) -> Optional[Dict]:
+        """Snapshot plus log replay; the caller holds a lock on the log."""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                chat = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                records = f.readlines()
+        except FileNotFoundError:
+            return chat
+
+        messages = chat.setdefault("messages", [])
+        seen = {message.get("message_id") for message in messages}
+        for line in records:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash
+            op = record.pop("op", None)
+            if op == "meta":
+                chat.update(record)
+            elif op == "message" and record["message"].get("message_id") not in seen:
+                messages.append(record["message"])
+                seen.add(record["message"].get("message_id"))
+        return chat
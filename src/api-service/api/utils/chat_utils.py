@@ -1,18 +1,33 @@
 """Chat history management utilities for saving, loading, and retrieving chat sessions."""
 
-import json
+import hashlib
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 import glob
 import traceback
 
+from api.utils.chat_index import SessionIndex, chat_summary, decode_cursor, encode_cursor
+from api.utils.chat_log import ChatLog
+
 class ChatHistoryManager:
-    """Manages saving and loading chat histories for different user sessions."""
+    """Manages saving and loading chat histories for different user sessions.
+
+    Each chat is a JSON snapshot in its session directory, followed by an
+    append-only log of later turns (see ``ChatLog``). A per-session index
+    (see ``SessionIndex``) holds the chat_id, title, dts and message count of
+    every chat, so listings pick the newest chats without opening the others.
+    Sessions saved before the index existed, or whose chat files were added or
+    removed behind its back, are re-indexed on first access, or in bulk with
+    ``tools/migrate_chat_history.py``.
+    """
 
     def __init__(self, model, history_dir: str = "chat-history"):
         """Initialize the chat history manager with the specified directory."""
         self.model = model
         self.history_dir = os.path.join(history_dir, model)
+        self._indexes: Dict[str, SessionIndex] = {}
+        self._indexes_lock = threading.Lock()
         self._ensure_directories()
 
     def _ensure_directories(self) -> None:
@@ -23,49 +38,137 @@ class ChatHistoryManager:
         """Get the full file path for a chat JSON file."""
         return os.path.join(self.history_dir, session_id, f"{chat_id}.json")
 
+    def _get_index(self, session_id: str) -> SessionIndex:
+        """The session's summary index, rebuilt from its chat files if it is missing or stale."""
+        with self._indexes_lock:
+            index = self._indexes.get(session_id)
+            first_use = index is None
+            if first_use:
+                chat_dir = os.path.join(self.history_dir, session_id)
+                os.makedirs(chat_dir, exist_ok=True)
+                index = self._indexes[session_id] = SessionIndex(chat_dir)
+        if not index.exists() or (first_use and self._is_stale(session_id, index)):
+            self.rebuild_index(session_id)
+        return index
+
+    def _is_stale(self, session_id: str, index: SessionIndex) -> bool:
+        """Whether the chat files on disk differ from the chats in the index.
+
+        Checked once per session and process, so chats written or deleted by a
+        deployment without the index are picked up without globbing every listing.
+        """
+        filepaths = glob.glob(os.path.join(self.history_dir, session_id, "*.json"))
+        chat_ids = {os.path.basename(filepath)[:-len(".json")] for filepath in filepaths}
+        return chat_ids != {summary["chat_id"] for summary in index.top()}
+
+    def rebuild_index(self, session_id: str) -> int:
+        """Re-index a session from its chat files and return the number of chats indexed."""
+        chat_dir = os.path.join(self.history_dir, session_id)
+        summaries = []
+        for filepath in glob.glob(os.path.join(chat_dir, "*.json")):
+            try:
+                summaries.append(chat_summary(ChatLog(filepath).read()))
+            except Exception as e:
+                print(f"Error indexing chat history from {filepath}: {str(e)}")
+        with self._indexes_lock:
+            index = self._indexes.setdefault(session_id, SessionIndex(chat_dir))
+        index.rebuild(summaries)
+        return len(summaries)
+
     def save_chat(self, chat_to_save: Dict, session_id: str) -> None:
-        """Save a chat to both memory and file, handling images separately."""
+        """Save a chat, appending only the messages that are not stored yet.
+
+        Stored messages are never dropped: a save from an outdated copy of the
+        chat adds its new messages after the ones saved in the meantime.
+        """
         chat_dir = os.path.join(self.history_dir, session_id)
         os.makedirs(chat_dir, exist_ok=True)
 
         filepath = self._get_chat_filepath(chat_to_save["chat_id"], session_id)
+        index = self._get_index(session_id)
+        chat_log = ChatLog(filepath)
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(chat_to_save, f, indent=2, ensure_ascii=False)
+            if chat_log.exists():
+                meta = {key: value for key, value in chat_to_save.items() if key != "messages"}
+                saved_chat = chat_log.append(chat_to_save.get("messages", []), meta)
+            else:
+                chat_log.write(chat_to_save)
+                saved_chat = chat_to_save
         except Exception as e:
             print(f"Error saving chat {chat_to_save['chat_id']}: {str(e)}")
             traceback.print_exc()
             raise e
 
+        index.upsert(chat_summary(saved_chat))
+
     def get_chat(self, chat_id: str, session_id: str) -> Optional[Dict]:
         """Get a specific chat by ID."""
         filepath = os.path.join(self.history_dir, session_id, f"{chat_id}.json")
         chat_data = {}
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                chat_data = json.load(f)
+            chat_data = ChatLog(filepath).read() or {}
         except Exception as e:
             print(f"Error loading chat history from {filepath}: {str(e)}")
             traceback.print_exc()
         return chat_data
 
     def get_recent_chats(self, session_id: str, limit: Optional[int] = None) -> List[Dict]:
-        """Get recent chats, optionally limited to a specific number."""
-        chat_dir = os.path.join(self.history_dir, session_id)
-        os.makedirs(chat_dir, exist_ok=True)
+        """Get recent chats, optionally limited to a specific number.
+
+        The index picks the newest ``limit`` chats, so only their files are read.
+        """
         recent_chats = []
-        chat_files = glob.glob(os.path.join(chat_dir, "*.json"))
-        for filepath in chat_files:
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    chat_data = json.load(f)
-                    recent_chats.append(chat_data)
-            except Exception as e:
-                print(f"Error loading chat history from {filepath}: {str(e)}")
-                traceback.print_exc()
+        for summary in self._get_index(session_id).top(limit):
+            chat_data = self.get_chat(summary["chat_id"], session_id)
+            if chat_data:
+                recent_chats.append(chat_data)
+        return recent_chats
 
-        recent_chats.sort(key=lambda x: x.get('dts', 0), reverse=True)
-        if limit:
-            return recent_chats[:limit]
+    def get_recent_chat_summaries(self, session_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get chat_id, title, dts and message count of the most recent chats, newest first."""
+        return self._get_index(session_id).top(limit)
 
-        return recent_chats
+    def get_chat_page(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        summary: bool = False
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of chats, newest first, and the cursor of the next page (None on the last).
+
+        ``cursor`` comes from a previous page; a malformed one raises ValueError.
+        With ``summary`` only index entries are returned and no chat file is read.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        index = self._get_index(session_id)
+        # One extra entry tells whether another page follows
+        summaries = index.page(limit + 1 if limit else None, after)
+        next_cursor = None
+        if limit and len(summaries) > limit:
+            summaries = summaries[:limit]
+            next_cursor = encode_cursor(summaries[-1])
+
+        if summary:
+            return summaries, next_cursor
+        chats = []
+        for entry in summaries:
+            chat_data = self.get_chat(entry["chat_id"], session_id)
+            if chat_data:
+                chats.append(chat_data)
+        return chats, next_cursor
+
+    def get_session_version(self, session_id: str) -> str:
+        """Token that changes whenever any chat of the session is saved."""
+        return self._get_index(session_id).version()
+
+    def get_page_etag(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        summary: bool = False
+    ) -> str:
+        """ETag of a ``get_chat_page`` result: the session version plus a digest of the query."""
+        query = hashlib.sha1(f"{limit}:{cursor}:{summary}".encode()).hexdigest()[:12]
+        return f'"{self.get_session_version(session_id)}-{query}"'
@@ -0,0 +1,149 @@
+"""LRU cache for query embeddings, optionally persisted to a local JSONL file."""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key text: Unicode-normalized, case-folded, with whitespace collapsed."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+class EmbeddingCache:
+    """Memoizes an embedding function by normalized text, model and dimensionality.
+
+    Entries are evicted least recently used first beyond ``max_entries``. With a
+    ``path``, every new embedding is appended to a JSONL file that is replayed on
+    start-up, so repeated queries stay free across restarts; ``save`` compacts the
+    file to the live entries. Lines written for another model or dimensionality
+    are ignored. The hit counter and the mean latency of misses give an estimate
+    of the embedding time saved.
+    """
+
+    def __init__(
+        self,
+        embed_func: Callable[[str], List[float]],
+        model: str,
+        dimension: int,
+        max_entries: int = 4096,
+        path: Optional[str] = None
+    ):
+        """Wrap ``embed_func`` and load any persisted entries for this model."""
+        self.embed_func = embed_func
+        self.model = model
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.miss_secs = 0.0
+        if path:
+            self._load()
+
+    def embed(self, text: str) -> List[float]:
+        """Embedding of ``text``, computed once per normalized text."""
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        started = time.perf_counter()
+        vector = list(self.embed_func(text))
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.misses += 1
+            self.miss_secs += elapsed
+            self._store(key, vector)
+        self._append(key, vector)
+        return vector
+
+    def warm_up(self, texts: Iterable[str]) -> int:
+        """Embed every text not cached yet and return how many were computed."""
+        computed = 0
+        for text in texts:
+            with self._lock:
+                cached = normalize_query(text) in self._entries
+            if not cached:
+                self.embed(text)
+                computed += 1
+        return computed
+
+    def save(self) -> None:
+        """Rewrite the persistence file with only the live entries."""
+        if not self.path:
+            return
+        with self._lock:
+            lines = [self._line(key, vector) for key, vector in self._entries.items()]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict:
+        """Size, hit rate and estimated embedding time saved."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            mean_miss_ms = 1000 * self.miss_secs / self.misses if self.misses else 0.0
+            return {
+                "model": self.model,
+                "dimension": self.dimension,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "mean_miss_ms": round(mean_miss_ms, 1),
+                "saved_ms_estimate": round(self.hits * mean_miss_ms, 1),
+            }
+
+    def _store(self, key: str, vector: List[float]) -> None:
+        """Insert as most recently used and evict beyond ``max_entries``."""
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _line(self, key: str, vector: List[float]) -> str:
+        """One JSONL record."""
+        return json.dumps({"model": self.model, "dimension": self.dimension, "text": key, "embedding": vector}) + "\n"
+
+    def _append(self, key: str, vector: List[float]) -> None:
+        """Persist a new entry; a failed write only costs a recomputation after restart."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(self._line(key, vector))
+        except OSError as e:
+            logger.warning(f"Could not persist embedding to {self.path}: {e}")
+
+    def _load(self) -> None:
+        """Replay the persistence file, skipping other models and corrupt lines."""
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-append
+                if record.get("model") == self.model and record.get("dimension") == self.dimension:
+                    self._store(record["text"], record["embedding"])
@@ -0,0 +1,116 @@
+"""In-memory catalog of a folder of JSON documents, served as pre-serialized responses."""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def serialize(data) -> bytes:
+    """JSON body encoded the way FastAPI's JSONResponse encodes it."""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class JsonCatalog:
+    """The ``*.json`` documents of a folder, keyed by file name and sorted by ``dts``, newest first.
+
+    Documents are parsed once and kept with their serialized bodies, so list and
+    get requests are dictionary lookups. At most every ``refresh_secs`` a request
+    re-stats the folder and re-parses only files whose mtime or size changed,
+    dropping deleted ones; list bodies are rebuilt only after such a change.
+    Files that fail to parse are skipped, as the per-request loaders did.
+    """
+
+    def __init__(self, folder: str, refresh_secs: float = 2.0):
+        """Bind to ``folder``; it is scanned on first use."""
+        self.folder = folder
+        self.refresh_secs = refresh_secs
+        self._files: Dict[str, Tuple[int, int]] = {}  # id -> (mtime_ns, size)
+        self._documents: Dict[str, Dict] = {}
+        self._bodies: Dict[str, bytes] = {}
+        self._order: List[str] = []
+        self._lists: Dict[Optional[int], bytes] = {}
+        self._scanned_at = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def list_body(self, limit: Optional[int] = None) -> bytes:
+        """Serialized list of the newest ``limit`` documents (all when None)."""
+        with self._lock:
+            self._maybe_refresh()
+            limit = limit if limit and limit < len(self._order) else None
+            body = self._lists.get(limit)
+            if body is None:
+                ids = self._order[:limit] if limit else self._order
+                body = self._lists[limit] = b"[" + b",".join(self._bodies[doc_id] for doc_id in ids) + b"]"
+            return body
+
+    def get_body(self, doc_id: str) -> Optional[bytes]:
+        """Serialized document with file name ``doc_id``, or None."""
+        with self._lock:
+            self._maybe_refresh()
+            return self._bodies.get(doc_id)
+
+    def documents(self) -> List[Dict]:
+        """The parsed documents, newest first."""
+        with self._lock:
+            self._maybe_refresh()
+            return [self._documents[doc_id] for doc_id in self._order]
+
+    def refresh(self) -> bool:
+        """Rescan the folder now and return whether anything changed."""
+        with self._lock:
+            return self._refresh()
+
+    def _maybe_refresh(self) -> None:
+        """Rescan if the last scan is older than ``refresh_secs``."""
+        now = time.monotonic()
+        if self._scanned_at is None or now - self._scanned_at >= self.refresh_secs:
+            self._refresh()
+
+    def _refresh(self) -> bool:
+        """Re-parse new and modified files and drop deleted ones."""
+        self._scanned_at = time.monotonic()
+        seen = {}
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                st = entry.stat()
+                seen[entry.name[:-len(".json")]] = (entry.path, (st.st_mtime_ns, st.st_size))
+
+        changed = False
+        for doc_id in set(self._files) - set(seen):
+            del self._files[doc_id]
+            self._documents.pop(doc_id, None)
+            self._bodies.pop(doc_id, None)
+            changed = True
+        for doc_id, (path, signature) in seen.items():
+            if self._files.get(doc_id) == signature:
+                continue
+            self._files[doc_id] = signature
+            changed = True
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    document = json.load(f)
+                if not isinstance(document, dict):
+                    raise ValueError("expected a JSON object")
+                self._documents[doc_id] = document
+                self._bodies[doc_id] = serialize(document)
+                self.reloads += 1
+            except Exception as e:
+                logger.debug(f"Error loading {path}: {str(e)}")
+                self._documents.pop(doc_id, None)
+                self._bodies.pop(doc_id, None)
+
+        if changed:
+            self._order = sorted(self._documents, key=lambda doc_id: (self._documents[doc_id].get("dts", 0), doc_id),
+                                 reverse=True)
+            self._lists = {}
+        return changed
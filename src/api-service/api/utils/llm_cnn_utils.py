@@ -1,11 +1,18 @@
 """Utilities for managing LLM chat sessions, including generation and rebuilding based on history."""
 
+import asyncio
 import os
-from typing import Dict, List, Optional
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 from tempfile import TemporaryDirectory
 
 from vertexai.generative_models import GenerativeModel, ChatSession, Part, Content
 
+from api.utils.session_history import history_turns
+from api.utils.session_store import SessionStore, create_session_store
+
 # Setup
 GCP_PROJECT = os.environ.get("GCP_PROJECT")
 if not GCP_PROJECT:
@@ -53,21 +60,39 @@ generative_model = GenerativeModel(
     system_instruction=[SYSTEM_INSTRUCTION]
 )
 
-chat_sessions: Dict[str, ChatSession] = {}
+# Live sessions by chat_id, bounded and evicting (see SESSION_STORE_* settings);
+# an evicted session is rebuilt from the saved chat history on its next message
+chat_sessions: SessionStore = create_session_store()
+
+# Vertex AI calls block, so they run on a dedicated pool instead of the event loop
+LLM_WORKERS = int(os.environ.get("LLM_WORKERS", 16))
+llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="vertex")
+
+# One lock per session: a ChatSession appends to its history and must not send two messages at once
+_session_locks = weakref.WeakKeyDictionary()
+
+# Phrases marking an answer that should be replaced by the generic fallback
+fallback_phrases = [
+    "not enough information", "insufficient data",
+    "cannot answer", "fragmented", "unclear"
+]
+
+fallback_info = """
+        Although detailed data on this bird may not be available, most species typically exhibit
+        region-specific behaviors, seasonal migration patterns, and specialized feeding habits
+        adapted to their local environment.
+        """
+
+# Exchanges replayed into a rebuilt session (0 = all); older ones are summarized or dropped
+REBUILD_MAX_TURNS = int(os.environ.get("CHAT_REBUILD_MAX_TURNS", 20))
+REBUILD_SUMMARIZE = os.environ.get("CHAT_REBUILD_SUMMARIZE", "1") == "1"
 
 def create_chat_session() -> ChatSession:
     """Create and start a new chat session."""
     return generative_model.start_chat()
 
-def generate_chat_response(
-    chat_session: ChatSession,
-    message: Dict,
-    priming_prompt: Optional[str] = None,
-    collection=None
-) -> str:
-    """Generate a chat response, optionally using a tool for bird info retrieval."""
-    from api.utils.agent_tools import bird_expert_tool, execute_function_calls, generate_query_embedding
-
+def build_prompt(message: Dict, priming_prompt: Optional[str] = None) -> str:
+    """Join the optional priming text and the user content into one prompt."""
     message_parts = []
 
     if priming_prompt:
@@ -77,7 +102,30 @@ def generate_chat_response(
     if not message_parts:
         raise ValueError("Message must contain either priming text or user content")
 
-    user_prompt_text = " ".join(message_parts)
+    return " ".join(message_parts)
+
+def tool_results_message(user_prompt_text: str, tool_outputs: List[Part]) -> Content:
+    """Follow-up message combining the user question with the tool outputs."""
+    return Content(role="user", parts=[
+        Part.from_text(f"User question: {user_prompt_text}"),
+        Part.from_text("Internal search results (may be partial):"),
+        *tool_outputs,
+        Part.from_text(
+            "Please combine your own bird expertise with the search results "
+            "to provide a complete answer."
+        )
+    ])
+
+def generate_chat_response(
+    chat_session: ChatSession,
+    message: Dict,
+    priming_prompt: Optional[str] = None,
+    collection=None
+) -> str:
+    """Generate a chat response, optionally using a tool for bird info retrieval."""
+    from api.utils.agent_tools import bird_expert_tool, execute_function_calls, generate_query_embedding
+
+    user_prompt_text = build_prompt(message, priming_prompt)
 
     initial_response = chat_session.send_message(
         user_prompt_text,
@@ -94,18 +142,8 @@ def generate_chat_response(
             embed_func=generate_query_embedding
         )
 
-        combined_parts = [
-            Part.from_text(f"User question: {user_prompt_text}"),
-            Part.from_text("Internal search results (may be partial):"),
-            *tool_outputs,
-            Part.from_text(
-                "Please combine your own bird expertise with the search results "
-                "to provide a complete answer."
-            )
-        ]
-
         final_response = chat_session.send_message(
-            Content(role="user", parts=combined_parts),
+            tool_results_message(user_prompt_text, tool_outputs),
             generation_config=generation_config
         )
 
@@ -113,17 +151,8 @@ def generate_chat_response(
     else:
         final_text = initial_response.text.strip()
 
-    fallback_phrases = [
-        "not enough information", "insufficient data",
-        "cannot answer", "fragmented", "unclear"
-    ]
     if any(p in final_text.lower() for p in fallback_phrases):
         print("Using external info")
-        fallback_info = """
-        Although detailed data on this bird may not be available, most species typically exhibit
-        region-specific behaviors, seasonal migration patterns, and specialized feeding habits
-        adapted to their local environment.
-        """
         fallback_response = chat_session.send_message(
             fallback_info,
             generation_config=generation_config
@@ -132,22 +161,105 @@ def generate_chat_response(
 
     return final_text
 
+def _chunk_text(chunk) -> str:
+    """Text of a streamed response chunk; chunks carrying only a function call have none."""
+    try:
+        return chunk.text
+    except (ValueError, AttributeError):
+        return ""
+
+def stream_chat_response(
+    chat_session: ChatSession,
+    message: Dict,
+    priming_prompt: Optional[str] = None,
+    collection=None
+) -> Iterator[Dict]:
+    """Streaming counterpart of ``generate_chat_response``.
+
+    Yields ``{"delta": text}`` as tokens arrive. If the finished answer matches a
+    fallback phrase, a final ``{"replace": text}`` carries the fallback answer that
+    supersedes everything streamed so far.
+    """
+    from api.utils.agent_tools import bird_expert_tool, execute_function_calls, generate_query_embedding
+
+    user_prompt_text = build_prompt(message, priming_prompt)
+
+    function_calls = []
+    streamed = []
+    for chunk in chat_session.send_message(
+        user_prompt_text, tools=[bird_expert_tool], generation_config=generation_config, stream=True
+    ):
+        if chunk.candidates:
+            function_calls.extend(chunk.candidates[0].function_calls)
+        text = _chunk_text(chunk)
+        if text:
+            streamed.append(text)
+            yield {"delta": text}
+
+    if function_calls and collection:
+        tool_outputs = execute_function_calls(
+            function_calls=function_calls,
+            collection=collection,
+            embed_func=generate_query_embedding
+        )
+        for chunk in chat_session.send_message(
+            tool_results_message(user_prompt_text, tool_outputs), generation_config=generation_config, stream=True
+        ):
+            text = _chunk_text(chunk)
+            if text:
+                streamed.append(text)
+                yield {"delta": text}
+
+    if any(p in "".join(streamed).lower() for p in fallback_phrases):
+        fallback_response = chat_session.send_message(fallback_info, generation_config=generation_config)
+        yield {"replace": fallback_response.text}
+
+def _session_lock(chat_session: ChatSession) -> asyncio.Lock:
+    """The lock serialising messages sent on ``chat_session``."""
+    lock = _session_locks.get(chat_session)
+    if lock is None:
+        lock = _session_locks[chat_session] = asyncio.Lock()
+    return lock
+
+async def generate_chat_response_async(
+    chat_session: ChatSession,
+    message: Dict,
+    priming_prompt: Optional[str] = None,
+    collection=None
+) -> str:
+    """``generate_chat_response`` on the LLM thread pool, leaving the event loop free."""
+    loop = asyncio.get_running_loop()
+    async with _session_lock(chat_session):
+        return await loop.run_in_executor(
+            llm_executor, partial(generate_chat_response, chat_session, message, priming_prompt, collection)
+        )
+
+async def stream_chat_response_async(
+    chat_session: ChatSession,
+    message: Dict,
+    priming_prompt: Optional[str] = None,
+    collection=None
+) -> AsyncIterator[Dict]:
+    """``stream_chat_response`` with every blocking step run on the LLM thread pool."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    async with _session_lock(chat_session):
+        events = stream_chat_response(chat_session, message, priming_prompt, collection)
+        while True:
+            event = await loop.run_in_executor(llm_executor, next, events, done)
+            if event is done:
+                return
+            yield event
+
+def history_contents(chat_history: List[Dict], max_turns: int = 0, summarize: bool = True) -> List[Content]:
+    """Convert a saved chat into Gemini ``Content`` history without calling the model (see ``history_turns``)."""
+    return [
+        Content(role=role, parts=[Part.from_text(text)])
+        for role, text in history_turns(chat_history, max_turns, summarize)
+    ]
+
 def rebuild_chat_session(chat_history: List[Dict]) -> ChatSession:
-    """Rebuild a chat session from a saved chat history."""
-    new_session = create_chat_session()
-
-    for message in chat_history:
-        if message["role"] == "user" and message.get("content"):
-            new_session.send_message(
-                message["content"],
-                generation_config=generation_config
-            )
-        elif message["role"] == "assistant" and "content" in message and "Identified:" in message["content"]:
-            content = message["content"]
-        elif message["role"] == "assistant" and message.get("content"):
-            new_session.send_message(
-                message["content"],
-                generation_config=generation_config
-            )
-
-    return new_session
+    """Rebuild a chat session from a saved chat history, without any model calls."""
+    return generative_model.start_chat(
+        history=history_contents(chat_history, REBUILD_MAX_TURNS, REBUILD_SUMMARIZE)
+    )
@@ -0,0 +1,50 @@
+"""Saved chat messages reshaped into the alternating turns an LLM session is rebuilt from."""
+
+from typing import Dict, List, Tuple
+
+SUMMARY_ACK = "Noted, I will keep that context in mind."
+
+
+def history_turns(chat_history: List[Dict], max_turns: int = 0, summarize: bool = True) -> List[Tuple[str, str]]:
+    """``(role, text)`` turns of a saved chat, in the shape Gemini's ``start_chat`` expects.
+
+    User messages become ``user`` turns and assistant messages ``model`` turns;
+    an audio-only message is represented by a note naming the recording.
+    Consecutive messages of the same role are merged so roles alternate, and the
+    history always starts with a user turn and ends with a model turn. With
+    ``max_turns`` only the last that many exchanges are kept; older user
+    questions are folded into a single summary exchange when ``summarize`` is
+    set, and dropped otherwise.
+    """
+    turns = []  # [role, [texts]]
+    for message in chat_history:
+        text = (message.get("content") or "").strip()
+        if message.get("role") == "user":
+            role = "user"
+            if not text and (message.get("audio") or message.get("audio_path") or message.get("name")):
+                text = f"[Audio recording uploaded: {message.get('name', 'audio')}]"
+        elif message.get("role") == "assistant":
+            role = "model"
+        else:
+            continue
+        if not text:
+            continue
+
+        if turns and turns[-1][0] == role:
+            turns[-1][1].append(text)
+        elif turns or role == "user":
+            turns.append([role, [text]])
+
+    if turns and turns[-1][0] == "user":
+        turns.pop()  # unanswered question, e.g. the request that failed
+
+    if max_turns and len(turns) > 2 * max_turns:
+        older, turns = turns[:-2 * max_turns], turns[-2 * max_turns:]
+        questions = [" ".join(texts)[:200] for role, texts in older if role == "user"]
+        if summarize and questions:
+            summary = "Summary of the earlier conversation. The user asked about:\n" + "\n".join(
+                f"- {question}" for question in questions
+            )
+            turns = [["user", [summary]], ["model", [SUMMARY_ACK]]] + turns
+
+    return [(role, "\n\n".join(texts)) for role, texts in turns]
@@ -0,0 +1,214 @@
+"""Bounded stores for live LLM chat sessions, rebuilt from chat history when evicted."""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def approx_session_bytes(chat_session) -> int:
+    """Rough memory footprint of a chat session: the text of its history plus a per-part overhead."""
+    total = 0
+    for content in getattr(chat_session, "history", None) or []:
+        for part in getattr(content, "parts", []):
+            try:
+                total += len(part.text.encode("utf-8"))
+            except (AttributeError, ValueError):  # function calls and responses carry no text
+                pass
+            total += 256
+    return total
+
+
+class SessionStore(ABC):
+    """Interface of a chat-session store: a mapping from chat_id to a live ChatSession.
+
+    A miss is never an error: callers rebuild the session from the saved chat
+    history and put it back.
+    """
+
+    @abstractmethod
+    def get(self, chat_id: str):
+        """The session for ``chat_id``, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __setitem__(self, chat_id: str, chat_session) -> None:
+        """Store or refresh the session for ``chat_id``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def pop(self, chat_id: str, default=None):
+        """Remove and return the session for ``chat_id``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Counters for the metrics endpoint."""
+        raise NotImplementedError
+
+    def __contains__(self, chat_id: str) -> bool:
+        return self.get(chat_id) is not None
+
+
+class LocalSessionStore(SessionStore):
+    """In-process LRU store with a sliding TTL and entry-count and approximate-byte bounds.
+
+    Entries are kept in access order, so the least recently used (and therefore
+    the first to expire) are at the front. Sizes come from
+    ``approx_session_bytes`` and are re-measured whenever a session is stored or
+    fetched, since its history grows with every message.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 256 * 1024 * 1024, ttl_secs: float = 3600):
+        """Set the bounds; ``max_bytes`` or ``ttl_secs`` of 0 disables that bound."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_secs = ttl_secs
+        self._entries = OrderedDict()  # chat_id -> [session, last_access, size]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"lru": 0, "bytes": 0, "ttl": 0}
+
+    def get(self, chat_id: str):
+        """The session for ``chat_id`` if present and not expired, refreshing its position and TTL."""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(chat_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(chat_id)
+            entry[1] = time.monotonic()
+            self._resize(entry, approx_session_bytes(entry[0]))
+            self._evict(keep=chat_id)
+            return entry[0]
+
+    def __setitem__(self, chat_id: str, chat_session) -> None:
+        """Store the session as most recently used and evict whatever no longer fits."""
+        size = approx_session_bytes(chat_session)
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.pop(chat_id, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+            self._entries[chat_id] = [chat_session, time.monotonic(), size]
+            self._bytes += size
+            self._evict(keep=chat_id)
+
+    def pop(self, chat_id: str, default=None):
+        """Remove and return the session for ``chat_id``."""
+        with self._lock:
+            entry = self._entries.pop(chat_id, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[2]
+            return entry[0]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Size, hit and eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "local",
+                "entries": len(self._entries),
+                "approx_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_secs": self.ttl_secs,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": dict(self.evictions),
+            }
+
+    def _resize(self, entry, size: int) -> None:
+        """Record a new size for an entry."""
+        self._bytes += size - entry[2]
+        entry[2] = size
+
+    def _expire(self, now: float) -> None:
+        """Drop entries idle for longer than the TTL, oldest first."""
+        if not self.ttl_secs:
+            return
+        while self._entries:
+            chat_id, entry = next(iter(self._entries.items()))
+            if now - entry[1] <= self.ttl_secs:
+                return
+            self._drop(chat_id, "ttl")
+
+    def _evict(self, keep: str) -> None:
+        """Evict least recently used entries until both bounds hold, never evicting ``keep``."""
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)), "lru")
+        while self.max_bytes and self._bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                return
+            self._drop(oldest, "bytes")
+
+    def _drop(self, chat_id: str, reason: str) -> None:
+        """Remove an entry and count why."""
+        entry = self._entries.pop(chat_id)
+        self._bytes -= entry[2]
+        self.evictions[reason] += 1
+
+
+class HistorySessionStore(SessionStore):
+    """Keeps nothing in process: every message rebuilds its session from the saved chat history.
+
+    Use this when replicas sit behind a load balancer without session affinity,
+    so the shared chat-history storage is the only source of truth.
+    """
+
+    def __init__(self):
+        """Start the miss counter."""
+        self.misses = 0
+
+    def get(self, chat_id: str):
+        """Always a miss."""
+        self.misses += 1
+        return None
+
+    def __setitem__(self, chat_id: str, chat_session) -> None:
+        """Discard the session."""
+
+    def pop(self, chat_id: str, default=None):
+        """Nothing to remove."""
+        return default
+
+    def __len__(self) -> int:
+        return 0
+
+    def stats(self) -> Dict:
+        """Only misses are counted."""
+        return {"backend": "history", "entries": 0, "misses": self.misses}
+
+
+# Available backends, chosen with SESSION_STORE_BACKEND
+SESSION_STORES = {
+    "local": LocalSessionStore,
+    "history": HistorySessionStore,
+}
+
+
+def create_session_store(backend: Optional[str] = None) -> SessionStore:
+    """Build the configured store from the SESSION_STORE_* environment variables."""
+    backend = backend or os.environ.get("SESSION_STORE_BACKEND", "local")
+    if backend not in SESSION_STORES:
+        raise ValueError(f"SESSION_STORE_BACKEND must be one of {sorted(SESSION_STORES)}, got {backend!r}")
+    if backend == "local":
+        return LocalSessionStore(
+            max_entries=int(os.environ.get("SESSION_STORE_MAX_ENTRIES", 1000)),
+            max_bytes=int(os.environ.get("SESSION_STORE_MAX_MB", 256)) * 1024 * 1024,
+            ttl_secs=float(os.environ.get("SESSION_STORE_TTL_SECS", 3600))
+        )
+    return SESSION_STORES[backend]()
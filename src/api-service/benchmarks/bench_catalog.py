@@ -0,0 +1,105 @@
+"""Bird map/sound endpoint cost: per-request disk loading against the in-memory catalog.
+
+Writes ``--docs`` JSON documents shaped like the bird_sounds metadata into a
+temporary folder, then times the list (``--limit``) and get handlers two ways:
+the previous implementation, which globbed and parsed every file and let
+FastAPI serialize the result on each request, and ``JsonCatalog``, which
+returns pre-serialized bodies. A final row shows the cost of a rescan that
+finds one modified file.
+
+Run from src/api-service:
+    python -m benchmarks.bench_catalog --docs 500 --limit 20
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from api.utils.json_catalog import JsonCatalog, serialize
+
+
+def legacy_list(folder, limit):
+    """The list handler as implemented before the catalog, including response serialization."""
+    documents = []
+    for file_path in glob.glob(os.path.join(folder, "*.json")):
+        with open(file_path, "r", encoding="utf-8") as f:
+            documents.append(json.load(f))
+    documents.sort(key=lambda x: x.get("dts", 0), reverse=True)
+    return serialize(documents[:limit] if limit else documents)
+
+
+def legacy_get(folder, doc_id):
+    """The get handler as implemented before the catalog, including response serialization."""
+    file_path = os.path.join(folder, f"{doc_id}.json")
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        return serialize(json.load(f))
+
+
+def populate(folder, n_docs):
+    """Write ``n_docs`` metadata documents and return their ids."""
+    ids = []
+    for i in range(n_docs):
+        doc_id = str(uuid.uuid4())
+        ids.append(doc_id)
+        with open(os.path.join(folder, f"{doc_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "id": doc_id,
+                "dts": 1736313600 + i,
+                "title": f"Species {i}",
+                "duration": "00:00:34",
+                "audio": f"{doc_id}-EN.mp3",
+                "image": "species.jpg",
+                "caption": f"Species {i}, Photography by Someone"
+            }, f, indent=4)
+    return ids
+
+
+def timed(func, repeats):
+    """Median latency of ``func`` in microseconds."""
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(1e6 * (time.perf_counter() - started))
+    return statistics.median(latencies)
+
+
+def main():
+    """Populate a folder and print the median latency of each handler."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=500, help="Documents in the folder")
+    parser.add_argument("--limit", type=int, default=20, help="Documents listed")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed calls per handler")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        ids = populate(folder, args.docs)
+        catalog = JsonCatalog(folder, refresh_secs=3600)
+        assert catalog.list_body(args.limit) == legacy_list(folder, args.limit)
+
+        def touch_and_rescan():
+            os.utime(os.path.join(folder, f"{random.choice(ids)}.json"), ns=(time.time_ns(), time.time_ns()))
+            catalog.refresh()
+
+        results = [
+            ("disk list", timed(lambda: legacy_list(folder, args.limit), args.repeats)),
+            ("catalog list", timed(lambda: catalog.list_body(args.limit), args.repeats)),
+            ("disk get", timed(lambda: legacy_get(folder, random.choice(ids)), args.repeats)),
+            ("catalog get", timed(lambda: catalog.get_body(random.choice(ids)), args.repeats)),
+            ("catalog rescan", timed(touch_and_rescan, args.repeats)),
+        ]
+
+    for name, median_us in results:
+        print(f"{name:>15} {median_us:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Chat listing latency: glob-and-parse every chat against the per-session index.
+
+Writes ``--chats`` chats into a temporary session, each carrying ``--audio-kb``
+kilobytes of audio, then times listing the newest ``--limit`` chats three ways:
+the previous glob-and-parse implementation, indexed summaries, and indexed full
+chats. The audio is stored the way chats used to keep it, as an inline data
+URL, or with ``--blob-store`` in the audio blob store, referenced by
+``audio_path``; the size of each listing's JSON response is printed as well.
+
+Run from src/api-service:
+    python -m benchmarks.bench_chat_history --chats 10000 --limit 20
+    python -m benchmarks.bench_chat_history --chats 10000 --limit 20 --blob-store
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from api.utils.blob_store import LocalBlobStore
+from api.utils.chat_utils import ChatHistoryManager
+
+SESSION_ID = "bench-session"
+
+
+def legacy_recent_chats(chat_dir, limit):
+    """The listing as implemented before the index: parse every file, sort, slice."""
+    chats = []
+    for filepath in glob.glob(os.path.join(chat_dir, "*.json")):
+        with open(filepath, "r", encoding="utf-8") as f:
+            chats.append(json.load(f))
+    chats.sort(key=lambda chat: chat.get("dts", 0), reverse=True)
+    return chats[:limit]
+
+
+def populate(manager, n_chats, audio_kb, blob_store=None):
+    """Save ``n_chats`` two-message chats with distinct timestamps and distinct audio."""
+    for i in range(n_chats):
+        audio = os.urandom(audio_kb * 1024)
+        if blob_store is None:
+            user_audio = {"audio": "data:audio/mpeg;base64," + base64.b64encode(audio).decode()}
+        else:
+            user_audio = {"audio_path": "audio/" + blob_store.put(audio, "audio/mpeg")}
+        manager.save_chat({
+            "chat_id": str(uuid.uuid4()),
+            "title": f"Chat {i}",
+            "dts": 1_700_000_000 + i,
+            "messages": [
+                {"message_id": str(uuid.uuid4()), "role": "user", **user_audio, "name": "a.mp3", "content": ""},
+                {"message_id": str(uuid.uuid4()), "role": "assistant", "content": "The species identified is X."},
+            ],
+        }, SESSION_ID)
+
+
+def timed(func, repeats):
+    """Median latency of ``func`` in milliseconds and the size of its result as JSON."""
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        latencies.append(1000 * (time.perf_counter() - started))
+    return statistics.median(latencies), len(json.dumps(result))
+
+
+def main():
+    """Populate a session and print the median latency of each listing."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=10000, help="Chats in the session")
+    parser.add_argument("--audio-kb", type=int, default=16, help="Audio payload per chat")
+    parser.add_argument("--limit", type=int, default=20, help="Chats listed")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed listings per method")
+    parser.add_argument("--blob-store", action="store_true", help="Store audio out of line instead of inline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as history_dir:
+        manager = ChatHistoryManager(model="bench", history_dir=history_dir)
+        blob_store = LocalBlobStore(os.path.join(history_dir, "blobs")) if args.blob_store else None
+        started = time.perf_counter()
+        populate(manager, args.chats, args.audio_kb, blob_store)
+        print(f"Saved {args.chats} chats in {time.perf_counter() - started:.1f} s")
+
+        chat_dir = os.path.join(manager.history_dir, SESSION_ID)
+        fresh = ChatHistoryManager(model="bench", history_dir=history_dir)  # cold index, as after a restart
+        results = [
+            ("glob and parse all", timed(lambda: legacy_recent_chats(chat_dir, args.limit), args.repeats)),
+            ("index, cold", timed(lambda: ChatHistoryManager("bench", history_dir)
+                                  .get_recent_chat_summaries(SESSION_ID, args.limit), args.repeats)),
+            ("index summaries", timed(lambda: fresh.get_recent_chat_summaries(SESSION_ID, args.limit), args.repeats)),
+            ("index full chats", timed(lambda: fresh.get_recent_chats(SESSION_ID, args.limit), args.repeats)),
+        ]
+
+    for name, (median_ms, response_bytes) in results:
+        print(f"{name:>20} {median_ms:>10.2f} ms {response_bytes / 1024:>10.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
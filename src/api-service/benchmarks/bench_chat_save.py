@@ -0,0 +1,88 @@
+"""Per-turn save cost as a chat grows: full JSON rewrite against the append-only log.
+
+Grows one chat to ``--turns`` turns (a user message with an audio data URL of
+``--audio-kb`` kilobytes and an assistant answer each), saving after every turn
+the way the chat endpoints do. The previous implementation rewrote the whole
+file, so its per-turn cost grows with the chat; the log appends only the new
+messages. Bytes written are measured from file sizes after each save.
+
+Run from src/api-service:
+    python -m benchmarks.bench_chat_save --turns 200 --audio-kb 16
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from api.utils.chat_log import ChatLog
+from api.utils.chat_utils import ChatHistoryManager
+
+SESSION_ID = "bench-session"
+
+
+def legacy_save(manager, chat):
+    """The save as implemented before the log: rewrite the whole chat file."""
+    filepath = os.path.join(manager.history_dir, SESSION_ID, f"{chat['chat_id']}.json")
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(chat, f, indent=2, ensure_ascii=False)
+
+
+def chat_files_size(manager, chat_id):
+    """Bytes currently on disk for the chat's snapshot and for its log."""
+    chat_log = ChatLog(os.path.join(manager.history_dir, SESSION_ID, f"{chat_id}.json"))
+    return tuple(os.path.getsize(path) if os.path.exists(path) else 0
+                 for path in (chat_log.snapshot_path, chat_log.log_path))
+
+
+def grow_chat(save, manager, turns, audio, rewrites):
+    """Save a chat after each of ``turns`` turns; return latencies (ms) and bytes written.
+
+    A save counts the whole snapshot when it was rewritten (always, with
+    ``rewrites``) plus whatever was appended to the log.
+    """
+    chat = {"chat_id": str(uuid.uuid4()), "title": "Bench chat", "dts": 1_700_000_000, "messages": []}
+    latencies, written, previous = [], 0, (0, 0)
+    for i in range(turns):
+        chat["messages"].append({"message_id": str(uuid.uuid4()), "role": "user", "audio": audio, "name": "a.mp3"})
+        chat["messages"].append({"message_id": str(uuid.uuid4()), "role": "assistant", "content": "Answer. " * 100})
+        chat["dts"] += 1
+        started = time.perf_counter()
+        save(chat)
+        latencies.append(1000 * (time.perf_counter() - started))
+        snapshot, log = chat_files_size(manager, chat["chat_id"])
+        if rewrites or snapshot != previous[0]:
+            written += snapshot
+        written += log - previous[1] if log >= previous[1] else log
+        previous = (snapshot, log)
+    return latencies, written
+
+
+def main():
+    """Grow a chat with each save path and print latency and write volume."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200, help="Turns in the chat")
+    parser.add_argument("--audio-kb", type=int, default=16, help="Audio payload per user message")
+    args = parser.parse_args()
+
+    audio = "data:audio/mpeg;base64," + base64.b64encode(os.urandom(args.audio_kb * 1024)).decode()
+    with tempfile.TemporaryDirectory() as history_dir:
+        manager = ChatHistoryManager(model="bench", history_dir=history_dir)
+        os.makedirs(os.path.join(manager.history_dir, SESSION_ID), exist_ok=True)
+        results = [
+            ("full rewrite", grow_chat(lambda chat: legacy_save(manager, chat), manager, args.turns, audio, True)),
+            ("append log", grow_chat(lambda chat: manager.save_chat(chat, SESSION_ID), manager, args.turns, audio, False)),
+        ]
+
+    print(f"{'':>14} {'p50 ms':>8} {'last 10 ms':>11} {'MB written':>11}")
+    for name, (latencies, written) in results:
+        print(f"{name:>14} {statistics.median(latencies):>8.2f} "
+              f"{statistics.mean(latencies[-10:]):>11.2f} {written / 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
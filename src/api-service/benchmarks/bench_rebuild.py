@@ -0,0 +1,58 @@
+"""Chat session rebuild latency against history length.
+
+Builds synthetic saved chats of increasing length and times
+``rebuild_chat_session`` on each. ``ChatSession.send_message`` is patched to count
+calls, so the benchmark never reaches Vertex AI and shows that the rebuild makes
+no model calls: replaying history used to cost one generation per message.
+
+Run from src/api-service (GCP_PROJECT must be set, no credentials are used):
+    python -m benchmarks.bench_rebuild --lengths 2 10 30 100 300 --repeats 50
+"""
+
+import argparse
+import statistics
+import time
+from unittest.mock import patch
+
+from vertexai.generative_models import ChatSession
+
+from api.utils.llm_cnn_utils import REBUILD_MAX_TURNS, rebuild_chat_session
+
+
+def synthetic_chat(n_messages):
+    """Saved chat messages alternating user questions and assistant answers."""
+    messages = []
+    for i in range(n_messages):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"Question {i} about the Andean condor's range?", "name": "a.mp3"})
+        else:
+            messages.append({"role": "assistant", "content": f"Answer {i}: " + "The condor soars over the Andes. " * 20})
+    return messages
+
+
+def main():
+    """Time the rebuild for each history length and print one row each."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="+", default=[2, 10, 30, 100, 300], help="Messages per chat")
+    parser.add_argument("--repeats", type=int, default=50, help="Rebuilds timed per length")
+    args = parser.parse_args()
+
+    calls = []
+    with patch.object(ChatSession, "send_message", side_effect=lambda *a, **k: calls.append(a)):
+        print(f"max turns kept: {REBUILD_MAX_TURNS or 'all'}")
+        print(f"{'messages':>9} {'p50 ms':>8} {'max ms':>8} {'history':>8} {'LLM calls':>10}")
+        for length in args.lengths:
+            chat = synthetic_chat(length)
+            latencies = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                session = rebuild_chat_session(chat)
+                latencies.append(1000 * (time.perf_counter() - started))
+            print(
+                f"{length:>9} {statistics.median(latencies):>8.3f} {max(latencies):>8.3f} "
+                f"{len(session.history):>8} {len(calls):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
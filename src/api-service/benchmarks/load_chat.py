@@ -0,0 +1,100 @@
+"""Load test: text-only chat latency while audio analyses are in flight.
+
+Measures text-chat latency against a running api-service twice: on its own, then
+while ``--audio-requests`` audio chats are being identified by birdnet_app. With
+the async BirdNET client the two latency distributions should be close; a
+blocking call to birdnet_app shows up as text requests queueing behind every
+analysis.
+
+By default the text request lists the session's chats, which exercises the event
+loop without calling the LLM; pass ``--message`` to start real text chats instead.
+
+Run against the compose stack:
+    python -m benchmarks.load_chat --url http://localhost:9000 --audio ../../tests/test.mp3
+"""
+
+import argparse
+import asyncio
+import base64
+import time
+import uuid
+
+import httpx
+import numpy as np
+
+CHATS_PATH = "/api/llm-cnn/chats"
+
+
+async def timed(request):
+    """Await a request and return ``(latency_ms, status_code)``."""
+    started = time.perf_counter()
+    response = await request
+    return 1000 * (time.perf_counter() - started), response.status_code
+
+
+def text_request(client, headers, message):
+    """A text-only chat request: a new chat with ``message``, or the chat listing."""
+    if message:
+        return client.post(CHATS_PATH, json={"content": message}, headers=headers)
+    return client.get(CHATS_PATH, headers=headers)
+
+
+async def text_latencies(client, headers, count, interval, message):
+    """Send ``count`` text requests ``interval`` seconds apart and time each one."""
+    tasks = []
+    for _ in range(count):
+        tasks.append(asyncio.create_task(timed(text_request(client, headers, message))))
+        await asyncio.sleep(interval)
+    return await asyncio.gather(*tasks)
+
+
+def summary(label, results):
+    """One line with latency percentiles and the number of failed requests."""
+    latencies = [latency for latency, _ in results]
+    failures = sum(1 for _, status in results if status >= 400)
+    return (
+        f"{label:>22} n={len(results):>4} p50={np.percentile(latencies, 50):>8.1f} ms "
+        f"p95={np.percentile(latencies, 95):>8.1f} ms max={max(latencies):>8.1f} ms failed={failures}"
+    )
+
+
+async def run(args):
+    """Run the baseline and the loaded phase and print both summaries."""
+    with open(args.audio, "rb") as f:
+        audio = "data:audio/mpeg;base64," + base64.b64encode(f.read()).decode()
+    headers = {"X-Session-ID": f"load-test-{uuid.uuid4()}"}
+    timeout = httpx.Timeout(args.timeout)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+        baseline = await text_latencies(client, headers, args.text_requests, args.interval, args.message)
+
+        audio_tasks = [
+            asyncio.create_task(timed(client.post(
+                CHATS_PATH, json={"content": "audio uploaded", "audio": audio, "name": "load.mp3"}, headers=headers
+            )))
+            for _ in range(args.audio_requests)
+        ]
+        await asyncio.sleep(args.interval)  # let the analyses reach birdnet_app first
+        loaded = await text_latencies(client, headers, args.text_requests, args.interval, args.message)
+        audio_results = await asyncio.gather(*audio_tasks)
+
+    print(summary("text, idle", baseline))
+    print(summary("text, audio in flight", loaded))
+    print(summary("audio chats", audio_results))
+
+
+def main():
+    """Parse arguments and run the load test."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:9000", help="api-service base URL")
+    parser.add_argument("--audio", required=True, help="Audio file sent with each audio chat")
+    parser.add_argument("--audio-requests", type=int, default=16, help="Concurrent audio chats")
+    parser.add_argument("--text-requests", type=int, default=50, help="Text requests per phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between text requests")
+    parser.add_argument("--message", help="Start text chats with this message instead of listing chats")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Move audio saved inline in chat history into the audio blob store.
+
+Chats saved before the blob store kept each uploaded recording as a base64
+data URL in the user message. This tool stores every such recording in the
+configured blob store (BLOB_STORE_* environment variables), replaces the data
+URL with an ``audio_path`` reference and rewrites the chat. Chats without
+inline audio are left untouched, so re-running it is safe.
+
+Run from src/api-service:
+    python -m tools.migrate_chat_audio --history-dir chat-history --model llm-cnn
+"""
+
+import argparse
+import base64
+import os
+import time
+
+from api.utils.blob_store import create_blob_store
+from api.utils.chat_log import ChatLog
+from api.utils.chat_utils import ChatHistoryManager
+
+
+def externalize_audio(chat, blob_store):
+    """Replace inline audio in ``chat`` with blob references; return the bytes moved."""
+    moved = 0
+    for message in chat.get("messages", []):
+        audio = message.get("audio")
+        if not audio:
+            continue
+        header, _, data = audio.rpartition(",")
+        media_type = header[len("data:"):].split(";")[0] if header.startswith("data:") else "audio/mpeg"
+        blob_id = blob_store.put(base64.b64decode(data), media_type, message.get("name", ""))
+        message["audio_path"] = f"audio/{blob_id}"
+        del message["audio"]
+        moved += len(audio)
+    return moved
+
+
+def main():
+    """Externalize the inline audio of every chat of the model."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history-dir", default="chat-history", help="Root chat history directory")
+    parser.add_argument("--model", default="llm-cnn", help="Model whose chats to migrate")
+    args = parser.parse_args()
+
+    manager = ChatHistoryManager(model=args.model, history_dir=args.history_dir)
+    blob_store = create_blob_store()
+    started = time.perf_counter()
+    chats = moved = 0
+    for session_id in sorted(os.listdir(manager.history_dir)):
+        if not os.path.isdir(os.path.join(manager.history_dir, session_id)):
+            continue
+        for summary in manager.get_recent_chat_summaries(session_id):
+            chat_log = ChatLog(os.path.join(manager.history_dir, session_id, f"{summary['chat_id']}.json"))
+            chat = chat_log.read()
+            chat_bytes = externalize_audio(chat, blob_store) if chat else 0
+            if chat_bytes:
+                chat_log.write(chat)
+                chats += 1
+                moved += chat_bytes
+
+    print(f"Moved {moved / 1e6:.1f} MB of inline audio out of {chats} chats "
+          f"in {time.perf_counter() - started:.1f} s ({blob_store.stats()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Build the per-session chat index for chat history saved as plain JSON files.
+
+Chats written before the index existed are still read as they are; this tool
+indexes every session up front instead of on its first listing. Re-running it
+rebuilds the indexes from the chat files, which also repairs a damaged index.
+
+Run from src/api-service:
+    python -m tools.migrate_chat_history --history-dir chat-history --model llm-cnn
+"""
+
+import argparse
+import os
+import time
+
+from api.utils.chat_utils import ChatHistoryManager
+
+
+def main():
+    """Index every session directory of the model's chat history."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history-dir", default="chat-history", help="Root chat history directory")
+    parser.add_argument("--model", default="llm-cnn", help="Model whose chats to index")
+    args = parser.parse_args()
+
+    manager = ChatHistoryManager(model=args.model, history_dir=args.history_dir)
+    started = time.perf_counter()
+    sessions = chats = 0
+    for session_id in sorted(os.listdir(manager.history_dir)):
+        if os.path.isdir(os.path.join(manager.history_dir, session_id)):
+            chats += manager.rebuild_index(session_id)
+            sessions += 1
+
+    print(f"Indexed {chats} chats in {sessions} sessions in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
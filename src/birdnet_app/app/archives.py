@@ -0,0 +1,67 @@
+"""Helpers for expanding zip/tar recorder dumps into individual audio files."""
+
+import os
+import tarfile
+import zipfile
+from io import BytesIO
+
+
+class ExpansionLimitExceeded(Exception):
+    """An upload expands to more files or bytes than the caller allows."""
+
+
+class TooManyFiles(ExpansionLimitExceeded):
+    """More files than ``max_files``."""
+
+
+class ExpandedTooLarge(ExpansionLimitExceeded):
+    """More decompressed bytes than ``max_bytes``."""
+
+
+def _is_audio_member(name):
+    """Skip directories, hidden files and macOS resource forks inside archives."""
+    base = os.path.basename(name)
+    return bool(base) and not base.startswith(".") and "__MACOSX" not in name
+
+
+def expand_upload(filename, data, max_files=None, max_bytes=None):
+    """Yield ``(filename, bytes)`` pairs, unpacking zip and tar archives in memory.
+
+    Limits are checked against each member's header before it is decompressed,
+    so an archive with too many members or a zip bomb is rejected without being
+    expanded: ``TooManyFiles`` past ``max_files`` files, ``ExpandedTooLarge``
+    past ``max_bytes`` in total. A plain upload counts as one file of its size.
+    """
+    files = 0
+    total_bytes = 0
+
+    def admit(size):
+        nonlocal files, total_bytes
+        files += 1
+        total_bytes += size
+        if max_files is not None and files > max_files:
+            raise TooManyFiles(max_files)
+        if max_bytes is not None and total_bytes > max_bytes:
+            raise ExpandedTooLarge(max_bytes)
+
+    if zipfile.is_zipfile(BytesIO(data)):
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_audio_member(info.filename):
+                    # reads stop at the declared file_size, so the check bounds the real size too
+                    admit(info.file_size)
+                    yield f"{filename}/{info.filename}", archive.read(info)
+        return
+
+    try:
+        archive = tarfile.open(fileobj=BytesIO(data), mode="r:*")
+    except tarfile.TarError:
+        admit(len(data))
+        yield filename, data
+        return
+
+    with archive:
+        for member in archive:
+            if member.isfile() and _is_audio_member(member.name):
+                admit(member.size)
+                yield f"{filename}/{member.name}", archive.extractfile(member).read()
@@ -0,0 +1,80 @@
+"""Micro-batching scheduler that coalesces concurrent requests into one inference call."""
+
+import asyncio
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collects windows from concurrent requests and runs them as a single batch.
+
+    A batch is dispatched as soon as ``max_batch_windows`` windows are waiting or
+    ``max_wait_ms`` has passed since the first one arrived, whichever comes first.
+    ``run_batch`` receives the stacked windows and returns a tuple of per-window
+    sequences (detections, embeddings, predictions, ...); each request gets back
+    the slices that belong to its own windows.
+    """
+
+    def __init__(self, run_batch, max_batch_windows, max_wait_ms):
+        """Configure the batch size and wait bounds."""
+        self.run_batch = run_batch
+        self.max_batch_windows = max(1, max_batch_windows)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.batches = 0
+        self.windows = 0
+        self._pending = []
+        self._pending_windows = 0
+        self._flush_handle = None
+        self._tasks = set()  # in-flight dispatches; the event loop only holds tasks weakly
+
+    @property
+    def average_batch_size(self):
+        """Mean number of windows per dispatched batch."""
+        return self.windows / self.batches if self.batches else 0.0
+
+    async def submit(self, windows):
+        """Queue ``windows`` (shape ``(n, samples)``) and wait for their share of the batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((windows, future))
+        self._pending_windows += len(windows)
+
+        if self._pending_windows >= self.max_batch_windows:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Dispatch everything that is waiting as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending, self._pending_windows = self._pending, [], 0
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        """Run one batch and scatter the outputs back to the waiting requests."""
+        try:
+            stacked = np.concatenate([windows for windows, _ in batch])
+            self.batches += 1
+            self.windows += len(stacked)
+            outputs = await self.run_batch(stacked)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for windows, future in batch:
+            count = len(windows)
+            if not future.done():
+                future.set_result(tuple(output[offset:offset + count] for output in outputs))
+            offset += count
@@ -0,0 +1,197 @@
+"""Content-addressed cache of identification results with an optional on-disk tier."""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks so large models are not loaded at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as model_file:
+        for chunk in iter(lambda: model_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_files(paths):
+    """Expand model paths to files, listing directories (exported weights) in sorted order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            files.append(path)
+    return files
+
+
+class ResultCache:
+    """LRU cache keyed by a hash of the uploaded bytes and the model versions.
+
+    The model version is the digest of every file in ``model_paths``, where a
+    directory counts as the files it contains. Files are re-hashed only when their
+    size or mtime changes; when the digest changes the in-memory tier is cleared
+    and on-disk entries of the old version are removed, so a redeployed model
+    never serves stale results. The optional disk tier lives under
+    ``disk_dir/<model version>/`` and survives restarts.
+    """
+
+    def __init__(self, max_entries, model_paths, disk_dir=None, max_disk_entries=10000):
+        """Configure the size bounds, the model files to track and the disk tier."""
+        self.max_entries = max_entries
+        self.model_paths = list(model_paths)
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._model_stats = None
+        self._model_version = None
+        self._disk_entries = 0
+
+    @property
+    def enabled(self):
+        """Whether the cache stores anything at all."""
+        return self.max_entries > 0 or self.disk_dir is not None
+
+    def model_version(self):
+        """Digest of the tracked model files, recomputed only when they change on disk."""
+        files = model_files(self.model_paths)
+        stats = []
+        for path in files:
+            st = os.stat(path)
+            stats.append((path, st.st_size, st.st_mtime_ns))
+
+        if stats != self._model_stats:
+            combined = hashlib.sha256()
+            for path in files:
+                combined.update(file_digest(path).encode())
+            version = combined.hexdigest()[:16]
+
+            if self._model_version is not None and version != self._model_version:
+                self.invalidations += 1
+                self._entries.clear()
+            self._model_stats = stats
+            if version != self._model_version:
+                self._model_version = version
+                self._load_disk_tier()
+
+        return self._model_version
+
+    def key(self, audio, params=""):
+        """Cache key for an upload under the current model version and request parameters.
+
+        ``audio`` is raw bytes or a seekable binary file, which is hashed in chunks
+        and rewound so large spooled uploads are never read into memory at once.
+        """
+        digest = hashlib.sha256()
+        digest.update(self.model_version().encode())
+        digest.update(params.encode())
+        if isinstance(audio, (bytes, bytearray)):
+            digest.update(audio)
+        else:
+            audio.seek(0)
+            for chunk in iter(lambda: audio.read(1 << 20), b""):
+                digest.update(chunk)
+            audio.seek(0)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached result for ``key`` or None, checking memory then disk."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        result = self._read_disk(key)
+        if result is not None:
+            self.disk_hits += 1
+            self._remember(key, result)
+            return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Store a result in memory and, if configured, on disk."""
+        self._remember(key, result)
+        self._write_disk(key, result)
+
+    def stats(self):
+        """Hit/miss counters and occupancy as a JSON-serializable dict."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "disk_entries": self._disk_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "model_version": self._model_version,
+        }
+
+    def _remember(self, key, result):
+        """Insert into the in-memory tier, evicting least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _version_dir(self):
+        """Directory holding disk entries for the current model version."""
+        return os.path.join(self.disk_dir, self._model_version)
+
+    def _load_disk_tier(self):
+        """Drop disk entries of other model versions and count the current ones."""
+        if self.disk_dir is None:
+            return
+        os.makedirs(self._version_dir(), exist_ok=True)
+        for name in os.listdir(self.disk_dir):
+            if name != self._model_version:
+                shutil.rmtree(os.path.join(self.disk_dir, name), ignore_errors=True)
+        self._disk_entries = len(os.listdir(self._version_dir()))
+
+    def _read_disk(self, key):
+        """Read a disk entry, returning None when absent or unreadable."""
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(os.path.join(self._version_dir(), f"{key}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, result):
+        """Atomically write a disk entry, pruning the oldest ones when over the bound."""
+        if self.disk_dir is None:
+            return
+        path = os.path.join(self._version_dir(), f"{key}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(temp_path, path)
+        self._disk_entries += 1
+
+        if self._disk_entries > self.max_disk_entries:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the least recently written tenth of the disk entries."""
+        version_dir = self._version_dir()
+        paths = sorted(
+            (os.path.join(version_dir, name) for name in os.listdir(version_dir)),
+            key=os.path.getmtime
+        )
+        for path in paths[:max(1, len(paths) // 10)]:
+            os.remove(path)
+        self._disk_entries = len(os.listdir(version_dir))
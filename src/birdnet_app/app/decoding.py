@@ -0,0 +1,128 @@
+"""Pluggable audio decoders returning NumPy samples without spawning ffmpeg."""
+
+from io import BytesIO
+
+import numpy as np
+import soundfile as sf
+
+
+class DecodeError(Exception):
+    """Raised when no configured decoder can read the upload."""
+
+
+# Bytes needed by sniff_format to recognise every supported container
+SNIFF_BYTES = 16
+
+# Containers libsndfile decodes; anything else goes straight to pydub
+SOUNDFILE_FORMATS = {"wav", "flac", "ogg", "mp3", "aiff", "caf"}
+
+
+def sniff_format(head):
+    """Identify the audio container from the first bytes of an upload, or return None."""
+    if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:4] == b"caff":
+        return "caf"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:4] == b"\x1aE\xdf\xa3":
+        return "webm"
+    if head[:5] == b"#!AMR":
+        return "amr"
+    if head[:8] == b"0&\xb2u\x8ef\xcf\x11":
+        return "wma"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        return "aac"  # ADTS frame sync
+    if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def read_head(audio, size=SNIFF_BYTES):
+    """First ``size`` bytes of an upload given as bytes or a seekable file, leaving it rewound."""
+    if isinstance(audio, (bytes, bytearray)):
+        return bytes(audio[:size])
+    audio.seek(0)
+    head = audio.read(size)
+    audio.seek(0)
+    return head
+
+
+def _as_file(audio):
+    """Accept raw bytes or a seekable binary file and return a file rewound to the start."""
+    if isinstance(audio, (bytes, bytearray)):
+        return BytesIO(audio)
+    audio.seek(0)
+    return audio
+
+
+def decode_soundfile(audio, max_secs=None):
+    """Decode in-process with libsndfile (WAV, FLAC, OGG/Vorbis, Opus and MP3 since 1.1).
+
+    Only the first ``max_secs`` seconds are read and decoded when given, so a long
+    file-backed upload is never loaded in full.
+    """
+    with sf.SoundFile(_as_file(audio)) as sound_file:
+        frames = -1 if max_secs is None else int(max_secs * sound_file.samplerate)
+        samples = sound_file.read(frames, dtype="float32", always_2d=True)
+        return samples.mean(axis=1), sound_file.samplerate
+
+
+def decode_pydub(audio, max_secs=None):
+    """Decode through pydub/ffmpeg, for containers libsndfile does not know (AAC, M4A, WMA, ...)."""
+    from pydub import AudioSegment  # imported on first use: most uploads never reach this backend
+
+    audio = AudioSegment.from_file(_as_file(audio))  # auto-detect format
+    if max_secs is not None:
+        audio = audio[:int(max_secs * 1000)]
+    audio = audio.set_channels(1)
+
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    samples /= float(1 << (8 * audio.sample_width - 1))
+    return samples, audio.frame_rate
+
+
+# Available backends, tried in the order given to decode_audio
+DECODERS = {
+    "soundfile": decode_soundfile,
+    "pydub": decode_pydub,
+}
+
+
+def decode_audio(audio, max_secs=None, backends=("soundfile", "pydub"), fmt=None):
+    """Decode bytes or a seekable file to mono float32 with the first backend that succeeds.
+
+    ``fmt`` is the container found by ``sniff_format``; when it is one libsndfile
+    cannot read, the soundfile backend is skipped. Returns ``(samples, sample_rate,
+    backend_name)`` and raises ``DecodeError`` listing every backend's failure
+    when none can read the data.
+    """
+    errors = []
+    for name in backends:
+        if name == "soundfile" and fmt is not None and fmt not in SOUNDFILE_FORMATS:
+            continue
+        try:
+            samples, rate = DECODERS[name](audio, max_secs)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        return samples, rate, name
+
+    raise DecodeError("; ".join(errors))
+
+
+def resample(samples, rate, target_rate):
+    """Resample mono samples to ``target_rate`` (no-op when the rates already match)."""
+    if rate == target_rate:
+        return samples
+
+    import librosa  # heavy import, only needed for uploads not recorded at the model rate
+    return librosa.resample(
+        samples, orig_sr=rate, target_sr=target_rate, res_type="kaiser_fast"
+    ).astype(np.float32)
@@ -0,0 +1,157 @@
+"""Selectable inference engines for the BirdNET classifier and the custom MLP.
+
+birdnetlib and scikit-learn are imported only when an engine that needs them is
+built: importing the birdnetlib package pulls in librosa and matplotlib, and
+scikit-learn pulls in scipy, which together dominate service start-up time.
+"""
+
+import importlib.util
+import json
+import os
+from functools import partial
+
+import numpy as np
+
+# BirdNET engines: the FP32 model bundled with birdnetlib, or an int8-quantized export
+BIRDNET_ENGINES = ("tflite", "tflite-int8")
+
+# Custom-model engines: memory-mapped NumPy weights, the pickled scikit-learn MLP, or its ONNX export
+CUSTOM_MODEL_ENGINES = ("numpy", "sklearn", "onnx")
+
+# Default artifact per custom-model engine, relative to the service directory
+CUSTOM_MODEL_FILES = {
+    "numpy": "mlp_model_birdnet_weights",
+    "sklearn": "mlp_model_birdnet.pkl",
+    "onnx": "mlp_model_birdnet.onnx",
+}
+
+
+def birdnetlib_model_path(filename):
+    """Path of a model file bundled with birdnetlib, located without importing the package."""
+    package_dir = importlib.util.find_spec("birdnetlib").submodule_search_locations[0]
+    return os.path.join(package_dir, "models", "analyzer", filename)
+
+
+# Same files as birdnetlib.analyzer.MODEL_PATH and LABEL_PATH
+BIRDNET_MODEL_PATH = birdnetlib_model_path("BirdNET_GLOBAL_6K_V2.4_Model_FP32.tflite")
+BIRDNET_LABEL_PATH = birdnetlib_model_path("BirdNET_GLOBAL_6K_V2.4_Labels.txt")
+
+
+def build_analyzer():
+    """Build birdnetlib's standard FP32 analyzer."""
+    from birdnetlib.analyzer import Analyzer
+    return Analyzer()
+
+
+def build_quantized_analyzer(model_file):
+    """Build an analyzer that loads an int8-quantized classifier instead of the FP32 one.
+
+    The quantized model keeps BirdNET's input, label and output layout, so labels,
+    species filtering and ``run_single_pass`` work unchanged.
+    """
+    from birdnetlib.analyzer import Analyzer
+
+    class QuantizedAnalyzer(Analyzer):
+        def load_model(self):
+            # birdnetlib builds the interpreter from model_path inside __init__
+            self.model_path = model_file
+            super().load_model()
+
+    return QuantizedAnalyzer()
+
+
+def birdnet_factory(engine, int8_model_path=None):
+    """Return ``(analyzer_factory, model_path)`` for the requested BirdNET engine."""
+    if engine == "tflite":
+        return build_analyzer, BIRDNET_MODEL_PATH
+    if engine == "tflite-int8":
+        if not int8_model_path:
+            raise ValueError("BIRDNET_ENGINE=tflite-int8 requires BIRDNET_INT8_MODEL_PATH")
+        return partial(build_quantized_analyzer, int8_model_path), int8_model_path
+    raise ValueError(f"BIRDNET_ENGINE must be one of {BIRDNET_ENGINES}, got {engine!r}")
+
+
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "logistic": lambda x: 1.0 / (1.0 + np.exp(-x)),
+}
+
+
+class NumpyMLP:
+    """Forward pass of the custom MLP over memory-mapped NumPy weights.
+
+    Reads the directory written by ``tools/export_numpy.py``: one ``.npy`` file per
+    weight matrix and bias vector plus ``model.json``. The weight files are mapped
+    rather than read, so loading costs a few milliseconds and no scikit-learn
+    import, and worker processes share the pages through the OS cache.
+    """
+
+    def __init__(self, path):
+        """Map the exported weights."""
+        with open(os.path.join(path, "model.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.activation = ACTIVATIONS[meta["activation"]]
+        self.out_activation = meta["out_activation"]
+        self.coefs = [np.load(os.path.join(path, f"coef_{i}.npy"), mmap_mode="r") for i in range(meta["n_layers"])]
+        self.intercepts = [
+            np.load(os.path.join(path, f"intercept_{i}.npy"), mmap_mode="r") for i in range(meta["n_layers"])
+        ]
+        self.classes_ = np.load(os.path.join(path, "classes.npy"))
+
+    def predict_proba(self, features):
+        """Class probabilities for a ``(n_samples, n_features)`` matrix, matching ``MLPClassifier``."""
+        activations = np.asarray(features, dtype=self.coefs[0].dtype).reshape(len(features), -1)
+        for coef, intercept in zip(self.coefs[:-1], self.intercepts[:-1]):
+            activations = self.activation(activations @ coef + intercept)
+        logits = activations @ self.coefs[-1] + self.intercepts[-1]
+
+        if self.out_activation == "softmax":
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            return exp / exp.sum(axis=1, keepdims=True)
+
+        positive = ACTIVATIONS["logistic"](logits)
+        return np.hstack([1 - positive, positive])
+
+
+class OnnxClassifier:
+    """ONNX Runtime session exposing the ``classes_``/``predict_proba`` surface of the sklearn MLP.
+
+    The class labels are read from the ``classes`` metadata entry written by
+    ``tools/export_onnx.py``.
+    """
+
+    def __init__(self, path):
+        """Open an inference session on the exported model."""
+        try:
+            import onnxruntime
+        except ImportError as e:  # optional: only needed for the "onnx" custom-model engine
+            raise ImportError("CUSTOM_MODEL_ENGINE=onnx requires the onnxruntime package") from e
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[-1].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.classes_ = np.array(json.loads(metadata["classes"]))
+
+    def predict_proba(self, features):
+        """Class probabilities for a ``(n_samples, n_features)`` matrix."""
+        features = np.asarray(features, dtype=np.float32).reshape(len(features), -1)
+        return self.session.run([self.output_name], {self.input_name: features})[0]
+
+
+def load_custom_model(engine, path):
+    """Load the custom model from ``path`` with the requested engine."""
+    if engine == "numpy":
+        return NumpyMLP(path)
+    if engine == "sklearn":
+        import joblib
+        return joblib.load(path)
+    if engine == "onnx":
+        return OnnxClassifier(path)
+    raise ValueError(f"CUSTOM_MODEL_ENGINE must be one of {CUSTOM_MODEL_ENGINES}, got {engine!r}")
@@ -0,0 +1,148 @@
+"""Bounded worker pool that keeps CPU-bound BirdNET work off the event loop."""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Saturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class InferenceMetrics:
+    """Running totals for admission, queue wait and compute time.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        """Start with all counters at zero."""
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.compute_total = 0.0
+        self.compute_max = 0.0
+
+    def record(self, queue_wait, compute):
+        """Record the timings of one finished task."""
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.compute_total += compute
+        self.compute_max = max(self.compute_max, compute)
+
+    def snapshot(self):
+        """Return the counters as a JSON-serializable dict (times in milliseconds)."""
+        completed = max(self.completed, 1)
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait_ms": {
+                "avg": round(1000 * self.queue_wait_total / completed, 2),
+                "max": round(1000 * self.queue_wait_max, 2),
+            },
+            "compute_ms": {
+                "avg": round(1000 * self.compute_total / completed, 2),
+                "max": round(1000 * self.compute_max, 2),
+            },
+        }
+
+
+def _timed_call(fn, args):
+    """Run ``fn`` inside the worker and report when it actually started and finished."""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+class InferenceExecutor:
+    """Runs pipeline functions on a pool of worker processes with admission control.
+
+    Each worker process builds its own analyzer through ``initializer``. At most
+    ``workers + max_queue`` tasks are admitted at once; further submissions raise
+    ``Saturated`` so the endpoint can shed load instead of queueing without bound.
+    With ``workers=0`` tasks run on a single in-process thread, which is what the
+    test-suite and single-core development containers use.
+    """
+
+    def __init__(self, workers, max_queue, initializer=None):
+        """Configure the pool; worker processes are started by ``start``."""
+        self.workers = workers
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self.metrics = InferenceMetrics()
+        self.ready = False
+        self._pool = None
+        self._in_flight = 0
+
+    @property
+    def capacity(self):
+        """Maximum number of admitted tasks (running plus waiting)."""
+        return max(self.workers, 1) + self.max_queue
+
+    @property
+    def saturated(self):
+        """Whether a new submission would be rejected."""
+        return self._in_flight >= self.capacity
+
+    @property
+    def in_flight(self):
+        """Number of admitted tasks that have not finished yet."""
+        return self._in_flight
+
+    def start(self):
+        """Create the underlying pool if it does not exist yet."""
+        if self._pool is not None:
+            return
+        if self.workers > 0:
+            # spawn, not fork: the parent holds threads and TFLite state that must not be copied
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+            )
+        else:
+            # in-process tasks share the parent's registry, which warm_up loads
+            self._pool = ThreadPoolExecutor(max_workers=1)
+
+    def shutdown(self):
+        """Stop the pool, waiting for running tasks to finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.ready = False
+
+    async def warm_up(self, fn):
+        """Run ``fn`` once per worker so every process is loaded before traffic arrives."""
+        await asyncio.gather(*(self.run(fn) for _ in range(max(self.workers, 1))))
+        # start metrics from zero so process start-up does not skew queue wait
+        self.metrics = InferenceMetrics()
+        self.ready = True
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool, raising ``Saturated`` when over capacity."""
+        if self.saturated:
+            self.metrics.rejected += 1
+            raise Saturated(f"{self._in_flight} tasks in flight (capacity {self.capacity})")
+
+        self.start()
+        self._in_flight += 1
+        self.metrics.submitted += 1
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(self._pool, _timed_call, fn, args)
+        except Exception:
+            self.metrics.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+        self.metrics.record(max(started - submitted, 0.0), finished - started)
+        return result
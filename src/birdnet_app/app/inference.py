@@ -0,0 +1,55 @@
+"""Single-pass BirdNET inference returning species scores and embeddings together."""
+
+import numpy as np
+
+# BirdNET's input rate (birdnetlib.main.SAMPLE_RATE), kept here so callers need not import birdnetlib
+SAMPLE_RATE = 48000
+
+
+def _quantize(values, details):
+    """Map float input onto a fully-quantized model's integer input tensor."""
+    if details["dtype"] == np.float32:
+        return values
+    scale, zero_point = details["quantization"]
+    info = np.iinfo(details["dtype"])
+    return np.clip(np.round(values / scale + zero_point), info.min, info.max).astype(details["dtype"])
+
+
+def _dequantize(values, details):
+    """Map an integer output tensor back to float; float outputs pass through."""
+    if values.dtype == np.float32:
+        return values
+    scale, zero_point = details["quantization"]
+    return ((values.astype(np.float32) - zero_point) * scale).astype(np.float32)
+
+
+def run_single_pass(analyzer, chunks, sensitivity=1.0):
+    """Run one interpreter invocation over a batch of 3-second chunks.
+
+    Both the classification output and the penultimate (embedding) layer are read
+    back from the same invocation, so the custom model can reuse the embeddings
+    without a second pass over the audio. Returns ``(confidences, embeddings)``
+    with shapes ``(n_chunks, n_classes)`` and ``(n_chunks, embedding_dim)``.
+    """
+    batch = np.asarray(chunks, dtype=np.float32)
+    if batch.ndim == 1:
+        batch = batch[np.newaxis, :]
+
+    interpreter = analyzer.interpreter
+    input_index = analyzer.input_details[0]["index"]
+    output_index = analyzer.output_details[0]["index"]
+
+    interpreter.resize_tensor_input(input_index, list(batch.shape))
+    interpreter.allocate_tensors()
+    interpreter.set_tensor(input_index, _quantize(batch, analyzer.input_details[0]))
+    interpreter.invoke()
+
+    # get_tensor copies, so both outputs survive the next invocation
+    logits = _dequantize(interpreter.get_tensor(output_index), analyzer.output_details[0])
+    embeddings = interpreter.get_tensor(output_index - 1)
+    if embeddings.dtype != np.float32:
+        embeddings = _dequantize(embeddings, interpreter.get_tensor_details()[output_index - 1])
+
+    confidences = analyzer.flat_sigmoid(logits, sensitivity=-sensitivity)
+    return confidences, embeddings
+
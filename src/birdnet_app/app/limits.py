@@ -0,0 +1,62 @@
+"""Request body size limits enforced while the upload is still streaming in."""
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+class UploadTooLarge(HTTPException):
+    """Raised from the receive channel once a request body exceeds its limit."""
+
+    def __init__(self, limit):
+        """Record the limit that was exceeded."""
+        super().__init__(status_code=413, detail=f"Upload exceeds the {limit // (1024 * 1024)} MB limit.")
+        self.limit = limit
+
+
+def upload_too_large_response(limit):
+    """413 response in the app's error schema."""
+    return JSONResponse(
+        status_code=413,
+        content={"error": f"Upload exceeds the {limit // (1024 * 1024)} MB limit."}
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware rejecting request bodies over a per-path byte limit with 413.
+
+    A declared Content-Length over the limit is rejected before any body is read.
+    Otherwise bytes are counted as they arrive and ``UploadTooLarge`` is raised from
+    ``receive`` as soon as the limit is crossed, so an oversized upload is never
+    spooled in full. Paths without an entry in ``limits`` are not restricted.
+    """
+
+    def __init__(self, app, limits):
+        """Wrap ``app`` with a ``{path: max_bytes}`` mapping."""
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        """Count body bytes for limited paths and pass everything else through."""
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await upload_too_large_response(limit)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLarge(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
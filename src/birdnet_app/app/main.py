@@ -1,22 +1,160 @@
 """Bird species detection API using BirdNET and a custom classification model."""
 
-from io import BytesIO
-import tempfile
 import os
-from collections import defaultdict
+import json
+from datetime import date as Date
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
-from pydub import AudioSegment
-import joblib
+from fastapi import FastAPI, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 import numpy as np
-from birdnetlib.analyzer import Analyzer
-from birdnetlib import Recording
+import soundfile as sf
 
-app = FastAPI()
+from app.archives import ExpandedTooLarge, TooManyFiles, expand_upload
+from app.batching import MicroBatcher
+from app.cache import ResultCache, file_digest
+from app.decoding import (
+    SNIFF_BYTES, SOUNDFILE_FORMATS, DecodeError, decode_audio, read_head, resample, sniff_format
+)
+from app.limits import UploadSizeLimitMiddleware, UploadTooLarge, upload_too_large_response
+from app.engines import CUSTOM_MODEL_FILES, birdnet_factory, load_custom_model
+from app.executor import InferenceExecutor, Saturated
+from app.inference import SAMPLE_RATE, run_single_pass
+from app.registry import AnalyzerRegistry
+from app.species import SpeciesMasks, load_labels, read_species_list
+from app.streaming import WINDOW_SECS, iter_window_batches
 
-# Load our custom model
-model = joblib.load('mlp_model_birdnet.pkl')
+# BirdNET engine: "tflite" (bundled FP32 model) or "tflite-int8" (BIRDNET_INT8_MODEL_PATH)
+birdnet_analyzer_factory, BIRDNET_MODEL_PATH = birdnet_factory(
+    os.environ.get("BIRDNET_ENGINE", "tflite"),
+    os.environ.get("BIRDNET_INT8_MODEL_PATH")
+)
+
+# Shared BirdNET analyzer, built once per worker
+registry = AnalyzerRegistry(birdnet_analyzer_factory)
+
+def init_worker():
+    """Load and warm up this worker's analyzer."""
+    registry.load()
+    if not registry.ready:
+        registry.warm_up()
+
+# Inference worker pool: BIRDNET_WORKERS processes (0 runs in-process on a thread)
+# admitting at most BIRDNET_MAX_QUEUE waiting requests before shedding load
+executor = InferenceExecutor(
+    workers=int(os.environ.get("BIRDNET_WORKERS", 1)),
+    max_queue=int(os.environ.get("BIRDNET_MAX_QUEUE", 8)),
+    initializer=init_worker
+)
+
+async def run_inference_batch(windows):
+    """Send one coalesced batch of windows to the inference workers."""
+    return await executor.run(infer_windows, windows)
+
+# Micro-batching of concurrent /analyze-bird requests: a batch is dispatched once
+# BIRDNET_MICROBATCH_MAX_WINDOWS windows are waiting or after BIRDNET_MICROBATCH_MAX_WAIT_MS
+batcher = MicroBatcher(
+    run_inference_batch,
+    max_batch_windows=int(os.environ.get("BIRDNET_MICROBATCH_MAX_WINDOWS", 16)),
+    max_wait_ms=float(os.environ.get("BIRDNET_MICROBATCH_MAX_WAIT_MS", 10))
+)
+
+BUSY_MESSAGE = "Analyzer is busy, please retry shortly."
+
+@asynccontextmanager
+async def lifespan(_app):
+    """Start the inference workers and warm them up before accepting requests."""
+    executor.start()
+    await executor.warm_up(init_worker)
+    if result_cache.enabled:
+        # hash the model files now rather than on the first request
+        await run_in_threadpool(result_cache.model_version)
+    yield
+    executor.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Model artifacts live next to the app package, wherever the service is started from
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Load our custom model: "numpy" (memory-mapped weights), "sklearn" (pickled MLP) or "onnx" (ONNX Runtime export)
+CUSTOM_MODEL_ENGINE = os.environ.get("CUSTOM_MODEL_ENGINE", "numpy")
+CUSTOM_MODEL_PATH = os.environ.get(
+    "CUSTOM_MODEL_PATH", os.path.join(MODEL_DIR, CUSTOM_MODEL_FILES.get(CUSTOM_MODEL_ENGINE, ""))
+)
+model = load_custom_model(CUSTOM_MODEL_ENGINE, CUSTOM_MODEL_PATH)
+
+# Length of audio analyzed per upload
+TARGET_DURATION_SECS = 3
+
+# Upload size limits per endpoint, enforced while the request body streams in
+MAX_UPLOAD_MB = int(os.environ.get("BIRDNET_MAX_UPLOAD_MB", 20))
+MAX_BATCH_UPLOAD_MB = int(os.environ.get("BIRDNET_MAX_BATCH_UPLOAD_MB", 200))
+MAX_LONG_UPLOAD_MB = int(os.environ.get("BIRDNET_MAX_LONG_UPLOAD_MB", 500))
+
+UPLOAD_LIMITS = {
+    "/analyze-bird": MAX_UPLOAD_MB * 1024 * 1024,
+    "/analyze-bird/batch": MAX_BATCH_UPLOAD_MB * 1024 * 1024,
+    "/analyze-bird/long": MAX_LONG_UPLOAD_MB * 1024 * 1024,
+}
+app.add_middleware(UploadSizeLimitMiddleware, limits=UPLOAD_LIMITS)
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large(_request, exc):
+    """Report a body cut off by the size limit in the app's error schema."""
+    return upload_too_large_response(exc.limit)
+
+# Decoder backends tried in order; pydub (ffmpeg subprocess) only for formats libsndfile cannot read
+DECODER_BACKENDS = tuple(os.environ.get("BIRDNET_DECODERS", "soundfile,pydub").split(","))
+
+# Batch endpoint tuning: windows per analyzer invocation, decode threads, files per request
+BATCH_MAX_WINDOWS = int(os.environ.get("BIRDNET_BATCH_MAX_WINDOWS", 64))
+DECODE_WORKERS = int(os.environ.get("BIRDNET_DECODE_WORKERS", 4))
+BATCH_MAX_FILES = int(os.environ.get("BIRDNET_BATCH_MAX_FILES", 1000))
+
+# Total size a batch may expand to once its archives are unpacked
+MAX_BATCH_EXPANDED_MB = int(os.environ.get("BIRDNET_MAX_BATCH_EXPANDED_MB", 2 * MAX_BATCH_UPLOAD_MB))
+
+# Default hop between windows in long-recording mode
+LONG_HOP_SECS = float(os.environ.get("BIRDNET_LONG_HOP_SECS", 1.5))
+
+# Custom model fallback: per-window probabilities are pooled with "max" or "mean"
+# and a local species is only reported above CUSTOM_MODEL_THRESHOLD
+CUSTOM_MODEL_AGGREGATION = os.environ.get("CUSTOM_MODEL_AGGREGATION", "max")
+CUSTOM_MODEL_THRESHOLD = float(os.environ.get("CUSTOM_MODEL_THRESHOLD", 0.5))
+if CUSTOM_MODEL_AGGREGATION not in ("max", "mean"):
+    raise ValueError(f"CUSTOM_MODEL_AGGREGATION must be 'max' or 'mean', got {CUSTOM_MODEL_AGGREGATION!r}")
+
+# Identification results keyed by upload content and model digests: BIRDNET_CACHE_MAX_ENTRIES
+# in memory (0 disables) plus an optional on-disk tier under BIRDNET_CACHE_DIR
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("BIRDNET_CACHE_MAX_ENTRIES", 1024)),
+    model_paths=[BIRDNET_MODEL_PATH, CUSTOM_MODEL_PATH],
+    disk_dir=os.environ.get("BIRDNET_CACHE_DIR") or None,
+    max_disk_entries=int(os.environ.get("BIRDNET_CACHE_MAX_DISK_ENTRIES", 10000))
+)
+
+# BirdNET classes that may be reported: every class, or those in the BIRDNET_SPECIES_LIST
+# file (one label or scientific name per line); requests can narrow this by location
+BIRDNET_SPECIES_LIST = os.environ.get("BIRDNET_SPECIES_LIST")
+species_masks = SpeciesMasks(
+    load_labels(),
+    allow_list=read_species_list(BIRDNET_SPECIES_LIST) if BIRDNET_SPECIES_LIST else None
+)
+
+def result_settings(species_list_path=None):
+    """Settings that change the result for the same audio, as part of the cache key.
+
+    The allow-list counts by the digest of its file: the disk tier survives
+    restarts, so results cached under a previous list must not match.
+    """
+    species_list = file_digest(species_list_path)[:16] if species_list_path else "all"
+    return f"{CUSTOM_MODEL_AGGREGATION}:{CUSTOM_MODEL_THRESHOLD}:{species_list}"
+
+CACHE_PARAMS = result_settings(BIRDNET_SPECIES_LIST)
 
 # Class label mapping for custom model
 label_map = {
@@ -24,108 +162,409 @@ label_map = {
     2: "Hapalopsittaca melanotis"
 }
 
-def preprocess_audio_bytes_to_wav_segment(audio_bytes):
-    """Preprocess uploaded audio: pad to 3 seconds."""
-    audio_io = BytesIO(audio_bytes)
+def preprocess_audio_bytes(audio, fmt=None):
+    """Decode uploaded audio to mono float32 samples at BirdNET's rate, padded or trimmed to 3 seconds.
+
+    ``audio`` is raw bytes or a seekable file; ``fmt`` is the already sniffed container.
+    Uploads with an unrecognized header are rejected without attempting a decode.
+    """
+    if fmt is None:
+        fmt = sniff_format(read_head(audio))
+    if fmt is None:
+        return unsupported_format_error()
 
     try:
-        audio = AudioSegment.from_file(audio_io)  # auto-detect format
-    except Exception as e:
+        # Only the analyzed window is decoded and resampled
+        samples, rate, _ = decode_audio(audio, TARGET_DURATION_SECS, DECODER_BACKENDS, fmt)
+    except DecodeError as e:
         return {
             "error": "Unsupported or corrupt audio file.",
             "details": str(e)
         }
 
-    target_duration_ms = 3000
-    if len(audio) < target_duration_ms:
-        silence = AudioSegment.silent(duration=target_duration_ms - len(audio))
-        audio += silence
-    else:
-        audio = audio[:target_duration_ms]
+    samples = resample(samples, rate, SAMPLE_RATE)
 
-    return audio
+    target_length = TARGET_DURATION_SECS * SAMPLE_RATE
+    if len(samples) < target_length:
+        samples = np.pad(samples, (0, target_length - len(samples)))
 
-def analyze_birdnet_from_audio_segment(audio_segment, confidence_threshold=0.1):
-    """Analyze a 3-second audio segments using BirdNET."""
-    wav_io = BytesIO()
-    audio_segment.export(wav_io, format="wav")
-    wav_io.seek(0)
+    return samples[:target_length]
 
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-        temp_file.write(wav_io.read())
-        temp_path = temp_file.name
+def unsupported_format_error():
+    """Error returned for uploads whose header matches no known audio container."""
+    return {
+        "error": "Unsupported or corrupt audio file.",
+        "details": "Unrecognized audio container."
+    }
 
-    try:
-        analyzer = Analyzer()
-        recording = Recording(analyzer, temp_path)
-        recording.analyze()
+def top_species_from_confidences(confidences, mask=None, confidence_threshold=0.1):
+    """Average each allowed species' scores above the threshold and return the most confident one, or None."""
+    sums, counts = species_masks.species_scores(confidences, mask, confidence_threshold)
+    return species_masks.top_species(sums, counts, mask)
 
-        species_confidences = defaultdict(list)
-        for d in recording.detections:
-            if d['confidence'] >= confidence_threshold:
-                species_confidences[d['scientific_name']].append(d['confidence'])
+def pool_probabilities(probabilities):
+    """Pool per-window class probabilities with the configured aggregation (max or mean)."""
+    if CUSTOM_MODEL_AGGREGATION == "max":
+        return probabilities.max(axis=0)
+    return probabilities.mean(axis=0)
 
-        if not species_confidences:
-            return None, temp_path
+def custom_model_result(pooled):
+    """Pick the most probable local species from pooled probabilities, if above threshold."""
+    scores = {
+        label_map[label]: float(pooled[class_index])
+        for class_index, label in enumerate(model.classes_)
+        if label in label_map
+    }
+    species, confidence = max(scores.items(), key=lambda x: x[1])
 
-        avg_conf = {
-            species: sum(confs) / len(confs)
-            for species, confs in species_confidences.items()
+    if confidence < CUSTOM_MODEL_THRESHOLD:
+        return {
+            "scientific_name": "Species not identified",
+            "source": "own custom model for local species"
         }
 
-        top_species = max(avg_conf.items(), key=lambda x: x[1])
-        return {
-            "scientific_name": top_species[0],
-            "average_confidence": round(top_species[1], 3)
-        }, temp_path
+    return {
+        "scientific_name": species,
+        "average_confidence": round(confidence, 3),
+        "source": "own custom model for local species"
+    }
+
+def classify_with_custom_model(embeddings):
+    """Identify local species from every embedding window with a single predict_proba call."""
+    embeddings = np.asarray(embeddings)
+    probabilities = model.predict_proba(embeddings.reshape(len(embeddings), -1))
+    return custom_model_result(pool_probabilities(probabilities))
+
+def resolve_species(birdnet_result, embeddings, probabilities=None):
+    """Return the BirdNET result when confident, otherwise fall back to the custom model.
+
+    ``probabilities`` are custom-model outputs already computed for a batch; without
+    them the custom model is run on ``embeddings``.
+    """
+    if birdnet_result is None or birdnet_result.get("average_confidence", 0) < 0.5:
+        if probabilities is None:
+            return classify_with_custom_model(embeddings)
+        return custom_model_result(pool_probabilities(probabilities))
+
+    return {
+        "scientific_name": birdnet_result['scientific_name'],
+        "average_confidence": birdnet_result['average_confidence'],
+        "source": "birdnet"
+    }
 
+def infer_windows(windows):
+    """Run one BirdNET invocation and one custom-model call over stacked 3-second windows.
+
+    Returns the per-window class confidences, the embeddings matrix and the
+    custom-model class probabilities. This is the unit of work shipped to inference
+    workers, so it only takes and returns plain arrays; species filtering happens
+    on the caller's side with a precomputed class mask.
+    """
+    with registry.acquire() as analyzer:
+        confidences, embeddings = run_single_pass(analyzer, windows)
+    return confidences, embeddings, model.predict_proba(embeddings)
+
+def analyze_window_batch(named_windows):
+    """Analyze stacked windows in one invocation and resolve each file, in input order."""
+    names = [name for name, _ in named_windows]
+
+    try:
+        confidences, embeddings, probabilities = infer_windows(np.stack([samples for _, samples in named_windows]))
     except Exception as e:
-        return {"error": f"BirdNET analysis failed: {e}"}, temp_path
+        return [{"filename": name, "error": f"BirdNET analysis failed: {e}"} for name in names]
 
-def classify_with_custom_model(audio_path):
-    """Identify bird species from audio using transfer learning."""
-    analyzer = Analyzer()
-    recording = Recording(analyzer, audio_path)
-    recording.extract_embeddings()
-    embeddings = recording.embeddings
+    return [
+        {
+            "filename": name,
+            **resolve_species(
+                top_species_from_confidences(confidences[i:i + 1], species_masks.default),
+                embeddings[i:i + 1],
+                probabilities[i:i + 1]
+            )
+        }
+        for i, name in enumerate(names)
+    ]
 
-    for segment in embeddings:
-        emb_vector = np.array(segment['embeddings']).reshape(1, -1)
-        prediction = model.predict(emb_vector)[0]
+def detect_species_for_uploads(named_uploads):
+    """Decode a group of uploads in parallel and analyze them in a single invocation.
 
-        if prediction in label_map:
-            return label_map[prediction]
+    Results are returned in upload order. They are matched by position, not by
+    filename, since archives and recorder dumps often repeat names.
+    """
+    with ThreadPoolExecutor(max_workers=DECODE_WORKERS) as pool:
+        decoded = list(pool.map(preprocess_audio_bytes, [data for _, data in named_uploads]))
 
-    return "Species not identified"
+    results = [None] * len(named_uploads)
+    positions = []
+    windows = []
+    for index, ((name, _), samples) in enumerate(zip(named_uploads, decoded)):
+        if isinstance(samples, dict) and "error" in samples:
+            results[index] = {"filename": name, **samples}
+        else:
+            positions.append(index)
+            windows.append((name, samples))
 
-def detect_species_from_audio(audio_bytes):
-    """Full detection pipeline: preprocess, analyze with BirdNET, fallback to transfer learning if needed."""
-    audio_segment = preprocess_audio_bytes_to_wav_segment(audio_bytes)
-    if isinstance(audio_segment, dict) and "error" in audio_segment:
-        return audio_segment
+    if windows:
+        for index, result in zip(positions, analyze_window_batch(windows)):
+            results[index] = result
 
-    birdnet_result, temp_path = analyze_birdnet_from_audio_segment(audio_segment)
+    return results
 
-    if birdnet_result is None or birdnet_result.get("average_confidence", 0) < 0.5:
-        fallback_species = classify_with_custom_model(temp_path)
-        os.remove(temp_path)
+async def detect_species_from_stream(file_obj, hop_secs, confidence_threshold=0.1, mask=None):
+    """Analyze a full-length recording in overlapping windows with bounded memory.
+
+    Decoding runs on a thread and each batch of windows goes through the inference
+    workers; only running per-species totals and the per-window timeline are kept,
+    never the decoded audio or its embeddings.
+    """
+    species_sums = species_counts = None
+    custom_max = custom_sum = None
+    timeline = []
+    windows_analyzed = 0
+
+    try:
+        duration = sf.info(file_obj).duration
+        file_obj.seek(0)
+
+        batches = iter_window_batches(file_obj, hop_secs, BATCH_MAX_WINDOWS)
+        while (batch := await run_in_threadpool(next, batches, None)) is not None:
+            start_times, windows = batch
+            confidences, _, probabilities = await executor.run(infer_windows, windows)
+            sums, counts = species_masks.species_scores(confidences, mask, confidence_threshold)
+
+            if custom_max is None:
+                custom_max, custom_sum = probabilities.max(axis=0), probabilities.sum(axis=0)
+                species_sums, species_counts = sums, counts
+            else:
+                custom_max = np.maximum(custom_max, probabilities.max(axis=0))
+                custom_sum = custom_sum + probabilities.sum(axis=0)
+                species_sums, species_counts = species_sums + sums, species_counts + counts
+
+            window_tops = species_masks.window_tops(confidences, mask, confidence_threshold)
+            for start_time, window_top in zip(start_times, window_tops):
+                if window_top:
+                    timeline.append({
+                        "start_time": round(start_time, 3),
+                        "end_time": round(start_time + WINDOW_SECS, 3),
+                        "scientific_name": window_top[0],
+                        "confidence": window_top[1]
+                    })
+
+            windows_analyzed += len(windows)
+    except sf.LibsndfileError as e:
         return {
-            "scientific_name": fallback_species,
-            "source": "own custom model for local species"
+            "error": "Unsupported or corrupt audio file.",
+            "details": str(e)
         }
 
-    os.remove(temp_path)
+    if not windows_analyzed:
+        return {"error": "Recording is too short to analyze."}
+
+    result = species_masks.top_species(species_sums, species_counts, mask) or {}
+    if result:
+        result["source"] = "birdnet"
+
+    if not result or result["average_confidence"] < 0.5:
+        pooled = custom_max if CUSTOM_MODEL_AGGREGATION == "max" else custom_sum / windows_analyzed
+        result = custom_model_result(pooled)
+
     return {
-        "scientific_name": birdnet_result['scientific_name'],
-        "average_confidence": birdnet_result['average_confidence'],
-        "source": "birdnet"
+        **result,
+        "duration": round(duration, 3),
+        "windows_analyzed": windows_analyzed,
+        "timeline": timeline
+    }
+
+def cache_params(lat=None, lon=None, date=None):
+    """Cache key parameters of a request; without a location it shares the batch endpoint's entries."""
+    if lat is None or lon is None:
+        return CACHE_PARAMS
+    return f"{CACHE_PARAMS}:{lat}:{lon}:{date}"
+
+def cached_result(audio, params=CACHE_PARAMS):
+    """Look up a previous identification of the same bytes, returning ``(key, result)``."""
+    if not result_cache.enabled:
+        return None, None
+    key = result_cache.key(audio, params)
+    return key, result_cache.get(key)
+
+def remember_result(key, result):
+    """Cache a successful identification; errors are never cached."""
+    if key is not None and not result.get("error"):
+        result_cache.put(key, {k: v for k, v in result.items() if k != "filename"})
+
+async def resolve_species_mask(lat, lon, date):
+    """Class mask for a request's location and date, or a 400 response if only one coordinate is given."""
+    if (lat is None) != (lon is None):
+        return None, JSONResponse(status_code=400, content={"error": "lat and lon must be given together."})
+    # the first request for a location loads BirdNET's meta model, so keep it off the event loop
+    return await run_in_threadpool(species_masks.resolve, lat, lon, date), None
+
+def busy_response():
+    """503 returned when the inference queue is full."""
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={"error": BUSY_MESSAGE}
+    )
+
+@app.get("/health")
+async def health():
+    """Liveness probe: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: green only once every inference worker has been warmed up."""
+    if not executor.ready:
+        return JSONResponse(status_code=503, content={"status": "warming up"})
+    return {"status": "ready"}
+
+@app.get("/metrics")
+async def metrics():
+    """Inference pool occupancy plus queue-wait and compute-time statistics."""
+    return {
+        "workers": executor.workers,
+        "in_flight": executor.in_flight,
+        "capacity": executor.capacity,
+        "micro_batches": batcher.batches,
+        "average_batch_size": round(batcher.average_batch_size, 2),
+        "cache": result_cache.stats(),
+        **executor.metrics.snapshot()
     }
 
+async def detect_species_batched(audio, fmt=None, mask=None):
+    """Decode the first 3 seconds on a thread, then share an inference batch with concurrent requests."""
+    samples = await run_in_threadpool(preprocess_audio_bytes, audio, fmt)
+    if isinstance(samples, dict) and "error" in samples:
+        return samples
+
+    try:
+        confidences, embeddings, probabilities = await batcher.submit(samples[np.newaxis, :])
+    except Saturated:
+        raise
+    except Exception as e:
+        return {"error": f"BirdNET analysis failed: {e}"}
+
+    return resolve_species(top_species_from_confidences(confidences, mask), embeddings, probabilities)
+
 @app.post("/analyze-bird")
-async def analyze(file: UploadFile = File(...)):
-    """API endpoint to analyze uploaded audio and identify bird species."""
-    audio_bytes = await file.read()
-    result = detect_species_from_audio(audio_bytes)
+async def analyze(
+    file: UploadFile = File(...),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    date: Optional[Date] = Query(None)
+):
+    """API endpoint to analyze uploaded audio and identify bird species.
+
+    With ``lat``/``lon`` (and optionally the recording ``date``) only species BirdNET
+    expects at that place and time of year are reported.
+    """
+    # Reject unknown containers from the header alone, before hashing or decoding
+    fmt = sniff_format(await file.read(SNIFF_BYTES))
+    if fmt is None:
+        return JSONResponse(status_code=415, content=unsupported_format_error())
+
+    mask, error = await resolve_species_mask(lat, lon, date)
+    if error is not None:
+        return error
+
+    key, result = await run_in_threadpool(cached_result, file.file, cache_params(lat, lon, date))
+    if result is not None:
+        return result
+
+    try:
+        result = await detect_species_batched(file.file, fmt, mask)
+    except Saturated:
+        return busy_response()
+
+    if isinstance(result, dict) and result.get("error"):
+        return JSONResponse(status_code=400, content=result)
+
+    await run_in_threadpool(remember_result, key, result)
+    return result
+
+@app.post("/analyze-bird/batch")
+async def analyze_batch(files: List[UploadFile] = File(...)):
+    """Analyze many clips (or zip/tar archives of clips), streaming one NDJSON line per file."""
+    if executor.saturated:
+        return busy_response()
+
+    # Limits apply to the whole batch and are checked before each archive member is decompressed
+    max_bytes = MAX_BATCH_EXPANDED_MB * 1024 * 1024
+    named_uploads = []
+    expanded_bytes = 0
+    try:
+        for upload in files:
+            members = await run_in_threadpool(
+                list,
+                expand_upload(
+                    upload.filename,
+                    await upload.read(),
+                    max_files=BATCH_MAX_FILES - len(named_uploads),
+                    max_bytes=max_bytes - expanded_bytes
+                )
+            )
+            named_uploads.extend(members)
+            expanded_bytes += sum(len(data) for _, data in members)
+    except TooManyFiles:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Too many files in batch (limit {BATCH_MAX_FILES})."}
+        )
+    except ExpandedTooLarge:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"Batch expands beyond the {MAX_BATCH_EXPANDED_MB} MB limit."}
+        )
+
+    async def stream_results():
+        # cached files are answered first; the rest go to the workers in groups.
+        # Hashing and the disk tier touch the file system, so both stay off the event loop.
+        pending = []
+        for name, data in named_uploads:
+            key, result = await run_in_threadpool(cached_result, data)
+            if result is not None:
+                yield json.dumps({"filename": name, **result}) + "\n"
+            else:
+                pending.append((name, data, key))
+
+        for start in range(0, len(pending), BATCH_MAX_WINDOWS):
+            group = pending[start:start + BATCH_MAX_WINDOWS]
+            try:
+                results = await executor.run(detect_species_for_uploads, [(name, data) for name, data, _ in group])
+            except Saturated:
+                results = [{"filename": name, "error": BUSY_MESSAGE} for name, _, _ in group]
+            for (name, _, key), result in zip(group, results):
+                # never pair a content key with another upload's answer
+                if result.get("filename") == name:
+                    await run_in_threadpool(remember_result, key, result)
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/analyze-bird/long")
+async def analyze_long(
+    file: UploadFile = File(...),
+    hop_seconds: float = Query(LONG_HOP_SECS, gt=0, le=WINDOW_SECS),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    date: Optional[Date] = Query(None)
+):
+    """Analyze a full-length recording with sliding windows and return a detection timeline."""
+    # Long recordings are streamed through libsndfile, so other containers are refused up front
+    if sniff_format(await file.read(SNIFF_BYTES)) not in SOUNDFILE_FORMATS:
+        return JSONResponse(status_code=415, content=unsupported_format_error())
+    await file.seek(0)
+
+    mask, error = await resolve_species_mask(lat, lon, date)
+    if error is not None:
+        return error
+
+    try:
+        result = await detect_species_from_stream(file.file, hop_seconds, mask=mask)
+    except Saturated:
+        return busy_response()
 
     if isinstance(result, dict) and result.get("error"):
         return JSONResponse(status_code=400, content=result)
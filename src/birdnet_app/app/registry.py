@@ -0,0 +1,65 @@
+"""Process-wide registry holding the BirdNET analyzer shared by all requests."""
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from app.engines import build_analyzer
+from app.inference import SAMPLE_RATE
+
+
+class AnalyzerRegistry:
+    """Builds the BirdNET analyzer once per worker and serializes access to it.
+
+    The TFLite interpreter inside ``Analyzer`` keeps per-invocation state (input
+    tensors, ``analyzer.results``), so callers must hold the registry lock while
+    running a recording through it.
+    """
+
+    def __init__(self, factory=None):
+        """Create an empty registry; the analyzer is built on first use or at startup.
+
+        ``factory`` builds the analyzer (birdnetlib's FP32 ``Analyzer`` by default).
+        """
+        self._factory = factory
+        self._analyzer = None
+        self._build_lock = threading.Lock()
+        self._inference_lock = threading.RLock()
+        self._ready = threading.Event()
+
+    @property
+    def loaded(self):
+        """Whether the analyzer has been built."""
+        return self._analyzer is not None
+
+    @property
+    def ready(self):
+        """Whether the analyzer is built and a warm-up inference has completed."""
+        return self._ready.is_set()
+
+    def load(self):
+        """Build the analyzer if it has not been built yet and return it."""
+        if self._analyzer is None:
+            with self._build_lock:
+                if self._analyzer is None:
+                    self._analyzer = (self._factory or build_analyzer)()
+        return self._analyzer
+
+    def warm_up(self):
+        """Run one inference on 3 seconds of silence so the first request is not cold."""
+        from birdnetlib.main import RecordingBuffer
+
+        with self.acquire() as analyzer:
+            silence = np.zeros(3 * SAMPLE_RATE, dtype=np.float32)
+            recording = RecordingBuffer(analyzer, silence, SAMPLE_RATE)
+            recording.analyze()
+        self._ready.set()
+
+    @contextmanager
+    def acquire(self):
+        """Yield the shared analyzer while holding the inference lock."""
+        analyzer = self.load()
+        with self._inference_lock:
+            yield analyzer
+
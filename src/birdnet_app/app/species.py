@@ -0,0 +1,129 @@
+"""Class masks restricting BirdNET's output to a species list or a location, with NumPy aggregation."""
+
+import calendar
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.engines import BIRDNET_LABEL_PATH
+
+# Minimum meta-model score for a species to count as present (birdnetlib's default)
+LOCATION_FILTER_THRESHOLD = 0.03
+
+
+def date_to_week_48(date):
+    """BirdNET's week-of-year index (1-48) for a date, as in birdnetlib.utils."""
+    day_of_year = date.timetuple().tm_yday
+    days_in_year = 366 if calendar.isleap(date.year) else 365
+    return math.ceil(day_of_year / days_in_year * 48)
+
+
+def load_labels(path=BIRDNET_LABEL_PATH):
+    """BirdNET output labels ("Scientific name_Common name") in class-index order."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def read_species_list(path):
+    """Read an allow-list file: one label or scientific name per line, ``#`` starts a comment."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+class SpeciesMasks:
+    """Boolean masks over BirdNET's output classes, computed once per species list or location.
+
+    A mask selects the columns of a ``(n_windows, n_classes)`` confidence matrix that
+    may be reported; ``None`` means every class. ``allow_list`` is the deployment-wide
+    list applied to every request. Location lists come from birdnetlib's meta model,
+    which is loaded on the first location request, and are cached per rounded
+    coordinate and week.
+    """
+
+    def __init__(self, labels, allow_list=None, max_masks=256):
+        """Index the labels and build the mask for the configured allow-list."""
+        self.labels = np.asarray(labels)
+        self.scientific_names = np.array([label.split("_", 1)[0] for label in labels])
+        self.max_masks = max_masks
+        self._masks = OrderedDict()
+        self._lock = threading.RLock()
+        self._species_model = None
+        self.default = self.for_list(allow_list) if allow_list else None
+
+    def for_list(self, species):
+        """Mask of the classes whose label or scientific name is in ``species``."""
+        species = frozenset(species)
+        return self._cached(
+            ("list", species),
+            lambda: np.isin(self.labels, list(species)) | np.isin(self.scientific_names, list(species))
+        )
+
+    def for_location(self, lat, lon, week_48=-1, threshold=LOCATION_FILTER_THRESHOLD):
+        """Mask of the species BirdNET's meta model expects at a location and week (-1 = all year)."""
+        def build():
+            if self._species_model is None:
+                from birdnetlib.species import SpeciesList
+                self._species_model = SpeciesList()
+            species = self._species_model.return_list_for_analyzer(
+                lat=lat, lon=lon, week_48=week_48, threshold=threshold
+            )
+            return self.for_list(species)
+
+        return self._cached(("location", round(lat, 2), round(lon, 2), week_48, threshold), build)
+
+    def resolve(self, lat=None, lon=None, date=None):
+        """Mask for one request: its location list, if any, intersected with the allow-list."""
+        if lat is None or lon is None:
+            return self.default
+
+        location = self.for_location(lat, lon, date_to_week_48(date) if date else -1)
+        return location if self.default is None else location & self.default
+
+    def species_scores(self, confidences, mask=None, min_conf=0.1):
+        """Per-species sum and count of window scores above ``min_conf``, restricted to ``mask``."""
+        scores = confidences if mask is None else confidences[:, mask]
+        hits = scores > min_conf
+        return np.where(hits, scores, 0.0).sum(axis=0), hits.sum(axis=0)
+
+    def top_species(self, sums, counts, mask=None):
+        """The species with the highest average score, as ``{"scientific_name", "average_confidence"}``."""
+        if not counts.any():
+            return None
+
+        averages = np.divide(sums, counts, out=np.zeros(len(sums)), where=counts > 0)
+        best = int(averages.argmax())
+        names = self.scientific_names if mask is None else self.scientific_names[mask]
+        return {
+            "scientific_name": str(names[best]),
+            "average_confidence": round(float(averages[best]), 3)
+        }
+
+    def window_tops(self, confidences, mask=None, min_conf=0.1):
+        """Best species per window as ``(scientific_name, confidence)``, or None below ``min_conf``."""
+        scores = confidences if mask is None else confidences[:, mask]
+        names = self.scientific_names if mask is None else self.scientific_names[mask]
+        if scores.shape[1] == 0:
+            return [None] * len(scores)
+
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(scores)), best]
+        return [
+            (str(names[index]), round(float(score), 3)) if score > min_conf else None
+            for index, score in zip(best, best_scores)
+        ]
+
+    def _cached(self, key, build):
+        """Return the mask for ``key``, building it on a miss and evicting the oldest entry."""
+        with self._lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                return self._masks[key]
+
+            mask = build()
+            self._masks[key] = mask
+            while len(self._masks) > self.max_masks:
+                self._masks.popitem(last=False)
+            return mask
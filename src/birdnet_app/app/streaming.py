@@ -0,0 +1,60 @@
+"""Bounded-memory sliding-window reader for long field recordings."""
+
+import numpy as np
+import soundfile as sf
+
+from app.decoding import resample
+from app.inference import SAMPLE_RATE
+
+WINDOW_SECS = 3.0
+
+# BirdNET drops trailing chunks shorter than this and zero-pads longer ones
+MIN_TAIL_SECS = 1.5
+
+
+def iter_windows(file_obj, hop_secs, block_secs=60):
+    """Yield ``(start_time, window)`` pairs of overlapping 3-second windows at 48 kHz.
+
+    The recording is read ``block_secs`` at a time and only the unconsumed tail of
+    the previous block is carried over, so memory stays bounded by the block size
+    regardless of how long the recording is.
+    """
+    window = int(WINDOW_SECS * SAMPLE_RATE)
+    hop = max(1, int(hop_secs * SAMPLE_RATE))
+
+    with sf.SoundFile(file_obj) as sound_file:
+        native_rate = sound_file.samplerate
+        carry = np.zeros(0, dtype=np.float32)
+        offset = 0  # index of carry[0] in the 48 kHz timeline
+
+        blocks = sound_file.blocks(
+            blocksize=int(block_secs * native_rate), dtype="float32", always_2d=True
+        )
+        for block in blocks:
+            mono = resample(block.mean(axis=1), native_rate, SAMPLE_RATE)
+
+            buffer = np.concatenate([carry, mono])
+            start = 0
+            while start + window <= len(buffer):
+                yield (offset + start) / SAMPLE_RATE, buffer[start:start + window]
+                start += hop
+
+            carry = buffer[start:]
+            offset += start
+
+        if len(carry) >= int(MIN_TAIL_SECS * SAMPLE_RATE):
+            yield offset / SAMPLE_RATE, np.pad(carry, (0, window - len(carry)))
+
+
+def iter_window_batches(file_obj, hop_secs, batch_size):
+    """Group streamed windows into ``(start_times, stacked_windows)`` batches."""
+    start_times, windows = [], []
+    for start_time, window in iter_windows(file_obj, hop_secs):
+        start_times.append(start_time)
+        windows.append(window)
+        if len(windows) >= batch_size:
+            yield start_times, np.stack(windows)
+            start_times, windows = [], []
+
+    if windows:
+        yield start_times, np.stack(windows)
@@ -0,0 +1,77 @@
+"""Decode latency per format and backend for the /analyze-bird preprocessing step.
+
+Re-encodes a sample recording as WAV, FLAC, OGG/Vorbis and MP3, then times every
+decoder backend on each (decoding only the analyzed window) and prints the median
+and p95 latency. Backends that cannot read a format, e.g. pydub without ffmpeg,
+are reported as unavailable.
+
+Run from src/birdnet_app:
+    python -m benchmarks.bench_decode --source ../../tests/test.mp3 --repeats 20
+"""
+
+import argparse
+import time
+from io import BytesIO
+
+import numpy as np
+import soundfile as sf
+
+from app.decoding import DECODERS
+
+FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+
+def encode(samples, rate, fmt):
+    """Encode mono samples into an in-memory file of the given format."""
+    container, subtype = FORMATS[fmt]
+    buffer = BytesIO()
+    sf.write(buffer, samples, rate, format=container, subtype=subtype)
+    return buffer.getvalue()
+
+
+def time_backend(decoder, audio_bytes, max_secs, repeats):
+    """Return per-call latencies in milliseconds, or None if the backend fails."""
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        try:
+            decoder(audio_bytes, max_secs)
+        except Exception:
+            return None
+        latencies.append(1000 * (time.perf_counter() - started))
+    return latencies
+
+
+def main():
+    """Print one row per (format, backend)."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="../../tests/test.mp3", help="Recording to re-encode")
+    parser.add_argument("--seconds", type=float, default=30, help="Length of the encoded clips")
+    parser.add_argument("--max-secs", type=float, default=3, help="Seconds decoded per call")
+    parser.add_argument("--repeats", type=int, default=20, help="Decodes per measurement")
+    args = parser.parse_args()
+
+    samples, rate = sf.read(args.source, dtype="float32", always_2d=True)
+    samples = samples.mean(axis=1)[:int(args.seconds * rate)]
+
+    print(f"{'format':>6} {'backend':>10} {'size KB':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for fmt in FORMATS:
+        audio_bytes = encode(samples, rate, fmt)
+        for name, decoder in DECODERS.items():
+            latencies = time_backend(decoder, audio_bytes, args.max_secs, args.repeats)
+            if latencies is None:
+                print(f"{fmt:>6} {name:>10} {len(audio_bytes) // 1024:>8} {'unavailable':>17}")
+                continue
+            print(
+                f"{fmt:>6} {name:>10} {len(audio_bytes) // 1024:>8} "
+                f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Latency and memory per inference engine.
+
+Each engine runs in a fresh subprocess so its resident set size is measured in
+isolation. BirdNET engines are timed on batches of 3-second windows; custom-model
+engines on batches of embeddings. Engines whose model file or runtime is missing
+are reported as unavailable.
+
+Run from src/birdnet_app:
+    python -m benchmarks.bench_engines --repeats 20 --batch 8
+    BIRDNET_INT8_MODEL_PATH=/models/BirdNET_GLOBAL_6K_V2.4_Model_INT8.tflite python -m benchmarks.bench_engines
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ENGINES = [
+    ("birdnet", "tflite"),
+    ("birdnet", "tflite-int8"),
+    ("custom", "numpy"),
+    ("custom", "sklearn"),
+    ("custom", "onnx"),
+]
+
+
+def rss_mb():
+    """Current resident set size of this process in megabytes."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_engine(kind, engine):
+    """Build the engine and return a callable running one batch of the given size."""
+    if kind == "birdnet":
+        from app.engines import birdnet_factory
+        from app.inference import run_single_pass
+
+        factory, _ = birdnet_factory(engine, os.environ.get("BIRDNET_INT8_MODEL_PATH"))
+        analyzer = factory()
+        return lambda batch: run_single_pass(analyzer, np.random.randn(batch, 144000).astype(np.float32))
+
+    from app.engines import CUSTOM_MODEL_FILES, load_custom_model
+
+    model = load_custom_model(engine, CUSTOM_MODEL_FILES[engine])
+    return lambda batch: model.predict_proba(np.random.randn(batch, 1024).astype(np.float32))
+
+
+def measure(kind, engine, batch, repeats):
+    """Child-process entry point: print latency percentiles and RSS as JSON."""
+    baseline = rss_mb()
+    run = load_engine(kind, engine)
+    run(batch)  # warm-up
+
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run(batch)
+        latencies.append(1000 * (time.perf_counter() - started))
+
+    print(json.dumps({
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "rss_mb": rss_mb(),
+        "model_rss_mb": rss_mb() - baseline,
+    }))
+
+
+def main():
+    """Run every engine in its own process and print one row each."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20, help="Timed batches per engine")
+    parser.add_argument("--batch", type=int, default=8, help="Windows or embeddings per batch")
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "ENGINE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(*args.child, args.batch, args.repeats)
+        return
+
+    print(f"{'model':>8} {'engine':>12} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'+model MB':>10}")
+    for kind, engine in ENGINES:
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_engines", "--child", kind, engine,
+             "--batch", str(args.batch), "--repeats", str(args.repeats)],
+            capture_output=True, text=True
+        )
+        lines = child.stdout.strip().splitlines()
+        if child.returncode != 0 or not lines:
+            print(f"{kind:>8} {engine:>12} {'unavailable':>17}")
+            continue
+        row = json.loads(lines[-1])
+        print(
+            f"{kind:>8} {engine:>12} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+            f"{row['rss_mb']:>8.1f} {row['model_rss_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
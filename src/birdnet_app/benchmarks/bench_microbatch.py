@@ -0,0 +1,67 @@
+"""Throughput/latency curve of the /analyze-bird micro-batching scheduler.
+
+Fires bursts of concurrent single-window requests through ``MicroBatcher`` with the
+real BirdNET analyzer and custom model, for a grid of max-batch-size and max-wait
+settings, and prints requests/second together with p50/p95 latency.
+
+Run from src/birdnet_app:
+    python -m benchmarks.bench_microbatch --requests 64 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.batching import MicroBatcher
+from app.main import infer_windows, registry
+
+
+async def run_burst(batcher, windows, concurrency):
+    """Submit every window with at most ``concurrency`` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request(window):
+        async with semaphore:
+            started = time.perf_counter()
+            await batcher.submit(window[np.newaxis, :])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(window) for window in windows))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    """Print one row per (max batch, max wait) configuration."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64, help="Requests per configuration")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests in flight")
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32", help="Comma-separated max batch sizes")
+    parser.add_argument("--waits", default="0,5,10,25", help="Comma-separated max waits in ms")
+    args = parser.parse_args()
+
+    registry.load()
+    registry.warm_up()
+    rng = np.random.default_rng(0)
+    windows = (rng.standard_normal((args.requests, 3 * 48000)) * 0.1).astype(np.float32)
+
+    async def run_batch(stacked):
+        return await asyncio.to_thread(infer_windows, stacked)
+
+    print(f"{'max_batch':>9} {'wait_ms':>7} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8} {'avg_batch':>9}")
+    for max_batch in [int(v) for v in args.batch_sizes.split(",")]:
+        for max_wait in [float(v) for v in args.waits.split(",")]:
+            batcher = MicroBatcher(run_batch, max_batch, max_wait)
+            elapsed, latencies = asyncio.run(run_burst(batcher, windows, args.concurrency))
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+            print(
+                f"{max_batch:>9} {max_wait:>7.0f} {args.requests / elapsed:>8.2f} "
+                f"{p50:>8.1f} {p95:>8.1f} {batcher.average_batch_size:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Import-time breakdown of the birdnet_app service.
+
+Imports ``app.main`` in a fresh interpreter under ``python -X importtime`` and
+prints the total import time and the top-level packages that account for most of
+it (each module's own import time, summed per package), then times the model
+load and warm-up done by the lifespan.
+
+Run from src/birdnet_app:
+    python -m benchmarks.profile_startup --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# "import time:  self [us] | cumulative | imported package" lines written to stderr
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def import_profile(module="app.main"):
+    """Import time in microseconds per top-level package, plus the total."""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    )
+    if child.returncode != 0:
+        raise RuntimeError(child.stderr.strip().splitlines()[-1])
+
+    packages = defaultdict(int)
+    total = 0
+    for line in child.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, _, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us)
+        total += int(self_us)
+    return packages, total
+
+
+def model_load_secs():
+    """Seconds taken by the work the lifespan does before readiness: loading and warming the analyzer."""
+    from app.registry import AnalyzerRegistry
+
+    registry = AnalyzerRegistry()
+    started = time.perf_counter()
+    registry.load()
+    loaded = time.perf_counter()
+    registry.warm_up()
+    return loaded - started, time.perf_counter() - loaded
+
+
+def main():
+    """Print the import breakdown and the model load time."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--skip-models", action="store_true", help="Only profile imports")
+    args = parser.parse_args()
+
+    packages, total = import_profile()
+    print(f"import app.main: {total / 1e6:.3f} s")
+    print(f"{'package':>24} {'ms':>8} {'share':>7}")
+    for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:>24} {micros / 1000:>8.1f} {micros / total:>7.1%}")
+
+    if not args.skip_models:
+        load, warm_up = model_load_secs()
+        print(f"analyzer load: {load:.3f} s, warm-up inference: {warm_up:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
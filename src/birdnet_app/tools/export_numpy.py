@@ -0,0 +1,47 @@
+"""Export the custom MLP as memory-mappable NumPy weights for ``CUSTOM_MODEL_ENGINE=numpy``.
+
+Writes one uncompressed ``.npy`` file per weight matrix and bias vector, the class
+labels and a small ``model.json``, so the service can map the weights at start-up
+instead of importing scikit-learn to unpickle the model.
+
+Run from src/birdnet_app:
+    python -m tools.export_numpy --model mlp_model_birdnet.pkl --output mlp_model_birdnet_weights
+"""
+
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+
+
+def export(model, output_dir):
+    """Write the weights, biases and classes of a fitted ``MLPClassifier`` to ``output_dir``."""
+    os.makedirs(output_dir, exist_ok=True)
+    for index, (coef, intercept) in enumerate(zip(model.coefs_, model.intercepts_)):
+        np.save(os.path.join(output_dir, f"coef_{index}.npy"), np.ascontiguousarray(coef))
+        np.save(os.path.join(output_dir, f"intercept_{index}.npy"), np.ascontiguousarray(intercept))
+    np.save(os.path.join(output_dir, "classes.npy"), np.asarray(model.classes_))
+
+    with open(os.path.join(output_dir, "model.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "n_layers": len(model.coefs_),
+            "activation": model.activation,
+            "out_activation": model.out_activation_,
+        }, f, indent=2)
+
+
+def main():
+    """Export the model given on the command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="mlp_model_birdnet.pkl", help="Pickled scikit-learn model")
+    parser.add_argument("--output", default="mlp_model_birdnet_weights", help="Directory to write the weights to")
+    args = parser.parse_args()
+
+    export(joblib.load(args.model), args.output)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Export the custom MLP to ONNX for the ``CUSTOM_MODEL_ENGINE=onnx`` engine.
+
+Requires skl2onnx and onnx, which are build-time tools and not part of the
+service image. The class labels are stored in the model metadata so the ONNX
+engine reports the same ``classes_`` as the pickled model.
+
+Run from src/birdnet_app:
+    python -m tools.export_onnx --model mlp_model_birdnet.pkl --output mlp_model_birdnet.onnx
+"""
+
+import argparse
+import json
+
+import joblib
+import numpy as np
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+
+def export(model, output_path):
+    """Convert a fitted classifier to ONNX with a plain probability tensor output."""
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[("embeddings", FloatTensorType([None, model.n_features_in_]))],
+        options={id(model): {"zipmap": False}},
+        target_opset=17,
+    )
+    entry = onnx_model.metadata_props.add()
+    entry.key = "classes"
+    entry.value = json.dumps(np.asarray(model.classes_).tolist())
+
+    with open(output_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+
+def main():
+    """Export the model given on the command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="mlp_model_birdnet.pkl", help="Pickled scikit-learn model")
+    parser.add_argument("--output", default="mlp_model_birdnet.onnx", help="Where to write the ONNX model")
+    args = parser.parse_args()
+
+    export(joblib.load(args.model), args.output)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
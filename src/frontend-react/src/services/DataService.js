@@ -36,7 +36,7 @@ const DataService = {
         return await api.get(BASE_API_URL + "/bird_maps/" + bird_map_id);
     },
     GetChats: async function (model, limit) {
-        return await api.get(BASE_API_URL + "/" + model + "/chats/?limit=" + limit);
+        return await api.get(BASE_API_URL + "/" + model + "/chats/?fields=summary&limit=" + limit);
     },
     GetChat: async function (model, chat_id) {
         return await api.get(BASE_API_URL + "/" + model + "/chats/" + chat_id);
@@ -0,0 +1,7 @@
+import os
+
+# Run birdnet_app inference in-process so tests can patch the pipeline
+os.environ.setdefault("BIRDNET_WORKERS", "0")
+
+# Tests reuse the same upload bytes with different mocks, so start without a result cache
+os.environ.setdefault("BIRDNET_CACHE_MAX_ENTRIES", "0")
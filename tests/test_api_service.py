@@ -0,0 +1,1089 @@
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio
+import base64
+import fcntl
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.utils import blob_store, chat_index, chat_log
+from api.utils.birdnet_client import BirdNetClient, BirdNetError
+from api.utils.chat_index import SessionIndex, chat_summary
+from api.utils.blob_store import (
+    BlobStore, LocalBlobStore, RangeNotSatisfiable, blob_content_type, blob_id_for, parse_range
+)
+from api.utils.chat_log import ChatLog
+from api.utils.chat_utils import ChatHistoryManager
+from api.utils.embedding_cache import EmbeddingCache, normalize_query
+from api.utils.json_catalog import JsonCatalog, serialize
+from api.utils.session_history import SUMMARY_ACK, history_turns
+from api.utils.session_store import (
+    HistorySessionStore, LocalSessionStore, SessionStore, approx_session_bytes, create_session_store
+)
+
+
+# I. Pooled birdnet_app client
+def _birdnet_client(responses, **kwargs):
+    """Client whose transport replays ``responses`` (status codes, headers dicts or exceptions) in order"""
+    replies = list(responses)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        status, headers = reply if isinstance(reply, tuple) else (reply, {})
+        return httpx.Response(status, headers=headers, json={"species": "Turdus merula"})
+
+    client = BirdNetClient("http://birdnet", transport=httpx.MockTransport(handler), **kwargs)
+    return client, requests
+
+
+def _analyze(client):
+    """Run one analysis and close the client"""
+    async def run():
+        try:
+            return await client.analyze(b"audio", "bird.mp3")
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_birdnet_client_retries_busy_responses():
+    """A 503 is retried and the next successful answer is returned"""
+    client, requests = _birdnet_client([503, 200], max_retries=2, backoff=0)
+    with patch("api.utils.birdnet_client.asyncio.sleep", new=AsyncMock()) as sleep:
+        assert _analyze(client) == {"species": "Turdus merula"}
+
+    assert len(requests) == 2
+    assert requests[0].url.path == "/analyze-bird"
+    sleep.assert_awaited_once()
+
+def test_birdnet_client_honours_retry_after():
+    """The wait before a retry is the Retry-After birdnet_app sent"""
+    client, _ = _birdnet_client([(503, {"Retry-After": "3"}), 200], max_retries=1)
+    with patch("api.utils.birdnet_client.asyncio.sleep", new=AsyncMock()) as sleep:
+        _analyze(client)
+
+    sleep.assert_awaited_once_with(3.0)
+
+def test_birdnet_client_retries_connection_errors():
+    """Connection failures are retried like busy responses"""
+    client, requests = _birdnet_client([httpx.ConnectError("refused"), 200], max_retries=1, backoff=0)
+    with patch("api.utils.birdnet_client.asyncio.sleep", new=AsyncMock()):
+        assert _analyze(client) == {"species": "Turdus merula"}
+    assert len(requests) == 2
+
+def test_birdnet_client_gives_up_after_max_retries():
+    """After max_retries retries the last failure is raised as BirdNetError"""
+    client, requests = _birdnet_client([503, 502, 504], max_retries=2, backoff=0)
+    with patch("api.utils.birdnet_client.asyncio.sleep", new=AsyncMock()) as sleep:
+        with pytest.raises(BirdNetError, match="HTTP 504 after 3 attempts"):
+            _analyze(client)
+
+    assert len(requests) == 3
+    assert sleep.await_count == 2
+
+def test_birdnet_client_does_not_retry_client_errors():
+    """A 4xx answer is raised at once without retrying"""
+    client, requests = _birdnet_client([415, 200], max_retries=2)
+    with pytest.raises(BirdNetError, match="HTTP 415"):
+        _analyze(client)
+    assert len(requests) == 1
+
+def test_birdnet_client_backoff_is_bounded():
+    """Jittered backoff doubles its bound per attempt; Retry-After is capped at the read timeout"""
+    client = BirdNetClient("http://birdnet", read_timeout=5.0, backoff=0.5)
+    for attempt in (1, 2, 3):
+        for _ in range(20):
+            assert 0 <= client.retry_delay(attempt) <= 0.5 * 2 ** (attempt - 1)
+
+    busy = httpx.Response(503, headers={"Retry-After": "60"})
+    assert client.retry_delay(1, busy) == 5.0
+    not_seconds = httpx.Response(503, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    with patch("api.utils.birdnet_client.random.uniform", return_value=0.1):
+        assert client.retry_delay(1, not_seconds) == 0.1
+
+
+# II. Append-only chat log
+def _message(message_id, content="text"):
+    """A stored chat message"""
+    return {"message_id": message_id, "role": "user", "content": content}
+
+
+def _chat(chat_id="c1", dts=1000, messages=()):
+    """A stored chat"""
+    return {"chat_id": chat_id, "title": f"title {chat_id}", "dts": dts, "messages": list(messages)}
+
+
+def test_chat_log_append_replays_over_snapshot(tmp_path):
+    """Appended turns are read back by a fresh ChatLog without rewriting the snapshot"""
+    path = str(tmp_path / "c1.json")
+    ChatLog(path).write(_chat(messages=[_message("m1"), _message("m2")]))
+    snapshot = open(path, "rb").read()
+
+    ChatLog(path).append([_message("m3"), _message("m4")], {"chat_id": "c1", "title": "renamed", "dts": 2000})
+
+    chat = ChatLog(path).read()
+    assert [m["message_id"] for m in chat["messages"]] == ["m1", "m2", "m3", "m4"]
+    assert chat["title"] == "renamed"
+    assert chat["dts"] == 2000
+    assert open(path, "rb").read() == snapshot
+
+def test_chat_log_skips_torn_trailing_line(tmp_path):
+    """A record cut short by a crash is ignored and does not swallow the next append"""
+    path = str(tmp_path / "c1.json")
+    log = ChatLog(path)
+    log.write(_chat(messages=[_message("m1")]))
+    log.append([_message("m2")], {"dts": 2000})
+    with open(log.log_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "message", "message": {"message_id": "m3", "con')
+
+    assert [m["message_id"] for m in log.read()["messages"]] == ["m1", "m2"]
+
+    log.append([_message("m4")], {"dts": 3000})
+    chat = log.read()
+    assert [m["message_id"] for m in chat["messages"]] == ["m1", "m2", "m4"]
+    assert chat["dts"] == 3000
+
+def test_chat_log_compacts_into_snapshot(tmp_path):
+    """Once the log outgrows the snapshot it is folded into it and emptied"""
+    path = str(tmp_path / "c1.json")
+    log = ChatLog(path)
+    log.write(_chat(messages=[_message("m1")]))
+    with patch.object(chat_log, "COMPACT_MIN_BYTES", 0):
+        log.append([_message("m2", "x" * 1000)], {"title": "compacted"})
+
+    assert os.path.getsize(log.log_path) == 0
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert [m["message_id"] for m in snapshot["messages"]] == ["m1", "m2"]
+    assert snapshot["title"] == "compacted"
+    assert log.read() == snapshot
+
+def test_chat_log_skips_messages_already_in_snapshot(tmp_path):
+    """Records left behind by a compaction interrupted before truncating are not replayed twice"""
+    path = str(tmp_path / "c1.json")
+    log = ChatLog(path)
+    log.write(_chat(messages=[_message("m1")]))
+    log.append([_message("m2")], {"dts": 2000})
+    # the snapshot was rewritten but the crash happened before the log was truncated
+    chat_log.write_json_atomic(path, log.read())
+
+    assert [m["message_id"] for m in log.read()["messages"]] == ["m1", "m2"]
+
+def test_chat_log_write_replaces_log(tmp_path):
+    """A full write resets the log, and a missing chat reads as None"""
+    path = str(tmp_path / "c1.json")
+    log = ChatLog(path)
+    assert log.read() is None
+    assert not log.exists()
+
+    log.write(_chat(messages=[_message("m1")]))
+    log.append([_message("m2")], {})
+    log.write(_chat(messages=[_message("m9")]))
+
+    assert log.exists()
+    assert [m["message_id"] for m in log.read()["messages"]] == ["m9"]
+
+def test_chat_log_read_waits_for_compaction(tmp_path):
+    """A read never pairs a snapshot with a log from the other side of a compaction"""
+    path = str(tmp_path / "c1.json")
+    log = ChatLog(path)
+    log.write(_chat(messages=[_message("m1")]))
+    log.append([_message("m2")], {})
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(chat=log.read()))
+
+    with open(log.log_path, "a", encoding="utf-8") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive()
+        # what append() does when it compacts: fold the log into the snapshot, then empty it
+        chat_log.write_json_atomic(path, _chat(messages=[_message("m1"), _message("m2")]))
+        held.truncate(0)
+    reader.join()
+
+    assert [m["message_id"] for m in result["chat"]["messages"]] == ["m1", "m2"]
+
+
+# III. Per-session chat index
+def _summary(chat_id, dts, message_count=1):
+    """An index entry"""
+    return {"chat_id": chat_id, "title": f"title {chat_id}", "dts": dts, "message_count": message_count}
+
+
+def test_session_index_replays_upserts(tmp_path):
+    """A fresh index reads every upsert back, the last summary of a chat winning"""
+    index = SessionIndex(str(tmp_path))
+    assert not index.exists()
+    index.upsert(_summary("a", 100))
+    index.upsert(_summary("b", 200))
+    index.upsert(_summary("a", 300, message_count=3))
+
+    reloaded = SessionIndex(str(tmp_path))
+    assert reloaded.exists()
+    assert [s["chat_id"] for s in reloaded.top()] == ["a", "b"]
+    assert reloaded.get("a")["message_count"] == 3
+    assert reloaded.top(1) == [_summary("a", 300, message_count=3)]
+
+def test_session_index_sees_other_workers(tmp_path):
+    """Upserts and compactions by another worker are picked up on the next read"""
+    reader = SessionIndex(str(tmp_path))
+    writer = SessionIndex(str(tmp_path))
+    writer.upsert(_summary("a", 100))
+    assert [s["chat_id"] for s in reader.top()] == ["a"]
+
+    version = reader.version()
+    with patch.object(chat_index, "COMPACT_SLACK", 0):
+        writer.upsert(_summary("a", 200))
+        writer.upsert(_summary("b", 150))
+    assert [s["chat_id"] for s in reader.top()] == ["a", "b"]
+    assert reader.get("a")["dts"] == 200
+    assert reader.version() != version
+    with open(reader.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+def test_session_index_concurrent_upserts_are_not_lost(tmp_path):
+    """Workers appending under the file lock never drop each other's lines"""
+    def worker(n):
+        index = SessionIndex(str(tmp_path))
+        for i in range(50):
+            index.upsert(_summary(f"w{n}-{i}", i))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(SessionIndex(str(tmp_path)).top()) == 200
+
+def test_session_index_rebuild_replaces_entries(tmp_path):
+    """Rebuilding keeps only the given summaries, one line each"""
+    index = SessionIndex(str(tmp_path))
+    index.upsert(_summary("old", 100))
+    index.rebuild([_summary("a", 100), _summary("b", 200)])
+
+    assert [s["chat_id"] for s in SessionIndex(str(tmp_path)).top()] == ["b", "a"]
+    with open(index.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+def _write_legacy_chat(history_dir, session_id, chat):
+    """A chat saved as a plain JSON file, without the index"""
+    session_dir = os.path.join(history_dir, "llm-cnn", session_id)
+    os.makedirs(session_dir, exist_ok=True)
+    with open(os.path.join(session_dir, f"{chat['chat_id']}.json"), "w", encoding="utf-8") as f:
+        json.dump(chat, f)
+
+
+def test_chat_manager_indexes_legacy_sessions(tmp_path):
+    """A session without an index is indexed from its chat files on first access"""
+    for i in range(3):
+        _write_legacy_chat(str(tmp_path), "s1", _chat(f"c{i}", dts=1000 + i, messages=[_message(f"m{i}")]))
+
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    assert [s["chat_id"] for s in manager.get_recent_chat_summaries("s1")] == ["c2", "c1", "c0"]
+    assert os.path.exists(os.path.join(manager.history_dir, "s1", chat_index.INDEX_FILENAME))
+
+def test_chat_manager_rebuilds_stale_index(tmp_path):
+    """Chat files added or deleted without the index are reconciled by the next process"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    manager.save_chat(_chat("c0", dts=1000, messages=[_message("m0")]), "s1")
+    manager.save_chat(_chat("c1", dts=1001, messages=[_message("m1")]), "s1")
+    _write_legacy_chat(str(tmp_path), "s1", _chat("c2", dts=1002, messages=[_message("m2")]))
+    os.remove(os.path.join(manager.history_dir, "s1", "c0.json"))
+
+    restarted = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    assert [s["chat_id"] for s in restarted.get_recent_chat_summaries("s1")] == ["c2", "c1"]
+
+def test_chat_manager_keeps_turns_saved_from_the_same_chat(tmp_path):
+    """Two turns built on the same stored chat are both kept, in the order they were saved"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    manager.save_chat(_chat("c1", messages=[_message("u0"), _message("a0")]), "s1")
+    first = manager.get_chat("c1", "s1")
+    second = manager.get_chat("c1", "s1")
+
+    first["messages"] += [_message("uA"), _message("aA")]
+    second["messages"] += [_message("uB"), _message("aB")]
+    manager.save_chat(first, "s1")
+    manager.save_chat(second, "s1")
+
+    stored = manager.get_chat("c1", "s1")
+    assert [m["message_id"] for m in stored["messages"]] == ["u0", "a0", "uA", "aA", "uB", "aB"]
+    assert manager.get_recent_chat_summaries("s1")[0]["message_count"] == 6
+
+def test_chat_manager_appends_new_turns(tmp_path):
+    """Saving a grown chat appends to its log and updates its index entry"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    chat = _chat("c1", dts=1000, messages=[_message("m1"), _message("m2")])
+    manager.save_chat(chat, "s1")
+    snapshot_path = os.path.join(manager.history_dir, "s1", "c1.json")
+    snapshot = open(snapshot_path, "rb").read()
+
+    chat["messages"] += [_message("m3"), _message("m4")]
+    chat["dts"] = 2000
+    manager.save_chat(chat, "s1")
+
+    assert open(snapshot_path, "rb").read() == snapshot
+    assert manager.get_chat("c1", "s1") == chat
+    assert manager.get_recent_chat_summaries("s1") == [chat_summary(chat)]
+
+
+# IV. Chat listing: pagination, summaries and conditional GET
+@pytest.fixture
+def llm_utils(monkeypatch):
+    """api.utils.llm_cnn_utils, imported without contacting Vertex AI"""
+    pytest.importorskip("vertexai")
+    monkeypatch.setenv("GCP_PROJECT", os.environ.get("GCP_PROJECT", "test-project"))
+    with patch("vertexai.generative_models.GenerativeModel"), \
+         patch("vertexai.language_models.TextEmbeddingModel.from_pretrained"):
+        from api.utils import agent_tools, llm_cnn_utils
+    return llm_cnn_utils
+
+
+@pytest.fixture
+def chat_api(llm_utils, tmp_path, monkeypatch):
+    """TestClient for the llm-cnn router, its chat history and audio under tmp_path"""
+    pytest.importorskip("chromadb")
+    monkeypatch.chdir(tmp_path)
+    with patch("chromadb.HttpClient"):
+        from api.routers import llm_cnn_chat
+
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path / "chat-history"))
+    monkeypatch.setattr(llm_cnn_chat, "chat_manager", manager)
+    monkeypatch.setattr(llm_cnn_chat, "audio_store", LocalBlobStore(str(tmp_path / "blobs")))
+    app = FastAPI()
+    app.include_router(llm_cnn_chat.router, prefix="/llm-cnn")
+    return TestClient(app), llm_cnn_chat
+
+
+def _saved_chats(manager, session_id, count, dts=1000):
+    """Save ``count`` chats, two per ``dts`` second, and return them"""
+    chats = [_chat(f"c{i:02d}", dts=dts + i // 2, messages=[_message(f"m{i}")]) for i in range(count)]
+    for chat in chats:
+        manager.save_chat(chat, session_id)
+    return chats
+
+
+def test_chat_pages_are_stable_across_inserts(tmp_path):
+    """Chats saved between two pages go to the front instead of shifting later pages"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    _saved_chats(manager, "s1", 9)
+
+    first, cursor = manager.get_chat_page("s1", limit=4)
+    assert [c["chat_id"] for c in first] == ["c08", "c07", "c06", "c05"]
+    manager.save_chat(_chat("new", dts=5000), "s1")
+    manager.save_chat(_chat("c02a", dts=1001), "s1")
+
+    second, cursor = manager.get_chat_page("s1", limit=4, cursor=cursor)
+    assert [c["chat_id"] for c in second] == ["c04", "c03", "c02a", "c02"]
+    last, cursor = manager.get_chat_page("s1", limit=4, cursor=cursor)
+    assert [c["chat_id"] for c in last] == ["c01", "c00"]
+    assert cursor is None
+
+def test_chat_page_rejects_invalid_cursor(tmp_path):
+    """A cursor that was not issued by a previous page is a ValueError"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    _saved_chats(manager, "s1", 2)
+    for cursor in ("zz", "bm90IGpzb24", "WyJhIiwgMV0"):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            manager.get_chat_page("s1", limit=1, cursor=cursor)
+
+def test_chat_page_summary_reads_no_chat_files(tmp_path):
+    """Summaries come from the index alone and carry the message count"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    chats = _saved_chats(manager, "s1", 3)
+
+    with patch.object(ChatLog, "read") as read:
+        summaries, cursor = manager.get_chat_page("s1", summary=True)
+    read.assert_not_called()
+    assert summaries == [chat_summary(chat) for chat in reversed(chats)]
+    assert cursor is None
+
+def test_chat_page_etag_changes_on_save(tmp_path):
+    """The ETag is stable until a chat of the session is saved, and differs per query"""
+    manager = ChatHistoryManager(model="llm-cnn", history_dir=str(tmp_path))
+    _saved_chats(manager, "s1", 3)
+
+    etag = manager.get_page_etag("s1", limit=2)
+    assert manager.get_page_etag("s1", limit=2) == etag
+    assert manager.get_page_etag("s1", limit=2, summary=True) != etag
+    assert manager.get_page_etag("s2", limit=2) != etag
+
+    manager.save_chat(_chat("c09", dts=3000), "s1")
+    assert manager.get_page_etag("s1", limit=2) != etag
+
+def test_chats_endpoint_pages_and_revalidates(chat_api):
+    """The listing returns summaries with a next cursor, a 304 until a save, and a 400 for bad input"""
+    client, router = chat_api
+    headers = {"X-Session-ID": "s1"}
+    _saved_chats(router.chat_manager, "s1", 3)
+
+    response = client.get("/llm-cnn/chats", params={"limit": 2, "fields": "summary"}, headers=headers)
+    assert response.status_code == 200
+    assert [c["chat_id"] for c in response.json()] == ["c02", "c01"]
+    assert set(response.json()[0]) == {"chat_id", "title", "dts", "message_count"}
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/llm-cnn/chats", params={"limit": 2, "cursor": cursor}, headers=headers)
+    assert [c["chat_id"] for c in response.json()] == ["c00"]
+    assert "X-Next-Cursor" not in response.headers
+
+    etag = client.get("/llm-cnn/chats", headers=headers).headers["ETag"]
+    response = client.get("/llm-cnn/chats", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    router.chat_manager.save_chat(_chat("c09", dts=3000), "s1")
+    response = client.get("/llm-cnn/chats", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["chat_id"] == "c09"
+
+    assert client.get("/llm-cnn/chats", params={"cursor": "zz"}, headers=headers).status_code == 400
+    assert client.get("/llm-cnn/chats", params={"fields": "all"}, headers=headers).status_code == 400
+    assert client.get("/llm-cnn/chats", params={"limit": 0}, headers=headers).status_code == 400
+
+
+# V. Content-addressed audio store
+def test_blob_store_deduplicates_content(tmp_path):
+    """Storing the same bytes twice keeps one file under the same id"""
+    store = LocalBlobStore(str(tmp_path))
+    first = store.put(b"chirp", "audio/mpeg", "a.mp3")
+    second = store.put(b"chirp", "audio/mpeg", "b.mp3")
+    other = store.put(b"trill", "audio/mpeg", "a.mp3")
+
+    assert first == second != other
+    assert first.endswith(".mp3")
+    assert store.stats()["stored"] == 2
+    assert store.stats()["deduplicated"] == 1
+    assert store.size(first) == 5
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 2
+
+def test_blob_ids_carry_a_safe_extension():
+    """The extension comes from the type, else the file name, and never escapes the id pattern"""
+    assert blob_id_for(b"x", "audio/webm;codecs=opus").endswith(".webm")
+    assert blob_id_for(b"x", "application/octet-stream", "call.WAV").endswith(".wav")
+    assert "." not in blob_id_for(b"x", "", "../../etc/passwd")
+    assert blob_content_type(blob_id_for(b"x", "audio/x-m4a")) == "audio/mp4"
+
+def test_blob_store_reads_ranges_and_rejects_bad_ids(tmp_path):
+    """Ranges are read in chunks, and ids that are not content addresses are not found"""
+    store = LocalBlobStore(str(tmp_path))
+    data = bytes(range(256)) * 10
+    blob_id = store.put(data, "audio/wav")
+    with patch.object(blob_store, "CHUNK_SIZE", 100):
+        chunks = list(store.read_range(blob_id, 50, 349))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 100]
+    assert b"".join(chunks) == data[50:350]
+
+    assert store.size("../" + blob_id) is None
+    assert store.size("0" * 64 + ".mp3") is None
+    with pytest.raises(ValueError):
+        list(store.read_range("../secret", 0, 10))
+
+def test_incomplete_blob_store_fails_on_creation():
+    """A backend missing part of the BlobStore interface cannot be instantiated"""
+    class WriteOnlyStore(BlobStore):
+        def put(self, data, content_type, filename=""):
+            return blob_id_for(data, content_type, filename)
+
+    with pytest.raises(TypeError, match="abstract"):
+        WriteOnlyStore()
+
+def test_parse_range():
+    """Single ranges, open and suffix ranges are clamped to the blob; others are served whole or rejected"""
+    assert parse_range(None, 1000) is None
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=900-5000", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    assert parse_range("bytes=0-1,5-9", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=-", 1000) is None
+    for header in ("bytes=1000-", "bytes=5-4", "bytes=-0"):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 1000)
+
+def test_audio_endpoint_serves_ranges_and_etags(chat_api):
+    """Audio is served whole, in byte ranges, as 304 on a matching ETag, and 416 past its end"""
+    client, router = chat_api
+    data = bytes(range(256)) * 4
+    blob_id = router.audio_store.put(data, "audio/mpeg")
+
+    response = client.get(f"/llm-cnn/audio/{blob_id}")
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+    assert etag == f'"{blob_id}"'
+
+    response = client.get(f"/llm-cnn/audio/{blob_id}", headers={"Range": "bytes=-24"})
+    assert response.status_code == 206
+    assert response.content == data[-24:]
+    assert response.headers["content-range"] == f"bytes 1000-1023/{len(data)}"
+
+    assert client.get(f"/llm-cnn/audio/{blob_id}", headers={"If-None-Match": etag}).status_code == 304
+    response = client.get(f"/llm-cnn/audio/{blob_id}", headers={"Range": "bytes=2000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+    assert client.get(f"/llm-cnn/audio/{'0' * 64}.mp3").status_code == 404
+
+
+# VI. Bounded live-session store
+def _session(text=""):
+    """A chat session whose history holds one part with ``text``"""
+    return SimpleNamespace(history=[SimpleNamespace(parts=[SimpleNamespace(text=text)])])
+
+
+class _Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_session_store_evicts_least_recently_used():
+    """Past max_entries the session used longest ago is evicted"""
+    store = LocalSessionStore(max_entries=2, max_bytes=0, ttl_secs=0)
+    store["a"], store["b"] = _session(), _session()
+    assert store.get("a") is not None
+    store["c"] = _session()
+
+    assert "b" not in store
+    assert "a" in store and "c" in store
+    assert store.stats()["evictions"] == {"lru": 1, "bytes": 0, "ttl": 0}
+
+def test_session_store_expires_idle_sessions():
+    """A session idle past the TTL is dropped, and each access restarts its TTL"""
+    clock = _Clock()
+    with patch("api.utils.session_store.time.monotonic", clock):
+        store = LocalSessionStore(max_entries=10, max_bytes=0, ttl_secs=60)
+        store["a"], store["b"] = _session(), _session()
+        clock.now += 50
+        assert store.get("a") is not None
+        clock.now += 50
+
+        assert store.get("b") is None
+        assert store.get("a") is not None
+        assert store.stats()["evictions"]["ttl"] == 1
+        assert store.stats()["hits"] == 2
+        assert store.stats()["misses"] == 1
+
+def test_session_store_bounds_bytes_as_histories_grow():
+    """Sessions are re-measured on access, and the oldest are evicted to stay under max_bytes"""
+    size = approx_session_bytes(_session("x" * 1000))
+    store = LocalSessionStore(max_entries=10, max_bytes=3 * size, ttl_secs=0)
+    for chat_id in "abc":
+        store[chat_id] = _session("x" * 1000)
+    assert store.stats()["approx_bytes"] == 3 * size
+
+    grown = store.get("c")
+    grown.history.append(SimpleNamespace(parts=[SimpleNamespace(text="y" * 1000)]))
+    store["c"] = grown
+
+    assert "a" not in store
+    assert "b" in store and "c" in store
+    assert store.stats()["evictions"]["bytes"] == 1
+    assert store.stats()["approx_bytes"] <= 3 * size
+
+def test_session_store_keeps_a_session_larger_than_the_bound():
+    """The session just stored is never evicted, even when it alone exceeds max_bytes"""
+    store = LocalSessionStore(max_entries=10, max_bytes=100, ttl_secs=0)
+    store["a"] = _session("x" * 10)
+    store["big"] = _session("x" * 10000)
+    assert "big" in store
+    assert "a" not in store
+
+def test_incomplete_session_store_fails_on_creation():
+    """A backend missing part of the SessionStore interface cannot be instantiated"""
+    class DictStore(SessionStore):
+        def get(self, chat_id):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        DictStore()
+
+def test_create_session_store_from_env(monkeypatch):
+    """SESSION_STORE_* variables pick and size the backend"""
+    monkeypatch.setenv("SESSION_STORE_MAX_ENTRIES", "5")
+    monkeypatch.setenv("SESSION_STORE_MAX_MB", "1")
+    store = create_session_store()
+    assert isinstance(store, LocalSessionStore)
+    assert (store.max_entries, store.max_bytes) == (5, 1024 * 1024)
+
+    monkeypatch.setenv("SESSION_STORE_BACKEND", "history")
+    store = create_session_store()
+    assert isinstance(store, HistorySessionStore)
+    store["a"] = _session()
+    assert store.get("a") is None
+
+    with pytest.raises(ValueError):
+        create_session_store("redis")
+
+
+# VII. Query embedding cache
+def _embedder():
+    """Embedding function returning a vector derived from the text length"""
+    return MagicMock(side_effect=lambda text: [float(len(text)), 1.0])
+
+
+def test_embedding_cache_hits_on_normalized_text():
+    """Queries differing only in case, width or whitespace share one embedding"""
+    embed = _embedder()
+    cache = EmbeddingCache(embed, model="m", dimension=2)
+    first = cache.embed("Barn  Owl")
+    assert cache.embed(" barn owl\n") == first
+    assert cache.embed("ＢＡＲＮ OWL") == first
+    cache.embed("barn swallow")
+
+    assert embed.call_count == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+    assert normalize_query("  Ｔawny\tOWL ") == "tawny owl"
+
+def test_embedding_cache_evicts_least_recently_used():
+    """Beyond max_entries the entry used longest ago is recomputed on its next use"""
+    embed = _embedder()
+    cache = EmbeddingCache(embed, model="m", dimension=2, max_entries=2)
+    cache.embed("a")
+    cache.embed("b")
+    cache.embed("a")
+    cache.embed("c")
+
+    assert cache.stats()["evictions"] == 1
+    cache.embed("a")
+    assert embed.call_count == 3
+    cache.embed("b")
+    assert embed.call_count == 4
+
+def test_embedding_cache_persists_across_restarts(tmp_path):
+    """Embeddings appended to the file are loaded by the next cache of the same model and dimension"""
+    path = str(tmp_path / "cache" / "embeddings.jsonl")
+    cache = EmbeddingCache(_embedder(), model="m", dimension=2, path=path)
+    assert cache.warm_up(["Barn owl", "barn owl", "Kestrel"]) == 2
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"model": "m", "dimension": 2, "text": "torn')
+
+    embed = _embedder()
+    restarted = EmbeddingCache(embed, model="m", dimension=2, path=path)
+    assert restarted.embed("BARN OWL") == [8.0, 1.0]
+    assert restarted.embed("kestrel") == [7.0, 1.0]
+    embed.assert_not_called()
+
+    assert EmbeddingCache(_embedder(), model="m", dimension=3, path=path).stats()["entries"] == 0
+    assert EmbeddingCache(_embedder(), model="other", dimension=2, path=path).stats()["entries"] == 0
+
+def test_embedding_cache_save_compacts_file(tmp_path):
+    """Saving rewrites the file with only the live entries"""
+    path = str(tmp_path / "embeddings.jsonl")
+    cache = EmbeddingCache(_embedder(), model="m", dimension=2, max_entries=2, path=path)
+    for text in ("a", "b", "c"):
+        cache.embed(text)
+    cache.save()
+
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["text"] for line in f] == ["b", "c"]
+
+
+# VIII. In-memory JSON catalog
+def _write_document(folder, doc_id, dts, **fields):
+    """Write a catalog document and return it"""
+    document = {"id": doc_id, "dts": dts, **fields}
+    with open(os.path.join(folder, f"{doc_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(document, f)
+    return document
+
+
+def _touch(path, seconds):
+    """Move a file's mtime ``seconds`` into the future"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + int(seconds * 1e9)))
+
+
+def test_catalog_serves_sorted_bodies(tmp_path):
+    """List and get bodies match FastAPI's serialization, newest first, skipping unparsable files"""
+    folder = str(tmp_path)
+    old = _write_document(folder, "old", 100, title="Kiwi")
+    new = _write_document(folder, "new", 200, title="Kākāpō")
+    (tmp_path / "broken.json").write_text("{not json")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    catalog = JsonCatalog(folder)
+    assert catalog.list_body() == serialize([new, old])
+    assert catalog.list_body(1) == serialize([new])
+    assert catalog.get_body("old") == serialize(old)
+    assert catalog.get_body("broken") is None
+    assert catalog.get_body("missing") is None
+
+def test_catalog_reloads_only_changed_files(tmp_path):
+    """A rescan re-parses files whose mtime changed, picks up new ones and drops deleted ones"""
+    folder = str(tmp_path)
+    _write_document(folder, "a", 100)
+    _write_document(folder, "b", 200)
+    catalog = JsonCatalog(folder, refresh_secs=3600)
+    assert [d["id"] for d in catalog.documents()] == ["b", "a"]
+    assert catalog.reloads == 2
+    assert not catalog.refresh()
+
+    updated = _write_document(folder, "a", 300, title="updated")
+    _touch(os.path.join(folder, "a.json"), 1)
+    _write_document(folder, "c", 50)
+    assert catalog.refresh()
+    assert catalog.reloads == 4
+    assert catalog.get_body("a") == serialize(updated)
+    assert [d["id"] for d in catalog.documents()] == ["a", "b", "c"]
+
+    os.remove(os.path.join(folder, "b.json"))
+    assert catalog.refresh()
+    assert catalog.get_body("b") is None
+    assert catalog.list_body() == serialize(catalog.documents())
+
+def test_catalog_rescans_at_most_every_refresh_secs(tmp_path):
+    """Changes are seen once refresh_secs have passed since the last scan"""
+    folder = str(tmp_path)
+    _write_document(folder, "a", 100)
+    clock = _Clock()
+    with patch("api.utils.json_catalog.time.monotonic", clock):
+        catalog = JsonCatalog(folder, refresh_secs=2.0)
+        assert catalog.get_body("b") is None
+        _write_document(folder, "b", 200)
+
+        clock.now += 1
+        assert catalog.get_body("b") is None
+        clock.now += 1
+        assert catalog.get_body("b") is not None
+
+
+# IX. Streamed chat turns
+def _sse_events(body):
+    """``(event, data)`` pairs of a server-sent event stream"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _stream_events(*events, error=None):
+    """Stand-in for stream_chat_response_async yielding ``events``, then raising ``error``"""
+    async def stream(chat_session, message, priming_prompt=None, collection=None):
+        for event in events:
+            yield event
+        if error:
+            raise error
+    return stream
+
+
+def _run_stream_turn(router, chat, plan, disconnect_after=None):
+    """Collect the SSE body of stream_turn, closing it early after ``disconnect_after`` events"""
+    async def run():
+        body = []
+        turn = router.stream_turn(chat, router.chat_sessions.get(chat["chat_id"]), plan, "s1")
+        async for event in turn:
+            body.append(event)
+            if disconnect_after is not None and len(body) == disconnect_after:
+                await turn.aclose()
+                break
+        return "".join(body)
+    return asyncio.run(run())
+
+
+def test_stream_turn_saves_turn_and_sends_done(chat_api, monkeypatch):
+    """Deltas and a fallback replacement are streamed, then the stored chat is sent as done"""
+    _, router = chat_api
+    monkeypatch.setattr(router, "stream_chat_response_async", _stream_events(
+        {"delta": "Not enough "}, {"delta": "information."}, {"replace": "Owls hunt at night."}
+    ))
+    chat = _chat("c1", messages=[])
+    router.chat_sessions["c1"] = MagicMock()
+    plan = router.TurnPlan(_message("u1", "Do owls hunt?"), "Do owls hunt?", None)
+
+    events = _sse_events(_run_stream_turn(router, chat, plan))
+
+    assert [event for event, _ in events] == ["delta", "delta", "replace", "done"]
+    stored = router.chat_manager.get_chat("c1", "s1")
+    assert events[-1][1] == stored
+    assert [m["content"] for m in stored["messages"]] == ["Do owls hunt?", "Owls hunt at night."]
+    assert "c1" in router.chat_sessions
+
+def test_stream_turn_reports_llm_errors(chat_api, monkeypatch):
+    """An LLM failure mid-stream ends with an error event, nothing stored and the live session dropped"""
+    _, router = chat_api
+    monkeypatch.setattr(router, "stream_chat_response_async",
+                        _stream_events({"delta": "Owls "}, error=RuntimeError("quota exceeded")))
+    router.chat_sessions["c1"] = MagicMock()
+    plan = router.TurnPlan(_message("u1", "Do owls hunt?"), "Do owls hunt?", None)
+
+    events = _sse_events(_run_stream_turn(router, _chat("c1"), plan))
+
+    assert events[-1] == ("error", {"detail": "LLM error: quota exceeded"})
+    assert router.chat_manager.get_chat("c1", "s1") == {}
+    assert "c1" not in router.chat_sessions
+
+def test_stream_turn_drops_session_when_client_disconnects(chat_api, monkeypatch):
+    """A stream closed before the turn is stored drops the live session, which may hold that turn"""
+    _, router = chat_api
+    monkeypatch.setattr(router, "stream_chat_response_async",
+                        _stream_events({"delta": "Owls "}, {"delta": "hunt."}))
+    chat = _chat("c1", messages=[_message("u0"), _message("a0")])
+    router.chat_manager.save_chat(chat, "s1")
+    router.chat_sessions["c1"] = MagicMock()
+    plan = router.TurnPlan(_message("u1", "Do owls hunt?"), "Do owls hunt?", None)
+
+    _run_stream_turn(router, dict(chat, messages=list(chat["messages"])), plan, disconnect_after=1)
+
+    assert "c1" not in router.chat_sessions
+    assert router.chat_manager.get_chat("c1", "s1") == chat
+
+
+def _response_chunk(text=None):
+    """A (streamed) model response; without ``text`` it carries only a function call"""
+    chunk = SimpleNamespace(candidates=[SimpleNamespace(function_calls=[])])
+    if text is not None:
+        chunk.text = text
+    return chunk
+
+
+class _FakeChatSession:
+    """ChatSession answering each send with the next scripted list of chunks"""
+
+    def __init__(self, *answers, delay=0.0):
+        self.answers = list(answers)
+        self.delay = delay
+        self.sent = []
+        self.threads = []
+        self.calls = []  # (started, finished) of each send
+
+    def send_message(self, content, tools=None, generation_config=None, stream=False):
+        started = time.monotonic()
+        time.sleep(self.delay)
+        self.sent.append(content)
+        self.threads.append(threading.current_thread().name)
+        chunks = self.answers.pop(0)
+        self.calls.append((started, time.monotonic()))
+        if stream:
+            return iter([_response_chunk(text) for text in chunks])
+        return _response_chunk("".join(chunks))
+
+
+def _collect(events):
+    """Drain an async iterator into a list"""
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+
+def test_stream_chat_response_yields_deltas(llm_utils):
+    """Each chunk with text becomes a delta; function-call chunks are skipped"""
+    session = _FakeChatSession(["Owls ", None, "hunt at night."])
+    events = list(llm_utils.stream_chat_response(session, {"content": "Do owls hunt?"}))
+
+    assert events == [{"delta": "Owls "}, {"delta": "hunt at night."}]
+    assert session.sent == ["Do owls hunt?"]
+
+def test_stream_chat_response_replaces_fallback_answer(llm_utils):
+    """An answer with a fallback phrase is superseded by a final replace event"""
+    session = _FakeChatSession(["Not enough ", "information."], ["Owls hunt at night."])
+    events = list(llm_utils.stream_chat_response(session, {"content": "Do owls hunt?"}))
+
+    assert events == [{"delta": "Not enough "}, {"delta": "information."}, {"replace": "Owls hunt at night."}]
+    assert session.sent[1] == llm_utils.fallback_info
+
+def test_stream_chat_response_async_runs_on_llm_pool(llm_utils):
+    """Blocking sends run on the LLM thread pool, never on the event loop"""
+    session = _FakeChatSession(["Owls ", "hunt."])
+    events = _collect(llm_utils.stream_chat_response_async(session, {"content": "Do owls hunt?"}))
+
+    assert events == [{"delta": "Owls "}, {"delta": "hunt."}]
+    assert session.threads[0].startswith("vertex")
+
+def _overlap(first, second):
+    """Whether two (started, finished) intervals overlap"""
+    return first[0] < second[1] and second[0] < first[1]
+
+
+def test_sends_on_one_session_run_one_after_the_other(llm_utils):
+    """Concurrent messages on one session are serialized; different sessions run in parallel"""
+    shared = _FakeChatSession(["Owls hunt."], ["Kiwis probe."], delay=0.1)
+    first, second = _FakeChatSession(["Owls hunt."], delay=0.1), _FakeChatSession(["Kiwis probe."], delay=0.1)
+
+    async def run():
+        await asyncio.gather(
+            llm_utils.generate_chat_response_async(shared, {"content": "owls"}),
+            llm_utils.generate_chat_response_async(shared, {"content": "kiwis"}),
+        )
+        await asyncio.gather(
+            llm_utils.generate_chat_response_async(first, {"content": "owls"}),
+            llm_utils.generate_chat_response_async(second, {"content": "kiwis"}),
+        )
+    asyncio.run(run())
+
+    assert not _overlap(*shared.calls)
+    assert _overlap(first.calls[0], second.calls[0])
+
+def test_stream_holds_the_session_lock(llm_utils):
+    """A message sent while an answer is streaming waits for the stream to finish"""
+    session = _FakeChatSession(["Owls ", "hunt."], ["Kiwis probe."], delay=0.1)
+
+    async def run():
+        async def stream():
+            return [event async for event in llm_utils.stream_chat_response_async(session, {"content": "owls"})]
+        return await asyncio.gather(stream(), llm_utils.generate_chat_response_async(session, {"content": "kiwis"}))
+    events, reply = asyncio.run(run())
+
+    assert events == [{"delta": "Owls "}, {"delta": "hunt."}]
+    assert reply == "Kiwis probe."
+    assert session.sent == ["owls", "kiwis"]
+    assert not _overlap(*session.calls)
+
+
+# X. Rebuilding LLM sessions from saved chats
+def _turn(role, content, **fields):
+    """A saved chat message"""
+    return {"message_id": content, "role": role, "content": content, **fields}
+
+
+def test_history_turns_map_roles():
+    """User messages become user turns and assistant messages model turns; other roles are skipped"""
+    history = [_turn("user", "Do owls hunt?"), _turn("system", "ignored"), _turn("assistant", "At night.")]
+    assert history_turns(history) == [("user", "Do owls hunt?"), ("model", "At night.")]
+
+def test_history_turns_merge_consecutive_roles():
+    """Messages of the same role in a row are merged so roles alternate"""
+    history = [
+        _turn("user", "Hello."), _turn("user", "Do owls hunt?"),
+        _turn("assistant", "Yes."), _turn("assistant", "At night."), _turn("assistant", "   "),
+    ]
+    assert history_turns(history) == [("user", "Hello.\n\nDo owls hunt?"), ("model", "Yes.\n\nAt night.")]
+
+def test_history_turns_note_audio_only_messages():
+    """A user message with only a recording is replaced by a note naming it"""
+    history = [
+        _turn("user", "", name="dawn.mp3", audio_path="audio/abc.mp3"),
+        _turn("assistant", "The species identified is **Tinamus osgoodi**."),
+    ]
+    assert history_turns(history)[0] == ("user", "[Audio recording uploaded: dawn.mp3]")
+
+def test_history_turns_start_with_user_and_end_with_model():
+    """A leading model turn and a trailing unanswered question are dropped"""
+    history = [
+        _turn("assistant", "Welcome!"), _turn("user", "Do owls hunt?"),
+        _turn("assistant", "At night."), _turn("user", "And kiwis?"),
+    ]
+    assert history_turns(history) == [("user", "Do owls hunt?"), ("model", "At night.")]
+    assert history_turns([_turn("user", "Hello?")]) == []
+
+def test_history_turns_fold_older_exchanges():
+    """Past max_turns older questions become one summary exchange, or are dropped without summarize"""
+    history = []
+    for i in range(5):
+        history += [_turn("user", f"question {i}"), _turn("assistant", f"answer {i}")]
+
+    turns = history_turns(history, max_turns=2)
+    assert len(turns) == 6
+    assert turns[0][0] == "user"
+    assert "- question 0\n- question 1\n- question 2" in turns[0][1]
+    assert "answer 0" not in turns[0][1]
+    assert turns[1] == ("model", SUMMARY_ACK)
+    assert turns[2:] == [("user", "question 3"), ("model", "answer 3"), ("user", "question 4"), ("model", "answer 4")]
+
+    assert history_turns(history, max_turns=2, summarize=False) == turns[2:]
+    assert len(history_turns(history, max_turns=0)) == 10
+
+def test_rebuild_chat_session_makes_no_model_calls(llm_utils):
+    """Rebuilding starts a chat with the converted history and never sends a message"""
+    history = [_turn("user", "Do owls hunt?"), _turn("assistant", "At night.")]
+    with patch.object(llm_utils, "generative_model") as model:
+        session = llm_utils.rebuild_chat_session(history)
+
+    assert session is model.start_chat.return_value
+    contents = model.start_chat.call_args.kwargs["history"]
+    assert [(c.role, c.parts[0].text) for c in contents] == history_turns(history)
+    session.send_message.assert_not_called()
+
+
+# XI. Chat message bodies: multipart, raw audio and JSON
+@pytest.fixture
+def chat_post(chat_api, monkeypatch):
+    """POST to /llm-cnn/chats with BirdNET and the LLM replaced; returns (post, identify mock)"""
+    client, router = chat_api
+    identify = AsyncMock(return_value={"scientific_name": "Tinamus osgoodi", "average_confidence": 0.9})
+    monkeypatch.setattr(router, "identify_audio", identify)
+    monkeypatch.setattr(router, "generate_chat_response_async", AsyncMock(return_value="Tinamous live in forests."))
+
+    def post(**kwargs):
+        return client.post("/llm-cnn/chats", headers={"X-Session-ID": "s1", **kwargs.pop("headers", {})}, **kwargs)
+    return post, identify
+
+
+def test_chat_accepts_multipart_audio(chat_post):
+    """A multipart file is identified as uploaded, next to the form's question"""
+    post, identify = chat_post
+    response = post(files={"file": ("dawn.mp3", b"ID3audio", "audio/mpeg")}, data={"content": "Which bird?"})
+
+    assert response.status_code == 200
+    upload = identify.call_args.args[0]
+    assert (upload.data, upload.filename, upload.content_type) == (b"ID3audio", "dawn.mp3", "audio/mpeg")
+    user_message = response.json()["messages"][0]
+    assert user_message["content"] == "Which bird?"
+    assert user_message["name"] == "dawn.mp3"
+    assert user_message["audio_path"].startswith("audio/")
+
+def test_chat_accepts_raw_audio(chat_post):
+    """A raw audio body is identified with its own content type and the name from the query"""
+    post, identify = chat_post
+    response = post(content=b"RIFFaudio", headers={"Content-Type": "audio/wav"}, params={"name": "dusk.wav"})
+
+    assert response.status_code == 200
+    upload = identify.call_args.args[0]
+    assert (upload.data, upload.filename, upload.content_type) == (b"RIFFaudio", "dusk.wav", "audio/wav")
+    assert response.json()["messages"][1]["content"].startswith("The species identified is **Tinamus osgoodi**")
+
+def test_chat_accepts_base64_json_audio(chat_post):
+    """JSON audio is decoded from a data URL, whose media type is kept"""
+    post, identify = chat_post
+    audio = "data:audio/ogg;base64," + base64.b64encode(b"OggSaudio").decode()
+    response = post(json={"content": "", "audio": audio, "name": "call.ogg"})
+
+    assert response.status_code == 200
+    upload = identify.call_args.args[0]
+    assert (upload.data, upload.filename, upload.content_type) == (b"OggSaudio", "call.ogg", "audio/ogg")
+    assert "audio" not in response.json()["messages"][0]
+
+def test_chat_treats_empty_uploads_as_text(chat_post):
+    """Empty multipart files and raw bodies are not sent to BirdNET; the question is answered as text"""
+    post, identify = chat_post
+    multipart = post(files={"file": ("empty.mp3", b"", "audio/mpeg")}, data={"content": "Do owls hunt?"})
+    raw = post(content=b"", headers={"Content-Type": "audio/mpeg"}, params={"content": "Do kiwis fly?"})
+
+    assert multipart.status_code == raw.status_code == 200
+    identify.assert_not_called()
+    assert "audio_path" not in multipart.json()["messages"][0]
+    assert raw.json()["messages"][1]["content"] == "Tinamous live in forests."
+    assert post(content=b"", headers={"Content-Type": "audio/mpeg"}).status_code == 400
+
+def test_chat_rejects_malformed_bodies(chat_post):
+    """Invalid base64, JSON that is not an object and unknown bodies are 400s"""
+    post, identify = chat_post
+    invalid_base64 = post(json={"content": "", "audio": "data:audio/mpeg;base64,abc"})
+    not_an_object = post(json=["Do owls hunt?"])
+    not_json = post(content=b"Do owls hunt?", headers={"Content-Type": "text/plain"})
+
+    assert invalid_base64.status_code == 400
+    assert "Invalid audio base64" in invalid_base64.json()["detail"]
+    assert not_an_object.status_code == 400
+    assert not_an_object.json()["detail"] == "Chat message must be a JSON object."
+    assert not_json.status_code == 400
+    identify.assert_not_called()
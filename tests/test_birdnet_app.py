@@ -0,0 +1,842 @@
+from unittest.mock import patch, MagicMock
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+from pydub import AudioSegment
+import numpy as np
+import soundfile as sf
+
+from app import main
+from app.archives import ExpandedTooLarge, TooManyFiles, expand_upload
+from app.batching import MicroBatcher
+from app.cache import ResultCache
+from app.decoding import SNIFF_BYTES, DecodeError, decode_audio, sniff_format
+from app.inference import run_single_pass
+from app.limits import UploadSizeLimitMiddleware, UploadTooLarge
+from app.engines import NumpyMLP, OnnxClassifier, birdnet_factory
+from app.executor import InferenceExecutor, Saturated
+from app.registry import AnalyzerRegistry
+from app.species import SpeciesMasks
+from app.streaming import iter_windows
+
+# Sample recordings shipped next to the tests
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# I. Analyzer registry shared across requests
+@patch('birdnetlib.main.RecordingBuffer')
+@patch('app.registry.build_analyzer')
+def test_registry_builds_analyzer_once(mock_analyzer, mock_buffer):
+    """The analyzer is constructed once no matter how often it is acquired"""
+    registry = AnalyzerRegistry()
+    with registry.acquire() as first:
+        pass
+    with registry.acquire() as second:
+        pass
+
+    assert first is second
+    assert mock_analyzer.call_count == 1
+
+@patch('birdnetlib.main.RecordingBuffer')
+@patch('app.registry.build_analyzer')
+def test_registry_ready_after_warm_up(mock_analyzer, mock_buffer):
+    """Readiness only flips after the warm-up inference has run"""
+    registry = AnalyzerRegistry()
+    registry.load()
+    assert registry.loaded
+    assert not registry.ready
+
+    registry.warm_up()
+    assert registry.ready
+    mock_buffer.return_value.analyze.assert_called_once()
+
+
+# II. Health and readiness probes
+def test_ready_probe_before_warm_up():
+    """Readiness probe reports 503 until the analyzer is warmed up"""
+    with patch.object(main, 'executor', InferenceExecutor(workers=0, max_queue=1)):
+        client = TestClient(main.app)
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+
+@patch('birdnetlib.main.RecordingBuffer')
+@patch('app.registry.build_analyzer')
+def test_ready_probe_after_lifespan(mock_analyzer, mock_buffer):
+    """Lifespan startup loads and warms the analyzer, turning readiness green"""
+    with patch.object(main, 'registry', AnalyzerRegistry()):
+        with TestClient(main.app) as client:
+            response = client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["status"] == "ready"
+        assert mock_analyzer.call_count == 1
+
+
+# III. Single-pass inference shared by BirdNET and the custom model
+def _mock_registry(labels):
+    mock_analyzer = MagicMock()
+    mock_analyzer.labels = labels
+    mock_analyzer.custom_species_list = []
+    mock_registry = MagicMock()
+    mock_registry.acquire.return_value.__enter__.return_value = mock_analyzer
+    return mock_registry
+
+def test_single_pass_reads_scores_and_embeddings_from_one_invocation():
+    """One interpreter invocation yields both the class scores and the embeddings"""
+    mock_analyzer = MagicMock()
+    mock_analyzer.input_details = [{"index": 0, "dtype": np.float32}]
+    mock_analyzer.output_details = [{"index": 10}]
+    logits = np.zeros((2, 3), dtype=np.float32)
+    embeddings = np.ones((2, 1024), dtype=np.float32)
+    mock_analyzer.interpreter.get_tensor.side_effect = lambda index: logits if index == 10 else embeddings
+    mock_analyzer.flat_sigmoid.side_effect = lambda x, sensitivity: x + 0.5
+
+    confidences, result_embeddings = run_single_pass(mock_analyzer, np.zeros((2, 144000)))
+
+    mock_analyzer.interpreter.invoke.assert_called_once()
+    assert confidences.shape == (2, 3)
+    assert result_embeddings.shape == (2, 1024)
+
+@patch('app.main.model.predict_proba')
+@patch('app.main.run_single_pass')
+def test_window_batch_filters_low_scores_per_window(mock_single_pass, mock_predict):
+    """Only scores above the minimum confidence count; a window without any falls back to the custom model"""
+    mock_single_pass.return_value = (np.array([[0.8, 0.05], [0.05, 0.09]]), np.zeros((2, 1024)))
+    mock_predict.return_value = np.array([[0.1, 0.2, 0.7], [0.1, 0.2, 0.7]])
+    labels = ["Testus birdius_Test Bird", "Otherus birdius_Other Bird"]
+
+    with patch.object(main, 'registry', _mock_registry(labels)), \
+         patch.object(main, 'species_masks', SpeciesMasks(labels)):
+        results = main.analyze_window_batch([("a.wav", np.zeros(144000)), ("b.wav", np.zeros(144000))])
+
+    assert results[0] == {"filename": "a.wav", "scientific_name": "Testus birdius", "average_confidence": 0.8,
+                          "source": "birdnet"}
+    assert results[1]["filename"] == "b.wav"
+    assert results[1]["source"] == "own custom model for local species"
+
+@patch('app.main.model.predict_proba')
+@patch('app.main.run_single_pass')
+def test_fallback_reuses_birdnet_embeddings(mock_single_pass, mock_predict):
+    """Low-confidence results fall back to the custom model on the same embeddings"""
+    mock_single_pass.return_value = (np.array([[0.2, 0.0]]), np.zeros((1, 1024)))
+    mock_predict.return_value = np.array([[0.1, 0.2, 0.7]])
+    labels = ["Testus birdius_Test Bird", "Otherus birdius_Other Bird"]
+
+    with patch.object(main, 'registry', _mock_registry(labels)), \
+         patch.object(main, 'species_masks', SpeciesMasks(labels)), \
+         patch('app.main.preprocess_audio_bytes', return_value=np.zeros(144000, dtype=np.float32)):
+        result = asyncio.run(main.detect_species_batched(io.BytesIO(b"audio")))
+
+    assert result["scientific_name"] == "Hapalopsittaca melanotis"
+    assert result["average_confidence"] == 0.7
+    assert result["source"] == "own custom model for local species"
+    mock_single_pass.assert_called_once()
+    assert mock_predict.call_args[0][0].shape == (1, 1024)
+
+# IV. In-memory audio path
+def test_preprocess_pads_to_float32_window():
+    """Short uploads decode to a zero-padded 3-second float32 array at 48 kHz"""
+    with patch('pydub.AudioSegment.from_file', return_value=AudioSegment.silent(duration=1000, frame_rate=22050)):
+        samples = main.preprocess_audio_bytes(b"\0\0\0\x20ftypM4A audio")
+
+    assert samples.dtype == np.float32
+    assert samples.shape == (3 * 48000,)
+
+def test_preprocess_invalid_audio():
+    """Undecodable uploads return an error dict instead of raising"""
+    result = main.preprocess_audio_bytes(b"invalid_data")
+    assert "Unsupported or corrupt" in result["error"]
+
+@patch('app.main.run_single_pass')
+def test_detect_species_batched_runs_on_decoded_samples(mock_single_pass):
+    """Decoded samples go to BirdNET in memory and the top species is reported"""
+    mock_single_pass.return_value = (np.array([[0.8, 0.0]]), np.zeros((1, 1024)))
+    labels = ["Testus birdius_Test Bird", "Otherus birdius_Other Bird"]
+
+    with patch.object(main, 'registry', _mock_registry(labels)), \
+         patch.object(main, 'species_masks', SpeciesMasks(labels)), \
+         patch('app.main.preprocess_audio_bytes', return_value=np.zeros(144000, dtype=np.float32)):
+        result = asyncio.run(main.detect_species_batched(io.BytesIO(b"audio")))
+
+    assert mock_single_pass.call_args[0][1].shape == (1, 144000)
+    assert result == {"scientific_name": "Testus birdius", "average_confidence": 0.8, "source": "birdnet"}
+
+# V. Batched multi-file endpoint
+def test_expand_upload_unpacks_zip():
+    """Zip archives are expanded into their audio members"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.wav", b"first")
+        archive.writestr("nested/b.wav", b"second")
+        archive.writestr("__MACOSX/._a.wav", b"junk")
+
+    members = list(expand_upload("dump.zip", buffer.getvalue()))
+
+    assert members == [("dump.zip/a.wav", b"first"), ("dump.zip/nested/b.wav", b"second")]
+    assert list(expand_upload("clip.mp3", b"plain audio")) == [("clip.mp3", b"plain audio")]
+
+def test_expand_upload_checks_limits_before_decompressing():
+    """Member counts and declared sizes are checked before any member is read"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("bomb.wav", b"\0" * (8 * 1024 * 1024))
+        archive.writestr("small.wav", b"x")
+    members = expand_upload("dump.zip", buffer.getvalue(), max_bytes=1024 * 1024)
+
+    with patch.object(zipfile.ZipFile, 'read', side_effect=AssertionError("member decompressed")):
+        with pytest.raises(ExpandedTooLarge):
+            next(members)
+    with pytest.raises(TooManyFiles):
+        list(expand_upload("dump.zip", buffer.getvalue(), max_files=1))
+
+def test_batch_endpoint_rejects_archives_over_limits():
+    """Too many members is a 400 and too many decompressed bytes a 413, before any analysis"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for i in range(3):
+            archive.writestr(f"{i}.wav", b"\0" * (2 * 1024 * 1024))
+    files = [("files", ("dump.zip", buffer.getvalue(), "application/zip"))]
+
+    with patch('app.main.preprocess_audio_bytes') as mock_preprocess:
+        with patch.object(main, 'BATCH_MAX_FILES', 2):
+            too_many = TestClient(main.app).post("/analyze-bird/batch", files=files)
+        with patch.object(main, 'MAX_BATCH_EXPANDED_MB', 5):
+            too_large = TestClient(main.app).post("/analyze-bird/batch", files=files)
+
+    assert too_many.status_code == 400
+    assert "limit 2" in too_many.json()["error"]
+    assert too_large.status_code == 413
+    mock_preprocess.assert_not_called()
+
+@patch('app.main.run_single_pass')
+def test_batch_endpoint_streams_ndjson(mock_single_pass):
+    """Windows from several files share one analyzer invocation and stream back per file"""
+    mock_single_pass.return_value = (np.array([[0.9, 0.0], [0.7, 0.0]]), np.zeros((2, 1024)))
+    decoded = {b"first": np.zeros(144000, dtype=np.float32), b"second": np.ones(144000, dtype=np.float32)}
+
+    with patch.object(main, 'registry', _mock_registry(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch.object(main, 'species_masks', SpeciesMasks(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch('app.main.preprocess_audio_bytes', side_effect=lambda data: decoded[data]):
+        response = TestClient(main.app).post(
+            "/analyze-bird/batch",
+            files=[("files", ("a.wav", b"first", "audio/wav")), ("files", ("b.wav", b"second", "audio/wav"))]
+        )
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["filename"] for r in results) == ["a.wav", "b.wav"]
+    assert all(r["source"] == "birdnet" for r in results)
+    mock_single_pass.assert_called_once()
+    assert mock_single_pass.call_args[0][1].shape == (2, 144000)
+
+@patch('app.main.run_single_pass')
+def test_batch_endpoint_keeps_results_of_uploads_with_the_same_name(mock_single_pass):
+    """Two different clips sharing a filename each get their own result, in upload order"""
+    mock_single_pass.return_value = (np.array([[0.9, 0.0], [0.0, 0.8]]), np.zeros((2, 1024)))
+    decoded = {b"first": np.zeros(144000, dtype=np.float32), b"second": np.ones(144000, dtype=np.float32)}
+
+    with patch.object(main, 'registry', _mock_registry(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch.object(main, 'species_masks', SpeciesMasks(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch('app.main.preprocess_audio_bytes', side_effect=lambda data: decoded[data]):
+        response = TestClient(main.app).post(
+            "/analyze-bird/batch",
+            files=[("files", ("a.mp3", b"first", "audio/mpeg")), ("files", ("a.mp3", b"second", "audio/mpeg"))]
+        )
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["filename"] for r in results] == ["a.mp3", "a.mp3"]
+    assert [r["scientific_name"] for r in results] == ["Testus birdius", "Otherus birdius"]
+
+def test_batch_endpoint_reports_bad_files_inline():
+    """Undecodable files get an error line without failing the batch"""
+    with patch('app.main.preprocess_audio_bytes', return_value={"error": "Unsupported or corrupt audio file."}):
+        response = TestClient(main.app).post(
+            "/analyze-bird/batch",
+            files=[("files", ("bad.wav", b"bad", "audio/wav"))]
+        )
+
+    assert response.status_code == 200
+    assert json.loads(response.text) == {"filename": "bad.wav", "error": "Unsupported or corrupt audio file."}
+
+
+# VI. Long-recording mode with sliding windows
+def _wav_bytes(duration_secs, rate=44100):
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(int(duration_secs * rate), dtype=np.float32), rate, format="WAV")
+    return buffer.getvalue()
+
+def test_iter_windows_overlap_and_tail():
+    """Windows advance by the hop, stay 3 seconds long and include a padded tail"""
+    windows = list(iter_windows(io.BytesIO(_wav_bytes(10)), hop_secs=1.5, block_secs=4))
+
+    start_times = [start for start, _ in windows]
+    assert start_times == [0.0, 1.5, 3.0, 4.5, 6.0, 7.5]
+    assert all(window.shape == (3 * 48000,) for _, window in windows)
+
+@patch('app.main.model.predict_proba')
+@patch('app.main.run_single_pass')
+def test_long_endpoint_returns_timeline(mock_single_pass, mock_predict):
+    """A long upload yields a per-window timeline and the aggregated top species"""
+    def single_pass(analyzer, windows):
+        scores = np.tile([[0.9, 0.0]], (len(windows), 1))
+        return scores, np.zeros((len(windows), 1024))
+    mock_single_pass.side_effect = single_pass
+    mock_predict.side_effect = lambda embeddings: np.tile([[1.0, 0.0, 0.0]], (len(embeddings), 1))
+
+    with patch.object(main, 'registry', _mock_registry(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch.object(main, 'species_masks', SpeciesMasks(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])):
+        response = TestClient(main.app).post(
+            "/analyze-bird/long?hop_seconds=3",
+            files={"file": ("long.wav", _wav_bytes(30), "audio/wav")}
+        )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["scientific_name"] == "Testus birdius"
+    assert result["source"] == "birdnet"
+    assert result["windows_analyzed"] == 10
+    assert result["duration"] == 30.0
+    assert result["timeline"][1] == {"start_time": 3.0, "end_time": 6.0, "scientific_name": "Testus birdius", "confidence": 0.9}
+
+def test_long_endpoint_rejects_bad_hop_and_corrupt_audio():
+    """Invalid hops fail validation, unknown containers return 415 and unreadable files 400"""
+    client = TestClient(main.app)
+    response = client.post("/analyze-bird/long?hop_seconds=0", files={"file": ("a.wav", b"x", "audio/wav")})
+    assert response.status_code == 422
+
+    response = client.post("/analyze-bird/long", files={"file": ("a.wav", b"garbage", "audio/wav")})
+    assert response.status_code == 415
+
+    response = client.post("/analyze-bird/long", files={"file": ("a.wav", b"RIFF\0\0\0\0WAVEgarbage", "audio/wav")})
+    assert response.status_code == 400
+    assert "Unsupported or corrupt" in response.json()["error"]
+
+
+# VII. Inference off the event loop with admission control
+def test_executor_rejects_when_saturated():
+    """Submissions beyond workers + queue depth raise Saturated and are counted"""
+    executor = InferenceExecutor(workers=0, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Saturated):
+            await executor.run(lambda: None)
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+    snapshot = executor.metrics.snapshot()
+    assert snapshot["rejected"] == 1
+    assert snapshot["completed"] == 1
+    assert snapshot["compute_ms"]["max"] > 0
+
+def test_analyze_returns_503_when_busy():
+    """The endpoint sheds load with 503 and Retry-After instead of queueing forever"""
+    busy = MagicMock()
+    busy.run.side_effect = Saturated("full")
+
+    with patch.object(main, 'executor', busy):
+        response = TestClient(main.app).post(
+            "/analyze-bird",
+            files={"file": ("test.wav", _wav_bytes(1), "audio/wav")}
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_metrics_endpoint_reports_timings():
+    """Metrics expose queue wait and compute time separately"""
+    response = TestClient(main.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert {"in_flight", "capacity", "queue_wait_ms", "compute_ms"} <= set(response.json())
+
+
+# VIII. Micro-batching of concurrent requests
+def test_micro_batcher_coalesces_and_scatters():
+    """Concurrent submissions share one batch and each gets its own slice back"""
+    batch_sizes = []
+
+    async def run_batch(stacked):
+        batch_sizes.append(len(stacked))
+        return stacked[:, 0], [f"window-{value:.0f}" for value in stacked[:, 0]]
+
+    batcher = MicroBatcher(run_batch, max_batch_windows=8, max_wait_ms=50)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.submit(np.full((1, 4), 1.0)),
+            batcher.submit(np.full((2, 4), 2.0)),
+            batcher.submit(np.full((1, 4), 3.0)),
+        )
+
+    first, second, third = asyncio.run(scenario())
+
+    assert batch_sizes == [4]
+    assert list(first[0]) == [1.0] and first[1] == ["window-1"]
+    assert list(second[0]) == [2.0, 2.0]
+    assert third[1] == ["window-3"]
+
+def test_micro_batcher_flushes_at_max_batch_size():
+    """A full batch is dispatched without waiting for the timer"""
+    batch_sizes = []
+
+    async def run_batch(stacked):
+        batch_sizes.append(len(stacked))
+        return (stacked,)
+
+    batcher = MicroBatcher(run_batch, max_batch_windows=2, max_wait_ms=10000)
+
+    async def scenario():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(np.zeros((1, 4))) for _ in range(4))),
+            timeout=1
+        )
+
+    asyncio.run(scenario())
+    assert batch_sizes == [2, 2]
+
+def test_micro_batcher_propagates_failures():
+    """A failed batch fails every request that was part of it"""
+    async def run_batch(stacked):
+        raise Saturated("full")
+
+    batcher = MicroBatcher(run_batch, max_batch_windows=4, max_wait_ms=0)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit(np.zeros((1, 4))), return_exceptions=True)
+
+    assert isinstance(asyncio.run(scenario())[0], Saturated)
+
+def test_micro_batcher_keeps_in_flight_dispatches():
+    """Dispatched batches are referenced until they finish, and stacking errors reach the callers"""
+    async def scenario():
+        gate = asyncio.Event()
+        in_flight = []
+
+        async def run_batch(stacked):
+            in_flight.append(len(batcher._tasks))
+            await gate.wait()
+            return [np.zeros((len(stacked), 1))]
+
+        batcher = MicroBatcher(run_batch, max_batch_windows=2, max_wait_ms=0)
+        pending = asyncio.ensure_future(batcher.submit(np.zeros((2, 4))))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        gate.set()
+        await pending
+        await asyncio.sleep(0)
+
+        mismatched = await asyncio.gather(
+            batcher.submit(np.zeros((1, 4))), batcher.submit(np.zeros((1, 3))),
+            return_exceptions=True
+        )
+        return in_flight, len(batcher._tasks), mismatched
+
+    in_flight, remaining, mismatched = asyncio.run(scenario())
+    assert in_flight == [1]
+    assert remaining == 0
+    assert all(isinstance(result, ValueError) for result in mismatched)
+
+@patch('app.main.run_single_pass')
+def test_analyze_endpoint_runs_through_batcher(mock_single_pass):
+    """Single uploads are decoded, batched and resolved with the usual schema"""
+    mock_single_pass.return_value = (np.array([[0.9, 0.0]]), np.zeros((1, 1024)))
+
+    with patch.object(main, 'registry', _mock_registry(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch.object(main, 'species_masks', SpeciesMasks(["Testus birdius_Test Bird", "Otherus birdius_Other Bird"])), \
+         patch('app.main.preprocess_audio_bytes', return_value=np.zeros(144000, dtype=np.float32)):
+        response = TestClient(main.app).post(
+            "/analyze-bird",
+            files={"file": ("test.wav", _wav_bytes(1), "audio/wav")}
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"scientific_name": "Testus birdius", "average_confidence": 0.9, "source": "birdnet"}
+    assert mock_single_pass.call_args[0][1].shape == (1, 144000)
+
+
+# IX. Vectorized custom-model fallback
+@patch('app.main.model.predict_proba')
+def test_custom_model_single_call_over_all_windows(mock_predict):
+    """All windows go through one predict_proba call and the best window wins with max pooling"""
+    mock_predict.return_value = np.array([[0.9, 0.05, 0.05], [0.1, 0.8, 0.1], [0.6, 0.2, 0.2]])
+
+    result = main.classify_with_custom_model(np.zeros((3, 1024)))
+
+    mock_predict.assert_called_once()
+    assert mock_predict.call_args[0][0].shape == (3, 1024)
+    assert result == {
+        "scientific_name": "Doliornis sclateri",
+        "average_confidence": 0.8,
+        "source": "own custom model for local species"
+    }
+
+@patch('app.main.model.predict_proba')
+def test_custom_model_mean_pooling_below_threshold(mock_predict):
+    """With mean pooling a single confident window is not enough to report a species"""
+    mock_predict.return_value = np.array([[0.9, 0.05, 0.05], [0.1, 0.8, 0.1], [0.6, 0.2, 0.2]])
+
+    with patch.object(main, 'CUSTOM_MODEL_AGGREGATION', 'mean'):
+        result = main.classify_with_custom_model(np.zeros((3, 1024)))
+
+    assert result == {"scientific_name": "Species not identified", "source": "own custom model for local species"}
+
+
+# X. Content-addressed result cache
+def _model_files(tmp_path):
+    birdnet_model = tmp_path / "birdnet.tflite"
+    custom_model = tmp_path / "mlp.pkl"
+    birdnet_model.write_bytes(b"birdnet v1")
+    custom_model.write_bytes(b"mlp v1")
+    return birdnet_model, custom_model
+
+def test_result_cache_lru_eviction(tmp_path):
+    """The in-memory tier keeps the most recently used entries within its bound"""
+    cache = ResultCache(max_entries=2, model_paths=_model_files(tmp_path))
+    keys = [cache.key(data) for data in (b"a", b"b", b"c")]
+
+    cache.put(keys[0], {"scientific_name": "A"})
+    cache.put(keys[1], {"scientific_name": "B"})
+    assert cache.get(keys[0]) == {"scientific_name": "A"}
+    cache.put(keys[2], {"scientific_name": "C"})
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == {"scientific_name": "A"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+def test_result_cache_invalidated_when_model_changes(tmp_path):
+    """Rewriting either model file changes every key and drops cached results"""
+    birdnet_model, custom_model = _model_files(tmp_path)
+    cache = ResultCache(max_entries=8, model_paths=[birdnet_model, custom_model], disk_dir=str(tmp_path / "cache"))
+    key = cache.key(b"clip")
+    cache.put(key, {"scientific_name": "A"})
+
+    custom_model.write_bytes(b"mlp v2, retrained")
+
+    assert cache.key(b"clip") != key
+    assert cache.get(cache.key(b"clip")) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_result_cache_disk_tier_survives_restart(tmp_path):
+    """A fresh cache over the same directory serves results written by a previous process"""
+    model_paths = _model_files(tmp_path)
+    first = ResultCache(max_entries=8, model_paths=model_paths, disk_dir=str(tmp_path / "cache"))
+    first.put(first.key(b"clip"), {"scientific_name": "A"})
+
+    second = ResultCache(max_entries=8, model_paths=model_paths, disk_dir=str(tmp_path / "cache"))
+
+    assert second.get(second.key(b"clip")) == {"scientific_name": "A"}
+    assert second.stats()["disk_hits"] == 1
+
+@patch('app.main.detect_species_batched')
+def test_analyze_endpoint_serves_repeat_uploads_from_cache(mock_detect, tmp_path):
+    """The same bytes uploaded twice are only analyzed once"""
+    async def detect(audio, fmt=None, mask=None):
+        return {"scientific_name": "Testus birdius", "average_confidence": 0.9, "source": "birdnet"}
+    mock_detect.side_effect = detect
+
+    with patch.object(main, 'result_cache', ResultCache(max_entries=8, model_paths=_model_files(tmp_path))):
+        client = TestClient(main.app)
+        responses = [
+            client.post("/analyze-bird", files={"file": ("test.wav", _wav_bytes(1), "audio/wav")})
+            for _ in range(2)
+        ]
+        cache_stats = client.get("/metrics").json()["cache"]
+
+    assert responses[0].json() == responses[1].json()
+    mock_detect.assert_called_once()
+    assert cache_stats["hits"] == 1
+
+
+@patch('app.main.run_single_pass')
+def test_batch_results_cached_under_their_own_upload(mock_single_pass, tmp_path):
+    """A batch caches each clip's own result, so a later single request on the same bytes gets it"""
+    mock_single_pass.return_value = (np.array([[0.9, 0.0], [0.0, 0.8]]), np.zeros((2, 1024)))
+    first, second = _wav_bytes(1), _wav_bytes(2)
+    decoded = {first: np.zeros(144000, dtype=np.float32), second: np.ones(144000, dtype=np.float32)}
+    labels = ["Testus birdius_Test Bird", "Otherus birdius_Other Bird"]
+
+    with patch.object(main, 'registry', _mock_registry(labels)), \
+         patch.object(main, 'species_masks', SpeciesMasks(labels)), \
+         patch.object(main, 'result_cache', ResultCache(max_entries=8, model_paths=_model_files(tmp_path))), \
+         patch('app.main.preprocess_audio_bytes', side_effect=lambda data: decoded[data]):
+        client = TestClient(main.app)
+        batch = client.post(
+            "/analyze-bird/batch",
+            files=[("files", ("a.wav", first, "audio/wav")), ("files", ("a.wav", second, "audio/wav"))]
+        )
+        single = client.post("/analyze-bird", files={"file": ("x.wav", first, "audio/wav")})
+        cache_stats = client.get("/metrics").json()["cache"]
+
+    batch_results = [json.loads(line) for line in batch.text.splitlines()]
+    assert batch_results[0]["scientific_name"] == "Testus birdius"
+    assert single.json() == {k: v for k, v in batch_results[0].items() if k != "filename"}
+    assert cache_stats["hits"] == 1
+    mock_single_pass.assert_called_once()
+
+
+def test_cache_key_follows_species_allow_list(tmp_path):
+    """Editing the allow-list changes the cache parameters, so older results are not served"""
+    species_list = tmp_path / "species.txt"
+    species_list.write_text("Testus birdius\n")
+    before = main.result_settings(str(species_list))
+    assert main.result_settings(str(species_list)) == before
+
+    species_list.write_text("Testus birdius\nOtherus birdius\n")
+    assert main.result_settings(str(species_list)) != before
+    assert main.result_settings(None) not in (before, main.result_settings(str(species_list)))
+
+# XI. Pluggable decoders
+def test_decode_soundfile_reads_mp3_in_process():
+    """MP3 uploads are decoded by libsndfile without falling back to ffmpeg"""
+    with open(os.path.join(TEST_DIR, "test.mp3"), "rb") as f:
+        samples, rate, backend = decode_audio(f.read(), max_secs=3)
+
+    assert backend == "soundfile"
+    assert samples.dtype == np.float32
+    assert len(samples) == 3 * rate
+
+def test_decode_falls_back_to_pydub():
+    """Formats libsndfile rejects are handed to pydub"""
+    with patch('pydub.AudioSegment.from_file', return_value=AudioSegment.silent(duration=500, frame_rate=16000)):
+        samples, rate, backend = decode_audio(b"m4a bytes")
+
+    assert backend == "pydub"
+    assert (rate, len(samples)) == (16000, 8000)
+
+def test_decode_reports_every_backend_failure():
+    """When nothing can decode the data the error names each backend"""
+    with pytest.raises(DecodeError, match="soundfile: .*"):
+        decode_audio(b"invalid_data", backends=("soundfile",))
+
+def test_preprocess_resamples_wav_without_pydub():
+    """WAV uploads become a 3-second window at 48 kHz on the soundfile path"""
+    with patch('pydub.AudioSegment.from_file') as mock_from_file:
+        samples = main.preprocess_audio_bytes(_wav_bytes(5, rate=44100))
+
+    mock_from_file.assert_not_called()
+    assert samples.shape == (3 * 48000,)
+
+
+# XII. Early format and size validation
+def test_sniff_format_from_header():
+    """Containers are recognised from their first bytes"""
+    with open(os.path.join(TEST_DIR, "test.mp3"), "rb") as f:
+        assert sniff_format(f.read(SNIFF_BYTES)) == "mp3"
+    assert sniff_format(_wav_bytes(1)[:SNIFF_BYTES]) == "wav"
+    assert sniff_format(b"\0\0\0\x20ftypM4A ") == "mp4"
+    assert sniff_format(b"<html>") is None
+
+def test_analyze_rejects_unknown_container_before_decoding():
+    """Uploads with an unknown header get 415 without touching the decoders"""
+    with patch('app.main.decode_audio') as mock_decode:
+        response = TestClient(main.app).post(
+            "/analyze-bird",
+            files={"file": ("notes.txt", b"definitely not audio", "text/plain")}
+        )
+
+    assert response.status_code == 415
+    mock_decode.assert_not_called()
+
+def test_preprocess_decodes_only_the_analyzed_window():
+    """A long file-backed upload is decoded only up to the 3 seconds that are used"""
+    upload = io.BytesIO(_wav_bytes(60, rate=48000))
+
+    with patch('app.decoding.sf.SoundFile.read', autospec=True, side_effect=sf.SoundFile.read) as mock_read:
+        samples = main.preprocess_audio_bytes(upload)
+
+    assert samples.shape == (3 * 48000,)
+    assert mock_read.call_args[0][1] == 3 * 48000
+
+def test_oversized_upload_rejected_with_413():
+    """Bodies over the limit are refused, whether declared up front or found while streaming"""
+    with patch.dict(main.UPLOAD_LIMITS, {"/analyze-bird": 1024 * 1024}), \
+         patch('app.main.detect_species_batched') as mock_detect:
+        client = TestClient(main.app)
+        response = client.post(
+            "/analyze-bird",
+            files={"file": ("big.wav", _wav_bytes(30, rate=48000), "audio/wav")}
+        )
+
+    assert response.status_code == 413
+    assert "limit" in response.json()["error"]
+    mock_detect.assert_not_called()
+
+def test_size_limit_enforced_while_streaming():
+    """Chunked bodies without Content-Length are cut off once they cross the limit"""
+    chunks_read = []
+
+    async def endpoint(scope, receive, send):
+        while True:
+            message = await receive()
+            chunks_read.append(message)
+            if not message.get("more_body"):
+                break
+
+    middleware = UploadSizeLimitMiddleware(endpoint, limits={"/upload": 10})
+
+    async def receive():
+        return {"type": "http.request", "body": b"x" * 8, "more_body": True}
+
+    async def send(message):
+        pass
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(middleware({"type": "http", "path": "/upload", "headers": []}, receive, send))
+    assert len(chunks_read) == 1
+
+
+# XIII. Selectable inference engines
+ONNX_MODEL_PATH = os.path.join(TEST_DIR, "..", "src", "birdnet_app", "mlp_model_birdnet.onnx")
+
+def _embeddings_for(filename, registry):
+    """Single-pass embeddings for the first 3 seconds of a sample recording."""
+    with open(os.path.join(TEST_DIR, filename), "rb") as f:
+        samples = main.preprocess_audio_bytes(f.read())
+    with registry.acquire() as analyzer:
+        return run_single_pass(analyzer, samples[np.newaxis, :])
+
+@pytest.mark.parametrize("filename", ["test.mp3", "Hapalopsittaca_sample.mp3"])
+def test_onnx_engine_matches_sklearn(filename):
+    """The ONNX export gives the same probabilities and species as the pickled MLP"""
+    pytest.importorskip("onnxruntime")
+    onnx_model = OnnxClassifier(ONNX_MODEL_PATH)
+    _, embeddings = _embeddings_for(filename, AnalyzerRegistry())
+
+    expected = main.model.predict_proba(embeddings)
+    actual = onnx_model.predict_proba(embeddings)
+
+    assert list(onnx_model.classes_) == list(main.model.classes_)
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+    with patch.object(main, 'model', onnx_model):
+        assert main.classify_with_custom_model(embeddings) == main.custom_model_result(main.pool_probabilities(expected))
+
+@pytest.mark.skipif(
+    not os.path.exists(os.environ.get("BIRDNET_INT8_MODEL_PATH", "")),
+    reason="BIRDNET_INT8_MODEL_PATH does not point to a quantized model"
+)
+@pytest.mark.parametrize("filename", ["test.mp3", "Hapalopsittaca_sample.mp3"])
+def test_int8_engine_matches_float_top_species(filename):
+    """The quantized classifier agrees with FP32 on the top species and stays close in confidence"""
+    factory, _ = birdnet_factory("tflite-int8", os.environ["BIRDNET_INT8_MODEL_PATH"])
+    float_scores, _ = _embeddings_for(filename, AnalyzerRegistry())
+    int8_scores, _ = _embeddings_for(filename, AnalyzerRegistry(factory))
+
+    assert int8_scores.argmax() == float_scores.argmax()
+    assert abs(int8_scores.max() - float_scores.max()) < 0.05
+
+def test_unknown_engine_rejected():
+    """Misspelled engine names fail at startup instead of silently using the default"""
+    with pytest.raises(ValueError, match="BIRDNET_ENGINE"):
+        birdnet_factory("tflite-fp8")
+    with pytest.raises(ValueError, match="tflite-int8 requires"):
+        birdnet_factory("tflite-int8")
+
+
+# XIV. Species filtering with precomputed class masks
+LABELS = ["Testus birdius_Test Bird", "Otherus birdius_Other Bird", "Thirdus birdius_Third Bird"]
+
+def test_species_masks_aggregate_like_per_detection_averaging():
+    """Scores above the threshold are averaged per species and the best average wins"""
+    masks = SpeciesMasks(LABELS)
+    confidences = np.array([[0.6, 0.9, 0.05], [0.8, 0.05, 0.05], [0.7, 0.05, 0.2]])
+
+    sums, counts = masks.species_scores(confidences)
+
+    assert list(counts) == [3, 1, 1]
+    assert masks.top_species(sums, counts) == {"scientific_name": "Otherus birdius", "average_confidence": 0.9}
+    assert masks.window_tops(confidences) == [("Otherus birdius", 0.9), ("Testus birdius", 0.8), ("Testus birdius", 0.7)]
+    assert masks.top_species(*masks.species_scores(np.full((2, 3), 0.05))) is None
+
+def test_species_mask_excludes_unlisted_species():
+    """An allow-list removes out-of-range species before aggregation and is built once"""
+    masks = SpeciesMasks(LABELS, allow_list=["Testus birdius", "Thirdus birdius_Third Bird"])
+    confidences = np.array([[0.6, 0.9, 0.05]])
+
+    assert list(masks.default) == [True, False, True]
+    assert masks.for_list(["Thirdus birdius_Third Bird", "Testus birdius"]) is masks.default
+    top = masks.top_species(*masks.species_scores(confidences, masks.default), masks.default)
+    assert top == {"scientific_name": "Testus birdius", "average_confidence": 0.6}
+
+def test_location_mask_from_birdnet_meta_model():
+    """Coordinates in Yanachaga Chemillén keep Andean species and drop North American ones"""
+    masks = SpeciesMasks(main.load_labels())
+
+    mask = masks.resolve(-10.5, -75.4)
+
+    allowed = set(masks.scientific_names[mask])
+    assert "Gallinago jamesoni" in allowed
+    assert "Turdus migratorius" not in allowed
+    assert masks.resolve(-10.5, -75.4) is mask
+
+@patch('app.main.run_single_pass')
+def test_analyze_endpoint_filters_by_location(mock_single_pass):
+    """With lat/lon the best species outside the location list is not reported"""
+    mock_single_pass.return_value = (np.array([[0.6, 0.9, 0.0]]), np.zeros((1, 1024)))
+    masks = SpeciesMasks(LABELS)
+    masks.for_location = MagicMock(return_value=np.array([True, False, True]))
+
+    with patch.object(main, 'registry', _mock_registry(LABELS)), \
+         patch.object(main, 'species_masks', masks), \
+         patch('app.main.preprocess_audio_bytes', return_value=np.zeros(144000, dtype=np.float32)):
+        client = TestClient(main.app)
+        response = client.post(
+            "/analyze-bird?lat=-10.5&lon=-75.4&date=2025-06-01",
+            files={"file": ("test.wav", _wav_bytes(1), "audio/wav")}
+        )
+        missing_lon = client.post(
+            "/analyze-bird?lat=-10.5",
+            files={"file": ("test.wav", _wav_bytes(1), "audio/wav")}
+        )
+
+    assert response.json() == {"scientific_name": "Testus birdius", "average_confidence": 0.6, "source": "birdnet"}
+    assert masks.for_location.call_args[0] == (-10.5, -75.4, 20)
+    assert missing_lon.status_code == 400
+
+
+# XV. Start-up time and lazily loaded dependencies
+APP_DIR = os.path.join(TEST_DIR, "..", "src", "birdnet_app")
+
+def test_numpy_engine_matches_sklearn():
+    """Memory-mapped NumPy weights reproduce the pickled MLP's probabilities"""
+    joblib = pytest.importorskip("joblib")
+    sklearn_model = joblib.load(os.path.join(APP_DIR, "mlp_model_birdnet.pkl"))
+    numpy_model = NumpyMLP(os.path.join(APP_DIR, "mlp_model_birdnet_weights"))
+    embeddings = np.random.default_rng(0).normal(size=(16, 1024)).astype(np.float32)
+
+    assert list(numpy_model.classes_) == list(sklearn_model.classes_)
+    np.testing.assert_allclose(numpy_model.predict_proba(embeddings), sklearn_model.predict_proba(embeddings), atol=1e-6)
+
+def test_import_stays_under_startup_budget():
+    """Importing the app defers TensorFlow, birdnetlib and scikit-learn to the first request"""
+    budget = float(os.environ.get("BIRDNET_STARTUP_BUDGET_SECS", 2.0))
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app.main\n"
+        "print(json.dumps({'secs': time.perf_counter() - started, 'modules': sorted(sys.modules)}))\n"
+    )
+    child = subprocess.run(
+        [sys.executable, "-c", script], cwd=TEST_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": APP_DIR}
+    )
+    assert child.returncode == 0, child.stderr
+    startup = json.loads(child.stdout.strip().splitlines()[-1])
+
+    loaded = {name.split(".")[0] for name in startup["modules"]}
+    assert not loaded & {"birdnetlib", "tensorflow", "tflite_runtime", "sklearn", "matplotlib", "librosa"}
+    assert startup["secs"] < budget